@@ -1,8 +1,13 @@
 import sys
-from flask import Flask, render_template, request, jsonify,send_file
+from flask import Flask, Request, render_template, request, jsonify,send_file, Response
 import os
 import json
+import shutil
 import datetime
+import tempfile
+from io import BytesIO
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from werkzeug.utils import secure_filename
 from tile_2.speech_to_text import transcribe_audio_file, transcribe_microphone
 from dotenv import load_dotenv
@@ -13,17 +18,24 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'tile_1'))
 sys.path.append(os.path.join(os.path.dirname(__file__), 'tile_3', 'edubot_blob_cosmos', 'summarizer'))
 sys.path.append(os.path.join(os.path.dirname(__file__), 'tile_3', 'edubot_blob_cosmos', 'flashcard_generator'))
 sys.path.append(os.path.join(os.path.dirname(__file__), 'tile_4'))
+# Shared helpers (model_loader, ...) live next to the Azure Functions; added last so
+# "summarizer" still resolves to summarizer/summarizer.py
+sys.path.append(os.path.join(os.path.dirname(__file__), 'tile_3', 'edubot_blob_cosmos'))
 
-from summarizer import generate_summary
+from summarizer import generate_summary, generate_summaries, clean_text as clean_summary_text
 from flashcard_generator import generate_flashcards
 from tile_4 import tts
 from tile_1 import ocr_summarizer
+import search_index
+from model_loader import correct_grammar
+from document_model import check_sources
+import budget as budgets
 
 # --- Azure Integration ---
-from azure.storage.blob import BlobServiceClient
-from azure.cosmos import CosmosClient
+# The Azure SDKs are imported on first use to keep startup fast
 
 def upload_to_blob(blob_name, data):
+    from azure.storage.blob import BlobServiceClient
     conn_str = os.getenv("AZURE_BLOB_CONN_STR")
     container_name = os.getenv("BLOB_RESULTS_CONTAINER")
     if not conn_str or not container_name:
@@ -33,6 +45,7 @@ def upload_to_blob(blob_name, data):
     blob_client.upload_blob(data, overwrite=True)
 
 def save_to_cosmos(document):
+    from azure.cosmos import CosmosClient
     endpoint = os.getenv("AZURE_COSMOS_ENDPOINT")
     key = os.getenv("AZURE_COSMOS_KEY")
     if not endpoint or not key:
@@ -60,6 +73,83 @@ app = Flask(
 
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), 'uploads')
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# Uploads up to this size are kept in memory; larger ones are spooled to disk as they arrive
+app.config['UPLOAD_SPILL_THRESHOLD'] = int(os.getenv("UPLOAD_SPILL_THRESHOLD", 20 * 1024 * 1024))
+# /ocr_summarize returns raw/cleaned/corrected text for uploads up to this size unless "fields" says otherwise
+app.config['FULL_TEXT_MAX_BYTES'] = int(os.getenv("EDUBOT_FULL_TEXT_MAX_BYTES", 20 * 1024 * 1024))
+# /generate_flashcards_batch: documents per request, and threads for per-document work
+app.config['BATCH_MAX_DOCUMENTS'] = int(os.getenv("EDUBOT_BATCH_MAX_DOCUMENTS", 100))
+app.config['BATCH_WORKERS'] = int(os.getenv("EDUBOT_BATCH_WORKERS", 4))
+
+# --- Upload handling ---
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Werkzeug's default spools anything over 500 KB to an anonymous temp file.
+        # Use the spill threshold instead, and a named file in UPLOAD_FOLDER so large
+        # uploads are handed to the processors by path without being copied again
+        if total_content_length is not None and total_content_length <= app.config['UPLOAD_SPILL_THRESHOLD']:
+            return BytesIO()
+        suffix = os.path.splitext(secure_filename(filename or ''))[1].lower()
+        # delete=False: on Windows a delete-on-close file cannot be opened again by path.
+        # close() removes it when the request ends
+        stream = tempfile.NamedTemporaryFile('wb+', suffix=suffix, dir=app.config['UPLOAD_FOLDER'], delete=False)
+        if not hasattr(self, 'spooled_paths'):
+            self.spooled_paths = []
+        self.spooled_paths.append(stream.name)
+        return stream
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            for path in getattr(self, 'spooled_paths', []):
+                if os.path.exists(path):
+                    os.remove(path)
+
+app.request_class = UploadRequest
+
+def spooled_path(file):
+    """Path of the file the upload was spooled to, or None if it is in memory."""
+    name = getattr(file.stream, 'name', None)
+    if isinstance(name, str) and os.path.isfile(name):
+        file.stream.flush()
+        return name
+    return None
+
+def upload_size(file):
+    stream = file.stream
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+@contextmanager
+def spill_to_disk(file, suffix):
+    path = spooled_path(file)
+    if path is not None:
+        # Already on disk; UploadRequest.close() deletes it when the request ends
+        yield path
+        return
+    # Uniquely named, so concurrent uploads with the same filename never collide
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=app.config['UPLOAD_FOLDER'])
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            shutil.copyfileobj(file.stream, out)
+        yield path
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+@contextmanager
+def upload_source(file, suffix):
+    """The upload as bytes, or as a temp file path when it exceeds the spill threshold."""
+    if spooled_path(file) is None and upload_size(file) <= app.config['UPLOAD_SPILL_THRESHOLD']:
+        yield file.read()
+    else:
+        with spill_to_disk(file, suffix) as path:
+            yield path
 
 @app.route('/')
 def index():
@@ -77,25 +167,32 @@ def ocr_summarize():
     if not file:
         return jsonify({'success': False, 'error': 'No file uploaded'})
     filename = secure_filename(file.filename)
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(filepath)
 
     ext = os.path.splitext(filename)[1].lower()
+    if ext in ['.pdf']:
+        process = ocr_summarizer.process_pdf_bytes
+    elif ext in ['.jpg', '.jpeg', '.png']:
+        process = ocr_summarizer.process_image_bytes
+    elif ext in ['.pptx']:
+        process = ocr_summarizer.process_pptx_text
+    else:
+        return jsonify({'success': False, 'error': 'Unsupported file type'})
+
+    # Pages are processed in a bounded window either way; the full texts are
+    # the part that grows with the document, so large uploads only get them on request
+    fields = request.form.get('fields')
+    if fields is None:
+        fields = ocr_summarizer.TEXT_FIELDS if upload_size(file) <= app.config['FULL_TEXT_MAX_BYTES'] else ()
+    else:
+        fields = tuple(f.strip() for f in fields.split(',') if f.strip() and f.strip() != 'none')
+        unknown = set(fields) - set(ocr_summarizer.TEXT_FIELDS)
+        if unknown:
+            return jsonify({'success': False, 'error': f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
     try:
-        if ext in ['.pdf']:
-            result = ocr_summarizer.process_pdf_bytes(filepath)
-        elif ext in ['.jpg', '.jpeg', '.png']:
-            result = ocr_summarizer.process_image_bytes(filepath)
-        elif ext in ['.pptx']:
-            result = ocr_summarizer.process_pptx_text(filepath)
-        else:
-            os.remove(filepath)
-            return jsonify({'success': False, 'error': 'Unsupported file type'})
-        os.remove(filepath)
+        with upload_source(file, ext) as source:
+            result = process(source, fields=fields)
         return jsonify({'success': True, **result})
     except Exception as e:
-        if os.path.exists(filepath):
-            os.remove(filepath)
         return jsonify({'success': False, 'error': str(e)})
 
 # --- Tile 1 integration ends here ---
@@ -108,10 +205,9 @@ def transcribe():
     if file.filename == '':
         return jsonify({'success': False, 'error': 'No selected file'})
     filename = secure_filename(file.filename)
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(filepath)
-    result = transcribe_audio_file(filepath)
-    os.remove(filepath)
+    # The Speech SDK reads audio from a file, so this upload always goes to disk
+    with spill_to_disk(file, os.path.splitext(filename)[1].lower() or '.wav') as filepath:
+        result = transcribe_audio_file(filepath)
     return jsonify(result)
 
 @app.route('/transcribe_microphone', methods=['POST'])
@@ -135,27 +231,143 @@ def generate_flashcards_route():
     text = data.get('text')
     if not text:
         return jsonify({'success': False, 'error': 'No text provided'})
-    summary = generate_summary(text)
-    flashcards = generate_flashcards(text, summary, use_blooms=True)
+    # "mode": fast / balanced / thorough (budget.py); "timing" reports predicted vs. actual seconds
+    try:
+        budget = budgets.get_budget(data.get('mode'))
+        # Optional page/slide spans returned by /ocr_summarize for this text
+        sources = check_sources(data.get('sources'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    timer = budgets.Timer(budget, budgets.predict(text, budget))
+    summary = generate_summary(text, budget)
+    flashcards = generate_flashcards(text, summary, use_blooms=True, sources=sources, budget=budget)
+
+    base_name = "web_input_" + datetime.datetime.now(datetime.UTC).strftime("%Y%m%d%H%M%S")
+    store_results(base_name, summary, flashcards)
+
+    return jsonify({'success': True, 'summary': summary, 'flashcards': flashcards, 'timing': timer.report()})
+
+@app.route('/estimate', methods=['POST'])
+def estimate_route():
+    """Predicted seconds for /generate_flashcards in every mode, for offering a quick preview."""
+    data = request.get_json() or {}
+    text = data.get('text')
+    if not text:
+        return jsonify({'success': False, 'error': 'No text provided'})
+    estimates = {name: round(budgets.predict(text, budget), 2) for name, budget in budgets.BUDGETS.items()}
+    return jsonify({'success': True, 'predicted_seconds': estimates})
 
+def store_results(base_name, summary, flashcards):
     # --- Azure upload (optional, add your own logic for IDs) ---
     try:
-        base_name = "web_input_" + datetime.datetime.now(datetime.UTC).strftime("%Y%m%d%H%M%S")
         summary_file = f"{base_name}_summary_OCR.txt"
         flashcard_file = f"{base_name}_flashcards_OCR.json"
         upload_to_blob(summary_file, summary)
         upload_to_blob(flashcard_file, json.dumps(flashcards, indent=2, ensure_ascii=False))
-        save_to_cosmos({
+        document = {
             "id": base_name,
             "summary": summary,
             "flashcards": flashcards
-        })
+        }
+        save_to_cosmos(document)
         print(f"Azure upload successful for {base_name}")
     except Exception as e:
         print("Azure upload failed:", e)
+        return
     # -----------------------------------------------------------
+    # Only results stored in Cosmos are indexed, so the index can be rebuilt from it
+    try:
+        search_index.add_document(document)
+    except Exception as e:
+        print("Search indexing failed:", e)
+
+def prepare_batch_text(text, correct):
+    cleaned = clean_summary_text(text)
+    return correct_grammar(cleaned) if correct else cleaned
+
+def iter_flashcard_batch(documents, use_blooms=True, correct=True, budget=None):
+    """Yield one result per document, in the order they finish, then {"timing": ...}.
+
+    Cleaning and grammar correction run concurrently; then every chunk of every
+    document is summarized in one batched model pass, and each document's
+    flashcards (one batched QA pass each) are yielded as soon as they are ready.
+    """
+    budget = budget or budgets.get_budget()
+    timer = budgets.Timer(budget, sum(budgets.predict(doc['text'], budget, use_blooms) for doc in documents))
+    stamp = datetime.datetime.now(datetime.UTC).strftime("%Y%m%d%H%M%S")
+    with ThreadPoolExecutor(max_workers=app.config['BATCH_WORKERS']) as pool:
+        prepared = {pool.submit(prepare_batch_text, doc['text'], correct): i for i, doc in enumerate(documents)}
+        texts = {}
+        for future in as_completed(prepared):
+            i = prepared[future]
+            try:
+                texts[i] = future.result()
+            except Exception as e:
+                yield {'index': i, 'id': documents[i].get('id'), 'success': False, 'error': str(e)}
+
+        order = sorted(texts)
+        try:
+            summaries = dict(zip(order, generate_summaries([texts[i] for i in order], budget)))
+        except Exception as e:
+            # The shared summarization pass failed, so every document in it did
+            for i in order:
+                yield {'index': i, 'id': documents[i].get('id'), 'success': False, 'error': str(e)}
+            order = []
+
+        def flashcards_for(i):
+            flashcards = generate_flashcards(texts[i], summaries[i], use_blooms=use_blooms, budget=budget)
+            store_results(f"web_batch_{stamp}_{secure_filename(str(documents[i].get('id', i)))}",
+                          summaries[i], flashcards)
+            return flashcards
+
+        pending = {pool.submit(flashcards_for, i): i for i in order}
+        for future in as_completed(pending):
+            i = pending[future]
+            result = {'index': i, 'id': documents[i].get('id')}
+            try:
+                result.update(success=True, summary=summaries[i], flashcards=future.result())
+            except Exception as e:
+                result.update(success=False, error=str(e))
+            yield result
+    yield {'timing': timer.report()}
 
-    return jsonify({'success': True, 'summary': summary, 'flashcards': flashcards})
+@app.route('/generate_flashcards_batch', methods=['POST'])
+def generate_flashcards_batch_route():
+    """Body: {"documents": [{"id": ..., "text": ...} or "text", ...], "use_blooms": true,
+    "correct_grammar": true, "mode": "thorough"}.
+
+    Streams newline-delimited JSON, one line per document as it finishes, and a
+    last {"timing": ...} line.
+    """
+    data = request.get_json() or {}
+    documents = [doc if isinstance(doc, dict) else {'text': doc} for doc in data.get('documents') or []]
+    if not documents or not all(isinstance(doc.get('text'), str) and doc['text'].strip() for doc in documents):
+        return jsonify({'success': False, 'error': 'Provide "documents", each with non-empty text'}), 400
+    if len(documents) > app.config['BATCH_MAX_DOCUMENTS']:
+        return jsonify({'success': False, 'error': f"At most {app.config['BATCH_MAX_DOCUMENTS']} documents per batch"}), 400
+    try:
+        budget = budgets.get_budget(data.get('mode'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    results = iter_flashcard_batch(documents, use_blooms=data.get('use_blooms', True),
+                                   correct=data.get('correct_grammar', True), budget=budget)
+    return Response((json.dumps(result, ensure_ascii=False) + "\n" for result in results),
+                    mimetype='application/x-ndjson')
+
+@app.route('/search')
+def search_route():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'success': False, 'error': 'No query provided'})
+    try:
+        k = min(max(int(request.args.get('k', 10)), 1), 50)
+    except ValueError:
+        k = 10
+    try:
+        return jsonify({'success': True, 'results': search_index.search(query, k)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
 
 # --- Tile 3 integration ends here ---
 
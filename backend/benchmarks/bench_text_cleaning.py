@@ -0,0 +1,143 @@
+"""
+bench_text_cleaning.py - Microbenchmark of text_normalizer against the old cleaners
+
+The four cleaners that text_normalizer replaced are kept here verbatim as the
+reference. Every run first checks that each profile returns exactly the same
+text as its old function (on the corpus and on random noisy input), then times
+both on several input sizes. Needs no third-party packages.
+
+Usage (from backend/):
+    python -m benchmarks.bench_text_cleaning
+    python -m benchmarks.bench_text_cleaning --sizes 10000 2000000 --repeat 3
+"""
+
+import re
+import sys
+import time
+import random
+import argparse
+
+from benchmarks.run import setup_paths
+from benchmarks import corpus
+
+
+# --- The old cleaners, unchanged ---
+
+def legacy_ocr_clean_text(raw_text):
+    cleaned = re.sub(r'\s+', ' ', raw_text)
+    cleaned = cleaned.replace('|', 'I').replace('0', 'O')
+    cleaned = re.sub(r'[^\x00-\x7F]+', '', cleaned)
+    cleaned = re.sub(r'[^\w\s.,!?-]', '', cleaned)
+
+    lines = raw_text.splitlines()
+    paragraph = ""
+    paragraphs = []
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            if paragraph:
+                paragraphs.append(paragraph.strip())
+                paragraph = ""
+        elif len(line) < 60:
+            paragraph += " " + line
+        else:
+            if paragraph:
+                paragraphs.append(paragraph.strip())
+                paragraph = ""
+            paragraphs.append(line)
+
+    if paragraph:
+        paragraphs.append(paragraph.strip())
+
+    return "\n\n".join(paragraphs)
+
+
+def legacy_clean_text_general(text):
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'Page\s*\d+[:.]?', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'\b\d+\.', '', text)
+    text = re.sub(r'[•·]', '-', text)
+    text = re.sub(r'(\w)[.,](\w)', r'\1. \2', text)
+    text = re.sub(r'([a-z])([A-Z])', r'\1. \2', text)
+    return text.strip()
+
+
+def legacy_summary_clean_text(text):
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'Page\s*\d+[:.]?', '', text, flags=re.IGNORECASE)
+    return text.strip()
+
+
+LEGACY = {
+    "ocr": legacy_ocr_clean_text,
+    "pipeline": legacy_clean_text_general,
+    "summary": legacy_summary_clean_text,
+}
+
+
+# --- Inputs ---
+
+def ocr_like_text(n_chars):
+    # Short OCR lines with blank-line breaks and some long lines, like Vision output
+    text = corpus.make_text(n_chars)
+    lines = []
+    for i, sentence in enumerate(text.split(". ")):
+        lines.append(sentence if i % 7 == 0 else sentence[:55])
+        if i % 5 == 4:
+            lines.append("")
+    return "\n".join(lines)[:n_chars]
+
+
+def random_text(rng, n_chars):
+    alphabet = "aAbZ09 .,:\t\n\r|•·-PageGE  é"
+    return "".join(rng.choice(alphabet) for _ in range(n_chars))
+
+
+def check_equivalence(normalize, rounds=2000):
+    rng = random.Random(42)
+    samples = [corpus.make_text(5_000), ocr_like_text(5_000), "Page 12. a7.b Cat\r\n\r\nx", "aPage 3:7. end"]
+    samples += [random_text(rng, rng.randint(0, 80)) for _ in range(rounds)]
+    for sample in samples:
+        for profile, legacy in LEGACY.items():
+            expected = legacy(sample)
+            actual = normalize(sample, profile)
+            if actual != expected:
+                raise AssertionError(f"profile {profile!r} differs on {sample!r}: {actual!r} != {expected!r}")
+    return len(samples)
+
+
+def best_of(fn, text, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text_normalizer against the old cleaners")
+    parser.add_argument("--sizes", nargs="*", type=int, default=[10_000, 200_000, 2_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_paths()
+    from text_normalizer import normalize
+
+    checked = check_equivalence(normalize)
+    print(f"✅ Outputs identical to the old cleaners on {checked} inputs\n")
+
+    print(f"{'profile':<10}{'chars':>11}{'old ms':>11}{'new ms':>11}{'speedup':>10}")
+    for size in args.sizes:
+        for profile, legacy in LEGACY.items():
+            text = ocr_like_text(size) if profile == "ocr" else corpus.make_text(size)
+            old = best_of(legacy, text, args.repeat)
+            new = best_of(lambda t: normalize(t, profile), text, args.repeat)
+            print(f"{profile:<10}{size:>11}{old * 1000:>11.2f}{new * 1000:>11.2f}{old / new:>9.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
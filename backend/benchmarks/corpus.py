@@ -0,0 +1,94 @@
+"""
+corpus.py - Synthetic benchmark corpus (text, PDF, image, PPTX, audio)
+
+Every generator is deterministic so runs are comparable across machines.
+PDF and PPTX generation need PyMuPDF and python-pptx; the callers skip those
+cases when the libraries are missing.
+"""
+
+import io
+import struct
+import zlib
+
+from benchmarks.fakes import synthetic_lines, write_wav
+
+# name -> parameters for each corpus size
+SIZES = {
+    "small": {"chars": 2_000, "pages": 2, "slides": 5, "image": (800, 600), "seconds": 5},
+    "medium": {"chars": 20_000, "pages": 20, "slides": 50, "image": (1600, 1200), "seconds": 30},
+    "large": {"chars": 100_000, "pages": 100, "slides": 250, "image": (4000, 3000), "seconds": 120},
+}
+
+
+def make_text(n_chars, seed=b"edubot"):
+    parts = []
+    total = 0
+    page = 1
+    i = 0
+    while total < n_chars:
+        lines = synthetic_lines(seed + str(i).encode(), 6, words_per_line=12)
+        paragraph = " ".join(lines)
+        if i % 4 == 0:
+            paragraph = f"Page {page}: " + paragraph
+            page += 1
+        if i % 5 == 0:
+            paragraph = "• " + paragraph
+        parts.append(paragraph)
+        total += len(paragraph) + 2
+        i += 1
+    return "\n\n".join(parts)[:n_chars]
+
+
+def make_pdf(n_pages):
+    import fitz
+    doc = fitz.open()
+    for i in range(n_pages):
+        page = doc.new_page()
+        text = "\n".join(synthetic_lines(f"pdf-{i}".encode(), 40, words_per_line=10))
+        page.insert_textbox(fitz.Rect(36, 36, page.rect.width - 36, page.rect.height - 36), text, fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_png(width, height):
+    # Grayscale striped image: compresses like a real scanned page, no Pillow needed
+    row_pattern = bytes((x * 7) % 256 if (x // 16) % 2 else 255 for x in range(width))
+    blank = b"\xff" * width
+    raw = bytearray()
+    for y in range(height):
+        raw += b"\x00"
+        raw += row_pattern if (y // 12) % 3 else blank
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(bytes(raw), 6)) + chunk(b"IEND", b""))
+
+
+def make_pptx(n_slides):
+    from pptx import Presentation
+    from pptx.util import Inches
+    prs = Presentation()
+    layout = prs.slide_layouts[1]
+    for i in range(n_slides):
+        slide = prs.slides.add_slide(layout)
+        lines = synthetic_lines(f"slide-{i}".encode(), 6)
+        slide.shapes.title.text = lines[0]
+        slide.placeholders[1].text = "\n".join(lines[1:4])
+        table = slide.shapes.add_table(2, 2, Inches(1), Inches(5), Inches(6), Inches(1)).table
+        table.cell(0, 0).text = "Term"
+        table.cell(0, 1).text = "Definition"
+        table.cell(1, 0).text = lines[4].split()[0]
+        table.cell(1, 1).text = lines[4]
+        slide.notes_slide.notes_text_frame.text = lines[5]
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+
+def make_wav(path, seconds):
+    write_wav(path, seconds=seconds)
+    return path
@@ -0,0 +1,467 @@
+"""
+fakes.py - Offline stand-ins for the Azure services used by EduBot
+
+Vision OCR, Translator, Speech, Blob Storage and Cosmos DB are replaced with
+in-process fakes that sleep for a configurable latency and return realistic
+payloads. The heavy NLP models can optionally be replaced as well so the
+harness runs on machines without the model weights.
+
+Call install() BEFORE importing app.py or any tile module.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import types
+import wave
+import hashlib
+import threading
+import importlib
+
+# Seconds of simulated latency per call, overridable with --latency name=seconds
+LATENCY = {
+    "vision": 0.15,
+    "translator": 0.05,
+    "speech": 0.20,
+    "blob": 0.02,
+    "cosmos": 0.02,
+    "summarizer": 0.0,
+    "qa": 0.0,
+    "embedding": 0.0,
+    "grammar": 0.0,
+}
+
+FAKE_ENV = {
+    "VISION_KEY": "fake-vision-key",
+    "VISION_ENDPOINT": "https://fake-vision.local",
+    "SPEECH_KEY": "fake-speech-key",
+    "SPEECH_REGION": "fakeregion",
+    "TRANSLATOR_KEY": "fake-translator-key",
+    "TRANSLATOR_REGION": "fakeregion",
+    "TRANSLATOR_ENDPOINT": "https://fake-translator.local",
+    "AZURE_BLOB_CONN_STR": "UseDevelopmentStorage=true",
+    "BLOB_RESULTS_CONTAINER": "results",
+    "BLOB_UPLOAD_CONTAINER": "uploads",
+    "AZURE_COSMOS_ENDPOINT": "https://fake-cosmos.local",
+    "AZURE_COSMOS_KEY": "fake-cosmos-key",
+    "COSMOS_DATABASE": "edubot",
+    "COSMOS_CONTAINER": "results",
+}
+
+WORDS = (
+    "photosynthesis converts light energy into chemical energy stored in glucose "
+    "the mitochondria produce adenosine triphosphate through cellular respiration "
+    "newton described motion with three laws relating force mass and acceleration "
+    "an algorithm is a finite sequence of instructions that solves a problem "
+    "supply and demand determine the equilibrium price in a competitive market "
+    "the french revolution reshaped european politics during the late eighteenth century"
+).split()
+
+CALLS = {}
+# Request body bytes per service (OCR payload size after image_prep)
+SENT_BYTES = {}
+_calls_lock = threading.Lock()
+
+
+def _count(service, sent=0):
+    with _calls_lock:
+        CALLS[service] = CALLS.get(service, 0) + 1
+        SENT_BYTES[service] = SENT_BYTES.get(service, 0) + sent
+    return LATENCY.get(service, 0.0)
+
+
+def _sleep(service):
+    delay = _count(service)
+    if delay > 0:
+        time.sleep(delay)
+
+
+def synthetic_lines(seed, count, words_per_line=9):
+    digest = int(hashlib.md5(seed).hexdigest(), 16)
+    lines = []
+    for i in range(count):
+        start = (digest + i * 7) % len(WORDS)
+        words = [WORDS[(start + j) % len(WORDS)] for j in range(words_per_line)]
+        if i % 11 == 0:
+            words.append("|0")  # typical OCR confusions
+        lines.append(" ".join(words).capitalize() + ".")
+    return lines
+
+
+# --- HTTP services (Vision OCR, Translator) ---
+
+def fake_ocr_response(image_bytes):
+    # Roughly one OCR line per 2 KB of image, like a dense scanned page
+    count = max(3, min(60, len(image_bytes) // 2048))
+    lines = synthetic_lines(image_bytes[:4096], count)
+    return {
+        "language": "en",
+        "regions": [{
+            "lines": [{"boundingBox": f"40,{40 + 36 * i},1200,32", "words": [{"text": w} for w in line.split()]}
+                      for i, line in enumerate(lines)]
+        }]
+    }
+
+
+async def fake_send(service, method, url, params, headers, data, body_json):
+    # Replaces cognitive_client._send: the request still goes through its limiter and retries
+    if "fake-vision" in url:
+        payload = fake_ocr_response(bytes(data or b""))
+    elif "fake-translator" in url:
+        payload = [{"translations": [{"text": item["text"]}]} for item in body_json or []]
+    else:
+        raise RuntimeError(f"Unexpected outbound request in benchmark: {url}")
+    delay = _count(service.name, len(data or b"") or len(json.dumps(body_json or "")))
+    if delay > 0:
+        await asyncio.sleep(delay)
+    return 200, {"Content-Type": "application/json"}, json.dumps(payload).encode("utf-8")
+
+
+# --- Speech SDK ---
+
+def _wav_duration(path):
+    try:
+        with wave.open(path, "rb") as wav:
+            return wav.getnframes() / float(wav.getframerate())
+    except Exception:
+        return 1.0
+
+
+def _build_speech_module():
+    speechsdk = types.ModuleType("azure.cognitiveservices.speech")
+
+    class ResultReason:
+        RecognizedSpeech = "RecognizedSpeech"
+        NoMatch = "NoMatch"
+        Canceled = "Canceled"
+        SynthesizingAudioCompleted = "SynthesizingAudioCompleted"
+
+    class CancellationReason:
+        Error = "Error"
+        EndOfStream = "EndOfStream"
+
+    class _Signal:
+        def __init__(self):
+            self._callbacks = []
+
+        def connect(self, callback):
+            self._callbacks.append(callback)
+
+        def fire(self, evt):
+            for callback in self._callbacks:
+                callback(evt)
+
+    class _Result:
+        def __init__(self, reason, text=""):
+            self.reason = reason
+            self.text = text
+            self.cancellation_details = None
+
+    class _Event:
+        def __init__(self, result=None):
+            self.result = result
+
+    class SpeechConfig:
+        def __init__(self, subscription=None, region=None, **kwargs):
+            self.subscription = subscription
+            self.region = region
+            self.speech_synthesis_voice_name = None
+
+    class AudioConfig:
+        def __init__(self, filename=None, stream=None, **kwargs):
+            self.filename = filename
+            self.stream = stream
+
+    class SpeechRecognizer:
+        def __init__(self, speech_config=None, audio_config=None, **kwargs):
+            self.audio_config = audio_config
+            self.recognized = _Signal()
+            self.session_stopped = _Signal()
+            self.canceled = _Signal()
+            self._thread = None
+
+        def _utterances(self):
+            filename = getattr(self.audio_config, "filename", None)
+            seconds = _wav_duration(filename) if filename else 1.0
+            return synthetic_lines(str(seconds).encode(), max(1, int(seconds // 5)))
+
+        def _run(self):
+            for text in self._utterances():
+                _sleep("speech")
+                self.recognized.fire(_Event(_Result(ResultReason.RecognizedSpeech, text)))
+            self.session_stopped.fire(_Event())
+
+        def start_continuous_recognition(self):
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+        def stop_continuous_recognition(self):
+            if self._thread:
+                self._thread.join()
+
+        def recognize_once(self):
+            _sleep("speech")
+            return _Result(ResultReason.RecognizedSpeech, self._utterances()[0])
+
+    class _Future:
+        def __init__(self, result):
+            self._result = result
+
+        def get(self):
+            return self._result
+
+    class SpeechSynthesizer:
+        def __init__(self, speech_config=None, audio_config=None, **kwargs):
+            self.audio_config = audio_config
+
+        def speak_text_async(self, text):
+            _sleep("speech")
+            filename = getattr(self.audio_config, "filename", None)
+            if filename:
+                write_wav(filename, seconds=max(0.5, len(text) / 80.0))
+            return _Future(_Result(ResultReason.SynthesizingAudioCompleted))
+
+    speechsdk.ResultReason = ResultReason
+    speechsdk.CancellationReason = CancellationReason
+    speechsdk.SpeechConfig = SpeechConfig
+    speechsdk.AudioConfig = AudioConfig
+    speechsdk.SpeechRecognizer = SpeechRecognizer
+    speechsdk.SpeechSynthesizer = SpeechSynthesizer
+    speechsdk.audio = types.SimpleNamespace(AudioOutputConfig=AudioConfig, AudioConfig=AudioConfig)
+    return speechsdk
+
+
+def write_wav(path, seconds=1.0, rate=16000):
+    frames = int(seconds * rate)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\x00\x00" * frames)
+
+
+# --- Blob Storage and Cosmos DB ---
+
+BLOBS = {}
+COSMOS_ITEMS = {}
+_store_lock = threading.Lock()
+
+
+def _build_blob_module():
+    blob = types.ModuleType("azure.storage.blob")
+
+    class _Downloader:
+        def __init__(self, data):
+            self._data = data
+
+        def readall(self):
+            return self._data
+
+    class BlobClient:
+        def __init__(self, container, blob_name):
+            self.key = (container, blob_name)
+
+        def upload_blob(self, data, overwrite=False, **kwargs):
+            _sleep("blob")
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+            with _store_lock:
+                if self.key in BLOBS and not overwrite:
+                    raise RuntimeError(f"Blob already exists: {self.key}")
+                BLOBS[self.key] = bytes(data)
+
+        def download_blob(self, **kwargs):
+            _sleep("blob")
+            with _store_lock:
+                return _Downloader(BLOBS[self.key])
+
+    class BlobServiceClient:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        @classmethod
+        def from_connection_string(cls, conn_str, **kwargs):
+            return cls()
+
+        def get_blob_client(self, container, blob):
+            return BlobClient(container, blob)
+
+    blob.BlobServiceClient = BlobServiceClient
+    blob.BlobClient = BlobClient
+    return blob
+
+
+def _build_cosmos_module():
+    cosmos = types.ModuleType("azure.cosmos")
+
+    class ContainerProxy:
+        def __init__(self, name):
+            self.name = name
+
+        def upsert_item(self, body, **kwargs):
+            _sleep("cosmos")
+            with _store_lock:
+                COSMOS_ITEMS[(self.name, body["id"])] = dict(body)
+            return body
+
+        def read_item(self, item, partition_key=None, **kwargs):
+            _sleep("cosmos")
+            with _store_lock:
+                return dict(COSMOS_ITEMS[(self.name, item)])
+
+        def read_all_items(self, **kwargs):
+            _sleep("cosmos")
+            with _store_lock:
+                items = [dict(v) for (name, _), v in COSMOS_ITEMS.items() if name == self.name]
+            return iter(items)
+
+    class DatabaseProxy:
+        def get_container_client(self, name):
+            return ContainerProxy(name)
+
+    class CosmosClient:
+        def __init__(self, url=None, credential=None, **kwargs):
+            pass
+
+        def get_database_client(self, name):
+            return DatabaseProxy()
+
+    cosmos.CosmosClient = CosmosClient
+    return cosmos
+
+
+# --- Optional model stand-ins ---
+
+def _build_transformers_module():
+    transformers = types.ModuleType("transformers")
+
+    def _summarize(text, max_length=150, min_length=40, **kwargs):
+        words = text.split()
+        return {"summary_text": " ".join(words[:max(min_length, min(max_length, len(words) // 4))])}
+
+    def _answer(question, context):
+        words = context.split()
+        key = int(hashlib.md5(question.encode()).hexdigest(), 16)
+        start = key % max(1, len(words) - 6)
+        return {"score": 0.2 + (key % 70) / 100.0, "answer": " ".join(words[start:start + 6]),
+                "start": 0, "end": 0}
+
+    class _Pipeline:
+        def __init__(self, task):
+            self.task = task
+
+        def __call__(self, *args, **kwargs):
+            if self.task == "summarization":
+                texts = args[0]
+                single = isinstance(texts, str)
+                items = [texts] if single else list(texts)
+                _sleep("summarizer")  # one model pass per call, batched or not
+                results = []
+                for text in items:
+                    results.append([_summarize(text, **kwargs)] if single else _summarize(text, **kwargs))
+                return results[0] if single else results
+            question = kwargs.get("question")
+            context = kwargs.get("context")
+            if isinstance(question, str):
+                _sleep("qa")
+                return _answer(question, context)
+            contexts = context if isinstance(context, list) else [context] * len(question)
+            _sleep("qa")
+            out = [_answer(q, c) for q, c in zip(question, contexts)]
+            return out[0] if len(out) == 1 else out
+
+    def pipeline(task, model=None, **kwargs):
+        return _Pipeline(task)
+
+    transformers.pipeline = pipeline
+    return transformers
+
+
+def _build_sentence_transformers_module():
+    import numpy as np
+    sentence_transformers = types.ModuleType("sentence_transformers")
+
+    class SentenceTransformer:
+        def __init__(self, name, **kwargs):
+            self.name = name
+
+        def encode(self, sentences, **kwargs):
+            single = isinstance(sentences, str)
+            items = [sentences] if single else list(sentences)
+            vecs = np.zeros((len(items), 384), dtype="float32")
+            _sleep("embedding")
+            for i, sent in enumerate(items):
+                for token in sent.lower().split():
+                    vecs[i, int(hashlib.md5(token.encode()).hexdigest(), 16) % 384] += 1.0
+                norm = np.linalg.norm(vecs[i])
+                if norm:
+                    vecs[i] /= norm
+            return vecs[0] if single else vecs
+
+    sentence_transformers.SentenceTransformer = SentenceTransformer
+    return sentence_transformers
+
+
+def _build_language_tool_module():
+    language_tool_python = types.ModuleType("language_tool_python")
+
+    class LanguageTool:
+        def __init__(self, language, **kwargs):
+            self.language = language
+
+        def check(self, text):
+            _sleep("grammar")
+            return []
+
+        def close(self):
+            pass
+
+    language_tool_python.LanguageTool = LanguageTool
+    language_tool_python.utils = types.SimpleNamespace(correct=lambda text, matches: text)
+    return language_tool_python
+
+
+# --- Installation ---
+
+def _ensure_package(name):
+    if name in sys.modules:
+        return
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        module = types.ModuleType(name)
+        module.__path__ = []
+        sys.modules[name] = module
+
+
+def _register(name, module):
+    parent, _, child = name.rpartition(".")
+    if parent:
+        _ensure_package(parent)
+        setattr(sys.modules[parent], child, module)
+    sys.modules[name] = module
+
+
+def install(fake_models=False, latency=None):
+    """Route every Azure call (and optionally every model) to the fakes."""
+    if latency:
+        LATENCY.update(latency)
+    for key, value in FAKE_ENV.items():
+        os.environ[key] = value
+
+    _ensure_package("azure")
+    _ensure_package("azure.storage")
+    _ensure_package("azure.cognitiveservices")
+    _register("azure.cognitiveservices.speech", _build_speech_module())
+    _register("azure.storage.blob", _build_blob_module())
+    _register("azure.cosmos", _build_cosmos_module())
+
+    import cognitive_client
+    cognitive_client._send = fake_send
+
+    if fake_models:
+        _register("transformers", _build_transformers_module())
+        _register("sentence_transformers", _build_sentence_transformers_module())
+        _register("language_tool_python", _build_language_tool_module())
@@ -0,0 +1,100 @@
+"""
+import_profile.py - Import-time profile of app.py
+
+Starts a fresh interpreter with `-X importtime`, imports app.py, serves the
+template routes once and reports the slowest imports plus any heavy libraries
+that were pulled in at startup (they should all be lazy).
+
+Usage (from backend/):
+    python -m benchmarks.import_profile
+    python -m benchmarks.import_profile --top 30
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Libraries that must only be imported when a request actually needs them
+HEAVY_MODULES = [
+    "torch", "transformers", "sentence_transformers", "sklearn", "nltk", "fitz", "pptx",
+    "language_tool_python", "azure.cognitiveservices.speech", "azure.storage.blob", "azure.cosmos",
+]
+
+BOOTSTRAP = """
+import sys, time, json
+start = time.perf_counter()
+sys.path.insert(0, {backend!r})
+from benchmarks.run import setup_paths
+setup_paths()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+for route in ('/', '/tile1', '/tile2', '/tile3', '/tile4'):
+    assert client.get(route).status_code == 200, route
+served = time.perf_counter()
+print(json.dumps({{"import_s": imported - start, "first_response_s": served - start,
+                  "modules": sorted(sys.modules)}}))
+"""
+
+
+def profile_startup(importtime=True):
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", BOOTSTRAP.format(backend=BACKEND_DIR)]
+    proc = subprocess.run(cmd, cwd=BACKEND_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "startup failed")
+    summary = json.loads(proc.stdout.strip().splitlines()[-1])
+    summary["imports"] = parse_importtime(proc.stderr) if importtime else []
+    modules = set(summary.pop("modules"))
+    summary["heavy_modules_loaded"] = [m for m in HEAVY_MODULES if m in modules]
+    return summary
+
+
+def parse_importtime(stderr):
+    # Lines look like: "import time:       412 |       1290 |   package.module"
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        name = fields[2].rstrip()
+        imports.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_ms": int(fields[0]) / 1000.0,
+            "cumulative_ms": int(fields[1]) / 1000.0,
+        })
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile app.py import time")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest top-level imports to show")
+    args = parser.parse_args()
+
+    summary = profile_startup()
+    top_level = [i for i in summary["imports"] if i["depth"] == 0]
+    top_level.sort(key=lambda i: -i["cumulative_ms"])
+
+    print(f"import app:            {summary['import_s'] * 1000:8.1f} ms")
+    print(f"first template served: {summary['first_response_s'] * 1000:8.1f} ms")
+    print("\nSlowest top-level imports:")
+    for item in top_level[:args.top]:
+        print(f"  {item['cumulative_ms']:9.1f} ms  {item['module']}")
+    if summary["heavy_modules_loaded"]:
+        print(f"\n❌ Heavy modules imported at startup: {', '.join(summary['heavy_modules_loaded'])}")
+        return 1
+    print("\n✅ No heavy modules imported at startup")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+memory_profile.py - Peak RSS versus document size for PDF uploads
+
+Processes generated PDFs of increasing page counts against the offline fakes,
+each in a fresh process, once returning the full texts ("full") and once
+without them ("streaming", what large uploads get by default). Reports peak
+RSS growth over a warmed-up process and the fitted MB per 100 pages; a
+streaming slope above --max-slope fails the run.
+
+Usage (from backend/):
+    python -m benchmarks.memory_profile --fake-models
+    python -m benchmarks.memory_profile --fake-models --pages 50 200 1000 --max-slope 2
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+
+from benchmarks.run import BACKEND_DIR, setup_paths, peak_rss_mb, parse_latency
+
+MODES = {
+    "full": ("raw_text", "cleaned_text", "corrected_text"),
+    "streaming": (),
+}
+
+
+def _child(pdf_path, warmup_path, mode, options, queue):
+    os.chdir(BACKEND_DIR)
+    setup_paths()
+    from benchmarks import fakes
+    result = {"mode": mode}
+    try:
+        fakes.install(fake_models=options["fake_models"], latency=options["latency"])
+        with tempfile.TemporaryDirectory() as workdir:
+            os.environ["EDUBOT_DATA_DIR"] = os.path.join(workdir, "data")
+            os.environ["EDUBOT_CHUNK_CACHE"] = "0"
+            from tile_1 import ocr_summarizer
+            # Imports and models are loaded by a one-page run, so the growth is the document's
+            ocr_summarizer.process_pdf_bytes(warmup_path, fields=MODES[mode])
+            before = peak_rss_mb()
+            start = time.perf_counter()
+            output = ocr_summarizer.process_pdf_bytes(pdf_path, fields=MODES[mode])
+            result["seconds"] = round(time.perf_counter() - start, 2)
+            result["baseline_rss_mb"] = round(before, 1)
+            result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+            result["growth_mb"] = round(result["peak_rss_mb"] - result["baseline_rss_mb"], 1)
+            result["response_mb"] = round(len(json.dumps(output)) / (1024.0 * 1024.0), 2)
+    except ImportError as e:
+        result["skipped"] = f"missing dependency: {e.name or e}"
+    except Exception as e:
+        result["failed"] = repr(e)
+    queue.put(result)
+
+
+def run_isolated(pdf_path, warmup_path, mode, options):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(pdf_path, warmup_path, mode, options, queue))
+    proc.start()
+    try:
+        result = queue.get()
+    finally:
+        proc.join()
+    return result
+
+
+def slope_per_100_pages(results):
+    """Least-squares MB of RSS growth per 100 pages."""
+    points = [(r["pages"], r["growth_mb"]) for r in results if "growth_mb" in r]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    if not var:
+        return None
+    return 100 * sum((x - mean_x) * (y - mean_y) for x, y in points) / var
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS versus PDF size")
+    parser.add_argument("--pages", nargs="*", type=int, default=[10, 50, 200], help="Page counts to process")
+    parser.add_argument("--modes", nargs="*", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--fake-models", action="store_true", help="Replace BART/RoBERTa/MiniLM/LanguageTool with fakes")
+    parser.add_argument("--latency", action="append", help="Fake service latency, e.g. vision=0.3 (repeatable)")
+    parser.add_argument("--max-slope", type=float, help="Fail if streaming grows more than this many MB per 100 pages")
+    parser.add_argument("--output", help="Write raw results as JSON to this path")
+    args = parser.parse_args()
+
+    from benchmarks import corpus
+    options = {"fake_models": args.fake_models, "latency": parse_latency(args.latency)}
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        warmup_path = os.path.join(workdir, "warmup.pdf")
+        with open(warmup_path, "wb") as f:
+            f.write(corpus.make_pdf(1))
+        for pages in args.pages:
+            pdf_path = os.path.join(workdir, f"book-{pages}.pdf")
+            with open(pdf_path, "wb") as f:
+                f.write(corpus.make_pdf(pages))
+            for mode in args.modes:
+                print(f"📄 {pages} pages [{mode}]", flush=True)
+                result = run_isolated(pdf_path, warmup_path, mode, options)
+                result["pages"] = pages
+                results.append(result)
+            os.remove(pdf_path)
+
+    print()
+    header = f"{'pages':>7}  {'mode':<10}{'seconds':>9}{'peak MB':>10}{'growth MB':>11}{'response MB':>13}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        if "skipped" in r or "failed" in r:
+            print(f"{r['pages']:>7}  {r['mode']:<10}  {r.get('skipped') or r.get('failed')}")
+            continue
+        print(f"{r['pages']:>7}  {r['mode']:<10}{r['seconds']:>9.2f}{r['peak_rss_mb']:>10.1f}"
+              f"{r['growth_mb']:>11.1f}{r['response_mb']:>13.2f}")
+
+    slopes = {mode: slope_per_100_pages([r for r in results if r["mode"] == mode]) for mode in args.modes}
+    print()
+    for mode, slope in slopes.items():
+        print(f"{mode}: {'-' if slope is None else f'{slope:.2f}'} MB per 100 pages")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({"results": results, "mb_per_100_pages": slopes}, f, indent=2)
+    streaming = slopes.get("streaming")
+    if args.max_slope is not None and streaming is not None and streaming > args.max_slope:
+        print(f"\n❌ Streaming RSS grows {streaming:.2f} MB per 100 pages (limit {args.max_slope})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,427 @@
+"""
+run.py - End-to-end benchmark harness for EduBot
+
+Runs each scenario in a fresh process against the offline Azure fakes and
+reports throughput, p50/p95/p99 latency and peak RSS. Results can be saved as
+a named baseline and later compared to detect regressions.
+
+Usage (from backend/):
+    python -m benchmarks.run --fake-models
+    python -m benchmarks.run --sizes small medium --save-baseline main
+    python -m benchmarks.run --compare main --threshold 0.15
+    python -m benchmarks.run --only routes. --latency vision=0.3
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import resource
+import platform
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    def register(setup):
+        SCENARIOS[name] = setup
+        return setup
+    return register
+
+
+def setup_paths():
+    # Same layout app.py uses; the Functions folder goes last so that
+    # "summarizer" resolves to summarizer/summarizer.py, not the Function package
+    tile_3 = os.path.join(BACKEND_DIR, 'tile_3', 'edubot_blob_cosmos')
+    for path in [BACKEND_DIR,
+                 os.path.join(BACKEND_DIR, 'tile_1'),
+                 os.path.join(tile_3, 'summarizer'),
+                 os.path.join(tile_3, 'flashcard_generator'),
+                 os.path.join(BACKEND_DIR, 'tile_4'),
+                 tile_3]:
+        if path not in sys.path:
+            sys.path.append(path)
+
+
+# --- Scenarios: setup(size, workdir) returns a zero-argument callable ---
+
+@scenario("ocr.process_pdf_bytes")
+def _process_pdf(size, workdir):
+    from benchmarks import corpus
+    from tile_1 import ocr_summarizer
+    data = corpus.make_pdf(corpus.SIZES[size]["pages"])
+    return lambda: ocr_summarizer.process_pdf_bytes(data)
+
+
+@scenario("ocr.process_image_bytes")
+def _process_image(size, workdir):
+    from benchmarks import corpus
+    from tile_1 import ocr_summarizer
+    data = corpus.make_png(*corpus.SIZES[size]["image"])
+    return lambda: ocr_summarizer.process_image_bytes(data)
+
+
+@scenario("ocr.process_pptx_text")
+def _process_pptx(size, workdir):
+    from benchmarks import corpus
+    from tile_1 import ocr_summarizer
+    data = corpus.make_pptx(corpus.SIZES[size]["slides"])
+    return lambda: ocr_summarizer.process_pptx_text(data)
+
+
+@scenario("summarizer.generate_summary")
+def _generate_summary(size, workdir):
+    from benchmarks import corpus
+    from summarizer import generate_summary
+    text = corpus.make_text(corpus.SIZES[size]["chars"])
+    return lambda: generate_summary(text)
+
+
+@scenario("flashcards.generate_flashcards")
+def _generate_flashcards(size, workdir):
+    from benchmarks import corpus
+    from summarizer import generate_summary
+    from flashcard_generator import generate_flashcards
+    text = corpus.make_text(corpus.SIZES[size]["chars"])
+    summary = generate_summary(text)
+    return lambda: generate_flashcards(text, summary, use_blooms=True)
+
+
+@scenario("pipeline.process_text")
+def _process_text(size, workdir):
+    from benchmarks import corpus
+    from main_pipeline import process_text
+    text = corpus.make_text(corpus.SIZES[size]["chars"])
+    return lambda: process_text(text)
+
+
+@scenario("startup.import_app")
+def _import_app(size, workdir):
+    # Fresh interpreter per iteration: import app.py and serve every template route
+    from benchmarks.import_profile import profile_startup
+
+    def call():
+        summary = profile_startup(importtime=False)
+        if summary["heavy_modules_loaded"]:
+            raise RuntimeError(f"heavy imports at startup: {summary['heavy_modules_loaded']}")
+        return summary
+    return call
+
+
+def _client():
+    from app import app
+    app.config['TESTING'] = True
+    return app.test_client()
+
+
+def _check(response):
+    if response.status_code >= 400:
+        raise RuntimeError(f"HTTP {response.status_code}")
+    return response
+
+
+@scenario("routes.index")
+def _route_index(size, workdir):
+    client = _client()
+    return lambda: _check(client.get('/'))
+
+
+@scenario("routes.ocr_summarize")
+def _route_ocr(size, workdir):
+    from benchmarks import corpus
+    client = _client()
+    data = corpus.make_pdf(corpus.SIZES[size]["pages"])
+
+    def call():
+        import io
+        return _check(client.post('/ocr_summarize', content_type='multipart/form-data',
+                                  data={'file': (io.BytesIO(data), 'upload.pdf')}))
+    return call
+
+
+@scenario("routes.generate_flashcards")
+def _route_flashcards(size, workdir):
+    from benchmarks import corpus
+    client = _client()
+    text = corpus.make_text(corpus.SIZES[size]["chars"])
+    return lambda: _check(client.post('/generate_flashcards', json={'text': text}))
+
+
+@scenario("routes.generate_flashcards_batch")
+def _route_flashcards_batch(size, workdir):
+    # Ten documents of the size's text length in one request (compare with ten routes.generate_flashcards calls)
+    from benchmarks import corpus
+    client = _client()
+    documents = [{'id': i, 'text': corpus.make_text(corpus.SIZES[size]["chars"], seed=b"batch-%d" % i)}
+                 for i in range(10)]
+
+    def call():
+        response = _check(client.post('/generate_flashcards_batch', json={'documents': documents}))
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        lines = [line for line in lines if 'index' in line]
+        if len(lines) != len(documents) or not all(line['success'] for line in lines):
+            raise RuntimeError("batch returned failed documents")
+        return response
+    return call
+
+
+@scenario("routes.transcribe")
+def _route_transcribe(size, workdir):
+    from benchmarks import corpus
+    client = _client()
+    path = corpus.make_wav(os.path.join(workdir, "lecture.wav"), corpus.SIZES[size]["seconds"])
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    def call():
+        import io
+        return _check(client.post('/transcribe', content_type='multipart/form-data',
+                                  data={'audio': (io.BytesIO(data), 'lecture.wav')}))
+    return call
+
+
+@scenario("routes.tts")
+def _route_tts(size, workdir):
+    from benchmarks import corpus
+    client = _client()
+    text = corpus.make_text(min(2_000, corpus.SIZES[size]["chars"]))
+    return lambda: _check(client.post('/tts', json={'text': text, 'language': 'hi'}))
+
+
+# --- Measurement ---
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / (1024.0 * 1024.0) if platform.system() == "Darwin" else peak / 1024.0
+
+
+def measure(fn, iterations, concurrency, warmup=1):
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    errors = []
+
+    def timed(_):
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            errors.append(repr(e))
+            return
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(iterations)))
+    wall = time.perf_counter() - start
+
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "throughput_per_s": len(latencies) / wall if wall > 0 else None,
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000.0, 2)
+
+
+def _child(name, size, options, queue):
+    os.chdir(BACKEND_DIR)
+    setup_paths()
+    from benchmarks import fakes
+    result = {"scenario": name, "size": size}
+    try:
+        fakes.install(fake_models=options["fake_models"], latency=options["latency"])
+        with tempfile.TemporaryDirectory() as workdir:
+            # Keep stores out of the real data dir, and time full runs rather than chunk_store hits
+            os.environ["EDUBOT_DATA_DIR"] = os.path.join(workdir, "data")
+            os.environ["EDUBOT_CHUNK_CACHE"] = "0"
+            if options["inference_server"]:
+                _start_inference_server(workdir, options)
+            fn = SCENARIOS[name](size, workdir)
+            result.update(measure(fn, options["iterations"], options["concurrency"]))
+    except ImportError as e:
+        result["skipped"] = f"missing dependency: {e.name or e}"
+    except Exception as e:
+        result["failed"] = repr(e)
+    result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    result["service_calls"] = dict(fakes.CALLS)
+    result["service_bytes"] = dict(fakes.SENT_BYTES)
+    queue.put(result)
+
+
+def _start_inference_server(workdir, options):
+    # Models (real or fake) live in a separate batching process, as in serve.py
+    import secrets
+    import functools
+    from benchmarks import fakes
+    from inference_server import start_server_process
+    address = os.path.join(workdir, "inference.sock")
+    os.environ["EDUBOT_INFERENCE_ADDRESS"] = address
+    authkey = secrets.token_hex(16)
+    os.environ["EDUBOT_INFERENCE_AUTHKEY"] = authkey
+    init = functools.partial(fakes.install, fake_models=options["fake_models"], latency=options["latency"])
+    start_server_process(address, authkey.encode(), init=init)
+
+
+def run_isolated(name, size, options):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(name, size, options, queue))
+    proc.start()
+    try:
+        result = queue.get()
+    finally:
+        proc.join()
+    return result
+
+
+# --- Baselines ---
+
+def _key(result):
+    return f"{result['scenario']}[{result['size']}]"
+
+
+def save_baseline(name, results):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    path = os.path.join(BASELINE_DIR, f"{name}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                   "results": {_key(r): r for r in results}}, f, indent=2)
+    return path
+
+
+def compare(name, results, threshold):
+    path = os.path.join(BASELINE_DIR, f"{name}.json")
+    with open(path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)["results"]
+
+    regressions = []
+    for result in results:
+        old = baseline.get(_key(result))
+        if not old or "p95_ms" not in result or "p95_ms" not in old:
+            continue
+        checks = [
+            ("p95_ms", result["p95_ms"], old["p95_ms"], True),
+            ("throughput_per_s", result["throughput_per_s"], old["throughput_per_s"], False),
+            ("peak_rss_mb", result["peak_rss_mb"], old["peak_rss_mb"], True),
+        ]
+        for metric, new_value, old_value, lower_is_better in checks:
+            if not new_value or not old_value:
+                continue
+            change = (new_value - old_value) / old_value
+            if (change if lower_is_better else -change) > threshold:
+                regressions.append((_key(result), metric, old_value, new_value, change))
+    return regressions
+
+
+def print_table(results):
+    header = f"{'scenario':<42}{'ops/s':>9}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'rss MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        if "skipped" in r or "failed" in r:
+            print(f"{_key(r):<42}  {r.get('skipped') or r.get('failed')}")
+            continue
+        ops = f"{r['throughput_per_s']:.2f}" if r["throughput_per_s"] else "-"
+        print(f"{_key(r):<42}{ops:>9}{_fmt(r['p50_ms']):>11}{_fmt(r['p95_ms']):>11}"
+              f"{_fmt(r['p99_ms']):>11}{r['peak_rss_mb']:>9.1f}")
+        if r["errors"]:
+            print(f"    {r['errors']} errors, first: {r['first_error']}")
+        ocr_calls = r.get("service_calls", {}).get("vision")
+        if ocr_calls:
+            sent = r.get("service_bytes", {}).get("vision", 0)
+            print(f"    OCR: {ocr_calls} images, {sent / ocr_calls / 1024:.1f} KB per image")
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+def parse_latency(pairs):
+    latency = {}
+    for pair in pairs or []:
+        service, _, seconds = pair.partition("=")
+        latency[service.strip()] = float(seconds)
+    return latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark EduBot against offline Azure fakes")
+    parser.add_argument("--only", nargs="*", default=None, help="Scenario name prefixes to run")
+    parser.add_argument("--sizes", nargs="*", default=["small", "medium"], help="Corpus sizes: small medium large")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--fake-models", action="store_true", help="Replace BART/RoBERTa/MiniLM/LanguageTool with fakes")
+    parser.add_argument("--latency", action="append", help="Fake service latency, e.g. vision=0.3 (repeatable)")
+    parser.add_argument("--inference-server", action="store_true", help="Run models in the batching inference server")
+    parser.add_argument("--output", help="Write raw results as JSON to this path")
+    parser.add_argument("--save-baseline", help="Save results as a named baseline")
+    parser.add_argument("--compare", help="Compare results with a named baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative regression")
+    parser.add_argument("--list", action="store_true", help="List scenarios and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(SCENARIOS))
+        return 0
+
+    options = {
+        "iterations": args.iterations,
+        "concurrency": args.concurrency,
+        "fake_models": args.fake_models,
+        "latency": parse_latency(args.latency),
+        "inference_server": args.inference_server,
+    }
+    names = [n for n in SCENARIOS if not args.only or any(n.startswith(p) for p in args.only)]
+    results = []
+    for name in names:
+        for size in args.sizes:
+            print(f"⏱️  {name} [{size}]", flush=True)
+            results.append(run_isolated(name, size, options))
+
+    print()
+    print_table(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        print(f"\n✅ Baseline saved to: {save_baseline(args.save_baseline, results)}")
+    if args.compare:
+        regressions = compare(args.compare, results, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) against baseline '{args.compare}':")
+            for key, metric, old, new, change in regressions:
+                print(f"    {key} {metric}: {old} -> {new} ({change:+.0%})")
+            return 1
+        print(f"\n✅ No regressions against baseline '{args.compare}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
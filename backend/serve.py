@@ -0,0 +1,137 @@
+"""
+serve.py - Production entry point for the EduBot web app
+
+Runs app.py under gunicorn instead of the Flask debug server:
+1. The app and every model are loaded once in the master process, then the
+   workers are forked so the model weights are shared copy-on-write
+2. Worker processes (CPU-bound inference) and threads per worker (I/O-bound
+   routes: templates, uploads, Azure calls) are configured separately
+3. `kill -HUP <master pid>` replaces workers gracefully: old workers finish
+   their in-flight jobs (up to EDUBOT_GRACEFUL_TIMEOUT) before exiting
+4. With EDUBOT_INFERENCE_SERVER=1 the models live in one model-serving process
+   (inference_server.py) that batches requests from all workers instead; it
+   is stopped when the master exits
+
+Usage (from backend/):
+    python serve.py
+    EDUBOT_INFERENCE_WORKERS=4 EDUBOT_IO_THREADS=16 python serve.py
+
+To deploy new code without dropping requests, send USR2 (starts a new master
+with the new code) followed by WINCH and QUIT to the old master.
+"""
+
+import os
+import gc
+import atexit
+import subprocess
+import multiprocessing
+from gunicorn.app.base import BaseApplication
+
+BIND = os.getenv("EDUBOT_BIND", "0.0.0.0:8000")
+# Processes that can run model inference in parallel (one CPU-bound job each by default)
+INFERENCE_WORKERS = int(os.getenv("EDUBOT_INFERENCE_WORKERS", "2"))
+# Threads per worker serving I/O-bound requests alongside inference
+IO_THREADS = int(os.getenv("EDUBOT_IO_THREADS", "8"))
+PRELOAD_MODELS = os.getenv("EDUBOT_PRELOAD_MODELS", "1") == "1"
+INFERENCE_SERVER = os.getenv("EDUBOT_INFERENCE_SERVER", "0") == "1"
+WORKER_TIMEOUT = int(os.getenv("EDUBOT_WORKER_TIMEOUT", "600"))
+GRACEFUL_TIMEOUT = int(os.getenv("EDUBOT_GRACEFUL_TIMEOUT", "300"))
+MAX_REQUESTS = int(os.getenv("EDUBOT_MAX_REQUESTS", "0"))
+
+# Tokenizer thread pools must not be started before fork
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def post_fork(server, worker):
+    from model_loader import INFERENCE_CONCURRENCY, configure_torch_threads
+    cores = multiprocessing.cpu_count()
+    configure_torch_threads(cores // max(1, INFERENCE_WORKERS * INFERENCE_CONCURRENCY))
+
+
+_inference = {"proc": None, "pid": None}
+
+
+def stop_inference_server():
+    # Forked workers inherit the atexit hook; only the process that started the server stops it
+    proc = _inference["proc"]
+    if proc is None or _inference["pid"] != os.getpid() or proc.poll() is not None:
+        return
+    print("🧠 Stopping inference server...")
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def on_exit(server):
+    stop_inference_server()
+
+
+def start_inference_server():
+    import sys
+    import secrets
+    import tempfile
+    functions_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tile_3', 'edubot_blob_cosmos')
+    sys.path.append(functions_dir)
+    from inference_server import wait_for_server
+    address = os.getenv("EDUBOT_INFERENCE_ADDRESS") or os.path.join(tempfile.gettempdir(), f"edubot-inference-{os.getpid()}.sock")
+    authkey = os.getenv("EDUBOT_INFERENCE_AUTHKEY") or secrets.token_hex(16)
+    # Workers inherit these and route their model calls to the server
+    os.environ["EDUBOT_INFERENCE_ADDRESS"] = address
+    os.environ["EDUBOT_INFERENCE_AUTHKEY"] = authkey
+    print(f"🧠 Starting inference server on {address}...")
+    # A plain subprocess (not multiprocessing) so forked workers never try to reap it
+    proc = subprocess.Popen([sys.executable, os.path.join(functions_dir, 'inference_server.py'), '--address', address])
+    _inference.update(proc=proc, pid=os.getpid())
+    # on_exit covers a normal shutdown; atexit also covers a master that fails before gunicorn runs
+    atexit.register(stop_inference_server)
+    wait_for_server(address, authkey.encode(), proc=proc)
+
+
+class EduBotServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        if INFERENCE_SERVER:
+            start_inference_server()
+        from app import app
+        if PRELOAD_MODELS and not INFERENCE_SERVER:
+            from model_loader import preload_models
+            print("🧠 Preloading models in the master process...")
+            preload_models()
+        # Move everything loaded so far out of the GC's reach so collections in the
+        # workers do not touch (and copy) the shared pages
+        gc.collect()
+        gc.freeze()
+        return app
+
+
+def main():
+    options = {
+        "bind": BIND,
+        "workers": INFERENCE_WORKERS,
+        "threads": IO_THREADS,
+        "worker_class": "gthread",
+        "preload_app": True,
+        "timeout": WORKER_TIMEOUT,
+        "graceful_timeout": GRACEFUL_TIMEOUT,
+        "max_requests": MAX_REQUESTS,
+        "max_requests_jitter": MAX_REQUESTS // 10,
+        "post_fork": post_fork,
+        "on_exit": on_exit,
+        "accesslog": "-",
+    }
+    print(f"🚀 Serving EduBot on {BIND} with {INFERENCE_WORKERS} workers x {IO_THREADS} threads")
+    EduBotServer(options).run()
+
+
+if __name__ == "__main__":
+    main()
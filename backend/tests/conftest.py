@@ -0,0 +1,25 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# Same module layout app.py sets up; the Functions folder goes last
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+for path in [BACKEND_DIR,
+             os.path.join(BACKEND_DIR, 'tile_1'),
+             os.path.join(BACKEND_DIR, 'tile_3', 'edubot_blob_cosmos', 'summarizer'),
+             os.path.join(BACKEND_DIR, 'tile_3', 'edubot_blob_cosmos', 'flashcard_generator'),
+             os.path.join(BACKEND_DIR, 'tile_4'),
+             os.path.join(BACKEND_DIR, 'tile_3', 'edubot_blob_cosmos')]:
+    if path not in sys.path:
+        sys.path.append(path)
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """An empty EDUBOT_DATA_DIR for the local SQLite stores, with no connections left from other tests."""
+    import local_store
+    monkeypatch.setattr(local_store, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(local_store, "_local", threading.local())
+    return tmp_path
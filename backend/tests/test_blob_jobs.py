@@ -0,0 +1,83 @@
+import json
+import random
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+import blob_jobs
+
+
+class Properties:
+    def __init__(self, size, etag='"0x8DC"', content_md5=None):
+        self.size = size
+        self.etag = etag
+        self.content_settings = type("ContentSettings", (), {"content_md5": content_md5})()
+
+
+def reader(data):
+    return lambda offset, length: data[offset:offset + length]
+
+
+@pytest.mark.parametrize("size,batch", [(0, 10), (1, 10), (10, 10), (25, 10), (1000, 7)])
+def test_batch_ranges_cover_the_blob(size, batch):
+    ranges = blob_jobs.batch_ranges(size, batch)
+    assert sum(length for _, length in ranges) == size
+    assert all(offset == i * batch for i, (offset, _) in enumerate(ranges))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_every_line_lands_in_exactly_one_batch(seed, monkeypatch):
+    rng = random.Random(seed)
+    monkeypatch.setattr(blob_jobs, "_ALIGN_READ", rng.choice([1, 3, 64]))
+    lines = ["".join(rng.choice("abcé ") for _ in range(rng.randint(0, 40))) for _ in range(rng.randint(0, 50))]
+    data = "\n".join(lines).encode("utf-8") + (b"\n" if rng.random() < 0.5 else b"")
+    batch = rng.randint(1, 64)
+    parts = [blob_jobs.read_owned_lines(reader(data), len(data), offset, length)
+             for offset, length in blob_jobs.batch_ranges(len(data), batch)]
+    assert b"".join(parts) == data
+    for part in parts:
+        part.decode("utf-8")
+
+
+def test_fingerprint_prefers_content_md5():
+    assert blob_jobs.fingerprint(Properties(1, content_md5=bytearray(b"\x01\xab"))) == "01ab"
+    assert blob_jobs.fingerprint(Properties(1, etag='"0x8DC"')) == "0x8DC"
+
+
+def test_plan_job(monkeypatch):
+    monkeypatch.setattr(blob_jobs, "JOB_BATCH_BYTES", 100)
+    monkeypatch.setattr(blob_jobs, "read_result_blob", lambda name: None)
+    assert blob_jobs.plan_job("slides.pptx", Properties(250)) == []
+
+    messages = [json.loads(m) for m in blob_jobs.plan_job("notes.txt", Properties(250))]
+    assert [(m["batch"], m["offset"], m["length"]) for m in messages] == [(0, 0, 100), (1, 100, 100), (2, 200, 50)]
+    assert {m["job_id"] for m in messages} == {blob_jobs.job_id_for("notes.txt", "0x8DC")}
+    assert all(m["batches"] == 3 and m["etag"] == '"0x8DC"' for m in messages)
+
+    monkeypatch.setattr(blob_jobs, "read_result_blob", lambda name: {"done": True})
+    assert blob_jobs.plan_job("notes.txt", Properties(250)) == []
+
+
+def test_upload_blob_name(monkeypatch):
+    monkeypatch.setenv("BLOB_UPLOAD_CONTAINER", "uploads")
+    assert blob_jobs.upload_blob_name("/blobServices/default/containers/uploads/blobs/week 1/notes.txt") == "week 1/notes.txt"
+    assert blob_jobs.upload_blob_name("/blobServices/default/containers/results/blobs/notes.txt") is None
+
+
+def test_look_ahead_is_capped(monkeypatch):
+    monkeypatch.setattr(blob_jobs, "_ALIGN_READ", 8)
+    monkeypatch.setattr(blob_jobs, "JOB_MAX_LINE_BYTES", 32)
+    reads = []
+    data = b"x" * 1000
+
+    def read(offset, length):
+        reads.append(length)
+        return data[offset:offset + length]
+
+    with pytest.raises(ValueError):
+        blob_jobs.read_owned_lines(read, len(data), 100, 100)
+    assert sum(reads) <= 32
+    # A long line that still ends within the limit is kept whole
+    data = b"y" * 30 + b"\nshort\n"
+    assert blob_jobs.read_owned_lines(read, len(data), 0, 10) == b"y" * 30 + b"\n"
@@ -0,0 +1,53 @@
+import pytest
+
+import budget
+
+
+class FakeAnalysis:
+    def __init__(self, text):
+        self.text = text
+
+    def chunks(self, max_chunk_size=1000):
+        return [self.text[i:i + max_chunk_size] for i in range(0, len(self.text), max_chunk_size)]
+
+
+@pytest.fixture(autouse=True)
+def costs(monkeypatch):
+    monkeypatch.setattr(budget, "analyze", FakeAnalysis)
+    monkeypatch.setattr(budget, "_costs", {"summarize": 0.002, "answer": 0.06})
+
+
+TEXT = "Plants turn light into chemical energy. " * 250
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        budget.get_budget("instant")
+
+
+def test_cheaper_modes_predict_less():
+    fast, balanced, thorough = (budget.predict(TEXT, budget.get_budget(m)) for m in ("fast", "balanced", "thorough"))
+    assert 0 < fast < balanced < thorough
+
+
+def test_prediction_grows_with_the_text():
+    thorough = budget.get_budget("thorough")
+    assert budget.predict(TEXT * 4, thorough) > budget.predict(TEXT, thorough)
+    assert budget.predict(TEXT, thorough, use_blooms=False) < budget.predict(TEXT, thorough)
+
+
+def test_early_stop_caps_questions():
+    fast = budget.get_budget("fast")
+    # Beyond the flashcard cap, more text only adds summarization time
+    short, long = budget.predict(TEXT * 4, fast), budget.predict(TEXT * 8, fast)
+    summarize = budget.summarize_units(FakeAnalysis(budget.normalize(TEXT * 4, "summary")).chunks(), fast)
+    assert long - short == pytest.approx(summarize * budget._costs["summarize"], rel=0.05)
+
+
+def test_measurements_update_the_model():
+    thorough = budget.get_budget("thorough")
+    before = budget.predict(TEXT, thorough)
+    for _ in range(20):
+        budget.observe("answer", 10, 10 * 0.5)
+    assert budget._costs["answer"] == pytest.approx(0.5, rel=0.02)
+    assert budget.predict(TEXT, thorough) > before
@@ -0,0 +1,80 @@
+import pytest
+
+import chunk_store
+import local_store
+
+
+@pytest.fixture(autouse=True)
+def store(data_dir, monkeypatch):
+    monkeypatch.setattr(chunk_store, "CHUNK_CACHE", True)
+
+
+class Upper:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, chunks):
+        self.calls.append(list(chunks))
+        return [chunk.upper() for chunk in chunks]
+
+
+def test_only_missing_chunks_are_computed():
+    compute = Upper()
+    assert chunk_store.cached_map("upper", ["a", "b"], compute) == (["A", "B"], [False, False])
+    results, reused = chunk_store.cached_map("upper", ["a", "c", "c", "b"], compute)
+    assert results == ["A", "C", "C", "B"]
+    assert reused == [True, False, False, True]
+    assert compute.calls == [["a", "b"], ["c"]]
+
+
+def test_stages_do_not_share_results():
+    chunk_store.cached_map("upper", ["a"], Upper())
+    assert chunk_store.cached_map("other", ["a"], lambda chunks: ["x"] * len(chunks)) == (["x"], [False])
+
+
+def test_disabled_cache_always_computes(monkeypatch):
+    monkeypatch.setattr(chunk_store, "CHUNK_CACHE", False)
+    compute = Upper()
+    chunk_store.cached_map("upper", ["a"], compute)
+    chunk_store.cached_map("upper", ["a"], compute)
+    assert compute.calls == [["a"], ["a"]]
+
+
+def test_least_recently_used_are_pruned(monkeypatch):
+    monkeypatch.setattr(chunk_store, "CHUNK_CACHE_MAX_ROWS", 3)
+    clock = iter(range(1000, 2000000, 10000))
+    monkeypatch.setattr(chunk_store.time, "time", lambda: next(clock))
+    compute = Upper()
+    for chunk in ["a", "b", "c"]:
+        chunk_store.cached_map("upper", [chunk], compute)
+    chunk_store.cached_map("upper", ["a"], compute)  # refreshes "a"
+    chunk_store.cached_map("upper", ["d"], compute)  # evicts "b"
+    _, reused = chunk_store.cached_map("upper", ["a", "b", "c"], compute)
+    assert reused[0] and not reused[1]
+
+
+def test_expired_results_are_pruned(monkeypatch):
+    monkeypatch.setattr(chunk_store, "CHUNK_CACHE_MAX_AGE_DAYS", 1)
+    now = [1000000.0]
+    monkeypatch.setattr(chunk_store.time, "time", lambda: now[0])
+    chunk_store.cached_map("upper", ["old"], Upper())
+    now[0] += 2 * 86400
+    chunk_store.cached_map("upper", ["new"], Upper())
+    assert chunk_store.cached_map("upper", ["old", "new"], Upper())[1] == [False, True]
+
+
+def test_close_reopens_on_next_use():
+    chunk_store.cached_map("upper", ["a"], Upper())
+    local_store.close()
+    assert chunk_store.cached_map("upper", ["a"], Upper())[1] == [True]
+
+
+def test_lookups_span_several_batches(monkeypatch):
+    monkeypatch.setattr(local_store, "LOOKUP_BATCH", 2)
+    chunks = [f"chunk {i}" for i in range(5)]
+    chunk_store.cached_map("upper", chunks[:3], Upper())
+    compute = Upper()
+    results, reused = chunk_store.cached_map("upper", chunks, compute)
+    assert results == [chunk.upper() for chunk in chunks]
+    assert reused == [True, True, True, False, False]
+    assert compute.calls == [["chunk 3", "chunk 4"]]
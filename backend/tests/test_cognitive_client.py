@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+
+import cognitive_client
+from cognitive_client import Service, ServiceUnavailable
+
+
+@pytest.fixture
+def service(monkeypatch):
+    # A fresh service per test: its asyncio primitives bind to the test's event loop
+    service = Service("test", timeout=1, max_concurrency=4, retries=0, failure_threshold=3, cooldown=30)
+    monkeypatch.setitem(cognitive_client.SERVICES, "test", service)
+    return service
+
+
+def fake_send(monkeypatch, *outcomes):
+    """Make _send return (or raise) each outcome in turn, then 200s."""
+    queue = list(outcomes)
+
+    async def send(service, method, url, params, headers, data, json):
+        outcome = queue.pop(0) if queue else 200
+        if isinstance(outcome, BaseException):
+            raise outcome
+        if isinstance(outcome, tuple):
+            return outcome
+        return outcome, {}, b"{}"
+
+    monkeypatch.setattr(cognitive_client, "_send", send)
+
+
+def call():
+    return asyncio.run(cognitive_client.arequest("test", "POST", "https://example.invalid"))
+
+
+def cool_down(service):
+    service.open_until = 0.0
+
+
+def test_circuit_opens_after_consecutive_failures(service, monkeypatch):
+    fake_send(monkeypatch, 500, 503, 502)
+    for _ in range(3):
+        assert call().status_code >= 500
+    with pytest.raises(ServiceUnavailable):
+        call()
+
+
+def test_half_open_trial_success_closes(service, monkeypatch):
+    fake_send(monkeypatch, 500, 500, 500, 200)
+    for _ in range(3):
+        call()
+    cool_down(service)
+    assert call().status_code == 200
+    assert service.failures == 0
+    assert not service.trial_running
+
+
+def test_half_open_trial_failure_reopens(service, monkeypatch):
+    fake_send(monkeypatch, 500, 500, 500, 500)
+    for _ in range(4):
+        if service.open_until:
+            cool_down(service)
+        call()
+    assert not service.trial_running
+    with pytest.raises(ServiceUnavailable):
+        call()
+
+
+def test_only_one_trial_at_a_time(service):
+    service.failures = service.failure_threshold
+    assert service.check_circuit() is True
+    with pytest.raises(ServiceUnavailable):
+        service.check_circuit()
+    service.record(True, trial=True)
+    assert service.check_circuit() is False
+
+
+@pytest.mark.parametrize("error", [ConnectionResetError(), asyncio.TimeoutError()])
+def test_transient_error_on_trial_is_recorded(service, monkeypatch, error):
+    service.failures = service.failure_threshold
+    fake_send(monkeypatch, error)
+    with pytest.raises(cognitive_client.ServiceError):
+        call()
+    assert not service.trial_running
+    assert service.open_until > 0
+
+
+@pytest.mark.parametrize("error", [RuntimeError("bug"), asyncio.CancelledError()])
+def test_trial_is_released_on_any_exit(service, monkeypatch, error):
+    service.failures = service.failure_threshold
+    fake_send(monkeypatch, error)
+    with pytest.raises(type(error)):
+        call()
+    assert not service.trial_running
+    # The next call is allowed to be the trial
+    fake_send(monkeypatch, 200)
+    assert call().status_code == 200
+    assert service.failures == 0
+
+
+def test_client_errors_are_retried(service, monkeypatch):
+    aiohttp = pytest.importorskip("aiohttp")
+    service.retries = 1
+    monkeypatch.setattr(cognitive_client, "_retry_after", lambda headers, attempt: 0)
+    fake_send(monkeypatch, aiohttp.ServerDisconnectedError())
+    assert call().status_code == 200
+
+
+def test_throttling_does_not_open_the_circuit(service, monkeypatch):
+    fake_send(monkeypatch, *[(429, {"Retry-After": "0"}, b"")] * 5)
+    for _ in range(5):
+        assert call().status_code == 429
+    assert service.failures == 0
+    assert service.limit == 1.0
+
+
+def test_retry_after_is_honoured(service, monkeypatch):
+    service.retries = 1
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(cognitive_client.asyncio, "sleep", sleep)
+    fake_send(monkeypatch, (429, {"Retry-After": "7"}, b""))
+    assert call().status_code == 200
+    assert sleeps == [7.0]
+    assert service.paused_until > 0
+
+
+def test_response_headers_are_case_insensitive(service, monkeypatch):
+    pytest.importorskip("aiohttp")
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    statuses = [429, 200]
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(statuses.pop(0))
+            self.send_header("retry-after", "0")
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    delays = []
+    retry_after = cognitive_client._retry_after
+    monkeypatch.setattr(cognitive_client, "_retry_after",
+                        lambda headers, attempt: delays.append(retry_after(headers, attempt)) or delays[-1])
+    service.retries = 1
+    try:
+        response = cognitive_client.submit("test", "POST", f"http://127.0.0.1:{server.server_port}/",
+                                           data=b"x").result(timeout=10)
+    finally:
+        server.shutdown()
+    assert response.status_code == 200
+    assert response.headers["RETRY-AFTER"] == "0"
+    assert delays and all(delay == 0.0 for delay in delays)
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+pytest.importorskip("flask")
+app_module = pytest.importorskip("app")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, 'clean_summary_text', lambda text: text.strip())
+    monkeypatch.setattr(app_module, 'correct_grammar', lambda text: text)
+    monkeypatch.setattr(app_module, 'generate_summary', lambda text, budget: f"summary of {text}")
+    monkeypatch.setattr(app_module, 'generate_summaries',
+                        lambda texts, budget: [f"summary of {text}" for text in texts])
+    monkeypatch.setattr(app_module, 'store_results', lambda base_name, summary, flashcards: None)
+    monkeypatch.setattr(app_module.budgets, 'predict', lambda text, budget, use_blooms=True: 0.0)
+    return app_module.app.test_client()
+
+
+def fake_flashcards(monkeypatch, fail_on=()):
+    calls = []
+
+    def generate(text, summary, use_blooms=False, sources=None, budget=None):
+        calls.append({'text': text, 'sources': sources})
+        if text in fail_on:
+            raise RuntimeError(f"no cards for {text}")
+        return [{'question': f"What is {text}?", 'answer': text}]
+
+    monkeypatch.setattr(app_module, 'generate_flashcards', generate)
+    return calls
+
+
+def batch(client, documents):
+    response = client.post('/generate_flashcards_batch', json={'documents': documents})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_batch_streams_one_line_per_document(client, monkeypatch):
+    fake_flashcards(monkeypatch)
+    lines = batch(client, [{'id': 'a', 'text': 'cells'}, {'id': 'b', 'text': 'atoms'}, 'plants'])
+    assert 'timing' in lines[-1]
+    results = sorted(lines[:-1], key=lambda result: result['index'])
+    assert [(r['index'], r['id'], r['success']) for r in results] == [(0, 'a', True), (1, 'b', True), (2, None, True)]
+    assert results[1]['summary'] == 'summary of atoms'
+    assert results[2]['flashcards'] == [{'question': 'What is plants?', 'answer': 'plants'}]
+
+
+def test_batch_reports_errors_per_document(client, monkeypatch):
+    fake_flashcards(monkeypatch, fail_on={'atoms'})
+
+    def clean(text):
+        if text == 'broken':
+            raise ValueError("cannot clean")
+        return text
+
+    monkeypatch.setattr(app_module, 'clean_summary_text', clean)
+    lines = batch(client, [{'id': 'a', 'text': 'cells'}, {'id': 'b', 'text': 'atoms'}, {'id': 'c', 'text': 'broken'}])
+    results = {r['id']: r for r in lines[:-1]}
+    assert len(results) == 3
+    assert results['a']['success']
+    assert results['b'] == {'index': 1, 'id': 'b', 'success': False, 'error': 'no cards for atoms'}
+    assert results['c'] == {'index': 2, 'id': 'c', 'success': False, 'error': 'cannot clean'}
+
+
+def test_batch_rejects_empty_documents(client):
+    response = client.post('/generate_flashcards_batch', json={'documents': [{'id': 'a', 'text': ' '}]})
+    assert response.status_code == 400
+
+
+def test_sources_are_passed_through(client, monkeypatch):
+    calls = fake_flashcards(monkeypatch)
+    sources = [{'kind': 'page', 'number': 1, 'start': 0, 'end': 5}, {'kind': 'page', 'number': 2, 'start': 5, 'end': 9}]
+    response = client.post('/generate_flashcards', json={'text': 'cells', 'sources': sources})
+    assert response.get_json()['success']
+    assert calls[0]['sources'] == sources
+
+
+@pytest.mark.parametrize("sources", [
+    {'start': 0},
+    [{'kind': 'page', 'number': 1}],
+    [{'kind': 'page', 'number': 1, 'start': '0'}],
+    ['page 1'],
+    [{'kind': 'page', 'number': 2, 'start': 5}, {'kind': 'page', 'number': 1, 'start': 0}],
+])
+def test_invalid_sources_are_rejected(client, monkeypatch, sources):
+    calls = fake_flashcards(monkeypatch)
+    response = client.post('/generate_flashcards', json={'text': 'cells', 'sources': sources})
+    assert response.status_code == 400
+    assert not response.get_json()['success']
+    assert calls == []
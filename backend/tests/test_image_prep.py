@@ -0,0 +1,71 @@
+
+import pytest
+
+from tile_1 import image_prep
+from tile_1.image_prep import MAX_SIDE, Tile, grid, merge_tiles
+
+
+@pytest.mark.parametrize("width,height", [(800, 1100), (MAX_SIDE, MAX_SIDE + 1), (3000, 9000), (12345, 4500)])
+def test_grid_covers_and_owns_every_pixel_once(width, height):
+    tiles = grid(width, height)
+    for (left, top, right, bottom), _ in tiles:
+        assert right - left <= MAX_SIDE and bottom - top <= MAX_SIDE
+    # Every global coordinate is owned by exactly one tile
+    for x, y in [(0, 0), (width - 1, height - 1), (width // 2, height // 3), (width - 1, 0)]:
+        owners = [box for box, (ol, ot, orr, ob) in tiles
+                  if box[0] <= x < box[2] and box[1] <= y < box[3]
+                  and ol <= x - box[0] < orr and ot <= y - box[1] < ob]
+        assert len(owners) == 1
+
+
+def line(text, x, y):
+    return {"boundingBox": f"{x},{y},100,30", "words": [{"text": text}]}
+
+
+def test_line_cut_at_a_tile_edge_is_kept_once():
+    boxes = grid(1000, 6000)
+    assert len(boxes) == 2
+    (_, top0, _, bottom0), own0 = boxes[0]
+    (_, top1, _, _), own1 = boxes[1]
+    tiles = [Tile(b"", own0), Tile(b"", own1)]
+    # "top" starts just above the second tile, so the second tile only sees its lower
+    # half (reported at y=0); "bottom" starts 20 px before the first tile ends
+    top, bottom = top1 - 10, bottom0 - 20
+    results = [
+        {"regions": [{"lines": [line("first", 0, 0), line("top", 0, top - top0), line("bott", 0, bottom - top0)]}]},
+        {"regions": [{"lines": [line("to", 0, 0), line("bottom", 0, bottom - top1), line("last", 0, 3000)]}]},
+    ]
+    merged = merge_tiles(tiles, results)
+    texts = [l["words"][0]["text"] for region in merged["regions"] for l in region["lines"]]
+    assert texts == ["first", "top", "bottom", "last"]
+
+
+def test_single_tile_result_is_returned_as_is():
+    result = {"regions": [{"lines": [line("a", 0, 0)]}]}
+    assert merge_tiles([Tile(b"")], [result]) is result
+
+
+class FakePage:
+    def __init__(self, words, images=()):
+        self.words = words
+        self.images = list(images)
+        self.rect = type("Rect", (), {"width": 612.0})()
+        self.text_calls = 0
+
+    def get_text(self, kind):
+        self.text_calls += 1
+        return self.words
+
+    def get_images(self, full=False):
+        return self.images
+
+
+def test_dpi_from_text_layer_and_scan():
+    # 12 pt words at 32 px per line -> 192 dpi
+    page = FakePage([(0, 0, 50, 12, "w")] * 5)
+    assert image_prep.page_dpi(page, page.words) == 192
+    assert not image_prep.is_scanned(page, page.words)
+    scan = FakePage([], images=[(1, 0, 1700, 2200)])
+    assert image_prep.page_dpi(scan, []) == 200
+    assert image_prep.is_scanned(scan, [])
+    assert page.text_calls == 0
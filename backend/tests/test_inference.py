@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+import inference
+import inference_server
+
+
+class FakeSummarizer:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts, batch_size, **options):
+        self.batches.append(batch_size)
+        return [{"summary_text": text.upper()} for text in texts]
+
+
+def test_local_batches_are_capped(monkeypatch):
+    summarizer = FakeSummarizer()
+    monkeypatch.setattr(inference, "INFERENCE_ADDRESS", None)
+    monkeypatch.setattr(inference, "BATCH_MAX_SIZE", 4)
+    monkeypatch.setattr(inference, "get_summarizer", lambda: summarizer)
+    texts = [f"text {i}" for i in range(10)]
+    assert inference.summarize(texts) == [text.upper() for text in texts]
+    assert summarizer.batches == [4, 4, 2]
+
+
+def test_authkey_is_required(monkeypatch):
+    monkeypatch.delenv("EDUBOT_INFERENCE_AUTHKEY", raising=False)
+    with pytest.raises(RuntimeError):
+        inference_server.authkey_from_env()
+    monkeypatch.setenv("EDUBOT_INFERENCE_AUTHKEY", "secret")
+    assert inference_server.authkey_from_env() == b"secret"
+
+
+def serve_once(tmp_path, handle):
+    """A one-connection server on a Unix socket; handle(conn) runs on its thread."""
+    from multiprocessing.connection import Listener
+    listener = Listener(str(tmp_path / "inference.sock"), authkey=b"secret")
+
+    def run():
+        with listener.accept() as conn:
+            handle(conn)
+        listener.close()
+
+    threading.Thread(target=run, daemon=True).start()
+    return inference_server.InferenceClient(str(tmp_path / "inference.sock"), b"secret")
+
+
+def test_closed_connection_fails_pending_and_new_requests(tmp_path):
+    client = serve_once(tmp_path, lambda conn: conn.recv())
+    with pytest.raises(ConnectionError):
+        client.map("summarize", ["a", "b"], [{}, {}], timeout=5)
+    assert client.closed
+    with pytest.raises(ConnectionError):
+        client.submit("summarize", "c")
+
+
+def test_unanswered_requests_time_out(tmp_path):
+    done = threading.Event()
+    client = serve_once(tmp_path, lambda conn: done.wait(5))
+    with pytest.raises(TimeoutError):
+        client.map("summarize", ["a", "b"], [{}, {}], timeout=0.2)
+    assert client._pending == {}
+    done.set()
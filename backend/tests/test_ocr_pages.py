@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("dotenv")
+
+from tile_1 import image_prep, ocr_summarizer
+
+
+def fake_ocr_stream(images):
+    # Like ocr_summarizer.ocr_stream: pulls images ahead of the results it yields
+    pending = []
+    for image in images:
+        pending.append(image)
+        if len(pending) > 2:
+            yield result_for(pending.pop(0))
+    for image in pending:
+        yield result_for(image)
+
+
+def result_for(data):
+    return {"regions": [{"lines": [{"boundingBox": "0,500,10,10", "words": [{"text": data.decode()}]}]}]}
+
+
+def test_tiles_are_regrouped_per_page(monkeypatch):
+    monkeypatch.setattr(ocr_summarizer, "ocr_stream", fake_ocr_stream)
+    below = (0, 400, float("inf"), float("inf"))  # owns the lines at y=500
+    above = (0, 0, float("inf"), 400)
+    pages = [
+        [image_prep.Tile(b"p1")],
+        [image_prep.Tile(b"p2a", below), image_prep.Tile(b"p2b", above), image_prep.Tile(b"p2c", below)],
+        [image_prep.Tile(b"p3")],
+    ]
+    stats = image_prep.OcrStats()
+    results = list(ocr_summarizer.ocr_pages(iter(pages), stats))
+    assert [list(ocr_summarizer.iter_ocr_lines(result)) for result in results] == [["p1"], ["p2a", "p2c"], ["p3"]]
+    assert stats.as_dict() == {"pages": 3, "images": 5, "bytes_sent": 13, "bytes_per_page": 4}
@@ -0,0 +1,84 @@
+import re
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+import chunk_store
+from document_model import Span
+from tile_1 import ocr_summarizer
+from tile_1.ocr_summarizer import SPAN_SEPARATOR, pack_window
+
+
+def sentence_bounds(text, max_chunk_size=1000):
+    # Sentence-packed bounds like chunk_bounds, without the tokenizer
+    bounds = []
+    for match in re.finditer(r"[^.]+\.", text):
+        start, end = match.span()
+        if bounds and end - bounds[-1][0] <= max_chunk_size:
+            bounds[-1] = (bounds[-1][0], end)
+        else:
+            bounds.append((start, end))
+    return bounds
+
+
+@pytest.fixture
+def models(monkeypatch):
+    calls = {"grammar": [], "summarize": []}
+
+    def correct_grammar(text):
+        calls["grammar"].append(text)
+        return text.replace("teh", "the")
+
+    def summarize_chunks(chunks):
+        calls["summarize"].append(list(chunks))
+        return [f"<{len(chunk)}>" for chunk in chunks]
+
+    monkeypatch.setattr(chunk_store, "CHUNK_CACHE", False)
+    monkeypatch.setattr(ocr_summarizer, "chunk_bounds", sentence_bounds)
+    monkeypatch.setattr(ocr_summarizer, "clean_text", lambda text: text.strip())
+    monkeypatch.setattr(ocr_summarizer, "correct_grammar", correct_grammar)
+    monkeypatch.setattr(ocr_summarizer, "summarize_chunks", summarize_chunks)
+    return calls
+
+
+def test_small_texts_are_packed_whole():
+    texts = ["a" * 400, "b" * 400, "c" * 400, "d" * 50]
+    assert pack_window(texts) == [[(0, 0, 400), (1, 0, 400)], [(2, 0, 400), (3, 0, 50)]]
+
+
+def test_long_text_is_split_on_its_own(monkeypatch):
+    monkeypatch.setattr(ocr_summarizer, "chunk_bounds", sentence_bounds)
+    long = "Sentence number one is here. " * 60
+    packed = pack_window(["short.", long, "tail."])
+    assert packed[0] == [(0, 0, 6)]
+    assert all(len(pieces) == 1 and pieces[0][0] == 1 for pieces in packed[1:-1])
+    assert packed[-1] == [(2, 0, 5)]
+    assert all(end - start <= 1000 for pieces in packed for _, start, end in pieces)
+
+
+def test_short_slides_share_model_calls(models):
+    spans = [Span("slide", n, [f"Slide {n} says teh thing."]) for n in range(1, 9)]
+    results, summaries, chunks, _ = ocr_summarizer.process_window(spans)
+    assert chunks == 1 and len(summaries) == 1
+    assert len(models["grammar"]) == 1
+    assert [corrected for _, _, corrected in results] == [f"Slide {n} says the thing." for n in range(1, 9)]
+    assert [span.number for span, _, _ in results] == list(range(1, 9))
+
+
+def test_correction_across_a_boundary_falls_back_to_per_slide(models, monkeypatch):
+    def merge_paragraphs(text):
+        models["grammar"].append(text)
+        return text.replace(SPAN_SEPARATOR, " ")
+
+    monkeypatch.setattr(ocr_summarizer, "correct_grammar", merge_paragraphs)
+    spans = [Span("slide", 1, ["One."]), Span("slide", 2, ["Two."])]
+    results, _, _, _ = ocr_summarizer.process_window(spans)
+    assert [corrected for _, _, corrected in results] == ["One.", "Two."]
+
+
+def test_long_page_keeps_its_paragraph_breaks(models):
+    page = "\n\n".join("Teh paragraph has words. " * 20 for _ in range(4))
+    results, summaries, chunks, _ = ocr_summarizer.process_window([Span("page", 1, [page])])
+    assert chunks > 1 and len(summaries) == chunks
+    assert results[0][2] == page.strip().replace("teh", "the")
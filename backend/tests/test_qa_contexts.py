@@ -0,0 +1,40 @@
+import re
+
+import pytest
+
+import flashcard_generator
+
+
+class FakeAnalysis:
+    # Sentences end at ". "
+    def __init__(self, text):
+        self.sentence_spans = [m.span() for m in re.finditer(r"[^.]+\.", text)]
+
+
+@pytest.fixture(autouse=True)
+def analysis(monkeypatch):
+    monkeypatch.setattr(flashcard_generator, "analyze", FakeAnalysis)
+
+
+QUESTIONS = ["What is photosynthesis?", "Who led the revolution?"]
+
+
+@pytest.mark.parametrize("pages", [1, 5, 100])
+def test_small_and_medium_texts_get_the_whole_text(pages):
+    text = "Plants use light to make sugar. " * 60 * pages
+    assert flashcard_generator.qa_contexts(QUESTIONS, text) == [(text, 0), (text, 0)]
+
+
+def test_very_large_texts_get_the_best_chunk(monkeypatch):
+    monkeypatch.setattr(flashcard_generator, "QA_LARGE_TEXT_CHARS", 10000)
+    monkeypatch.setattr(flashcard_generator, "QA_CONTEXT_CHARS", 1000)
+    filler = "Rivers carry water to the sea. " * 200
+    plants = "Photosynthesis turns light into sugar in plants. " * 10
+    history = "Robespierre led the revolution in France. " * 10
+    text = filler + plants + filler + history + filler
+    (plant_context, plant_offset), (history_context, history_offset) = flashcard_generator.qa_contexts(
+        QUESTIONS, text)
+    assert "Photosynthesis" in plant_context and len(plant_context) <= 1000
+    assert text[plant_offset:plant_offset + len(plant_context)] == plant_context
+    assert "Robespierre" in history_context
+    assert text[history_offset:history_offset + len(history_context)] == history_context
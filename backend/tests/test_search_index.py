@@ -0,0 +1,127 @@
+import os
+import hashlib
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import inference
+import local_store
+import search_index
+
+DIM = 16
+
+
+def fake_embed(sentences):
+    # Deterministic pseudo-random vectors: equal texts embed equally
+    return np.vstack([np.random.default_rng(int(hashlib.sha1(s.encode()).hexdigest()[:8], 16)).normal(size=DIM)
+                      for s in sentences]).astype(np.float32)
+
+
+@pytest.fixture(autouse=True)
+def index(data_dir, monkeypatch):
+    monkeypatch.setattr(search_index, "_centroids", {"name": None, "array": None})
+    monkeypatch.setattr(inference, "embed", fake_embed)
+    return data_dir
+
+
+def document(doc_id, summary, cards=2):
+    return {"id": doc_id, "summary": summary,
+            "flashcards": [{"question": f"{summary} q{i}", "answer": f"a{i}"} for i in range(cards)]}
+
+
+def centroid_files():
+    return sorted(name for name in os.listdir(local_store.DATA_DIR) if name.startswith("search_centroids"))
+
+
+def vector_rows():
+    return os.path.getsize(search_index._vectors_path()) // (DIM * 4)
+
+
+def test_reindexing_reuses_rows():
+    search_index.add_document(document("a", "photosynthesis in plants"))
+    search_index.add_document(document("b", "the french revolution"))
+    assert vector_rows() == 6
+
+    # A document's old rows stay untouched until the write that frees them has committed
+    for version in range(3):
+        search_index.add_document(document("a", f"cell respiration {version}"))
+    assert vector_rows() == 9
+
+    results = search_index.search("cell respiration 2", k=20)
+    assert [r["id"] for r in results].count("a") == 3
+    assert results[0]["text"] == "cell respiration 2"
+    assert not any("photosynthesis" in r["text"] for r in results)
+
+
+def test_smaller_reindex_leaves_free_rows_for_later():
+    search_index.add_document(document("a", "first", cards=4))
+    search_index.add_document(document("a", "second", cards=0))
+    search_index.add_document(document("b", "third", cards=3))
+    assert vector_rows() == 6
+    assert sorted(r["id"] for r in search_index.search("third", k=20)) == ["a", "b", "b", "b", "b"]
+
+
+def test_failed_write_leaves_committed_vectors_alone():
+    search_index.add_document(document("a", "photosynthesis in plants"))
+    search_index.add_document(document("a", "cell respiration"))
+    items = search_index._items(document("a", "the french revolution"))
+    vectors = search_index._normalize(fake_embed([text for _, _, text, _ in items]))
+    # Fails on the INSERT, after the vectors have been written
+    with pytest.raises(Exception):
+        search_index._append([(doc_id, kind, None, card) for doc_id, kind, _, card in items], vectors)
+
+    results = search_index.search("cell respiration", k=20)
+    assert results[0]["text"] == "cell respiration"
+    assert results[0]["score"] == pytest.approx(1.0, abs=1e-4)
+    assert all(r["text"] != "photosynthesis in plants" for r in results)
+
+
+def test_training_runs_outside_add(monkeypatch):
+    monkeypatch.setattr(search_index, "IVF_MIN_ROWS", 16)
+    scheduled = []
+    monkeypatch.setattr(search_index, "_train_in_background", lambda: scheduled.append(True))
+    search_index.add_documents([document(str(i), f"topic {i}") for i in range(8)])
+    assert scheduled
+    assert centroid_files() == []
+
+    assert search_index.train()
+    conn = search_index._conn()
+    assert centroid_files() == [search_index._get_meta(conn, "centroids")] == ["search_centroids-24.npy"]
+    assert not search_index.train()
+    assert conn.execute("SELECT COUNT(*) FROM items WHERE list_id IS NULL").fetchone()[0] == 0
+    assert search_index.search("topic 5 q1 a1", k=1)[0]["text"] == "topic 5 q1 a1"
+
+    # New items are assigned to the trained lists as they are added
+    search_index.add_document(document("5", "topic five revised"))
+    assert conn.execute("SELECT COUNT(*) FROM items WHERE list_id IS NULL").fetchone()[0] == 0
+    assert search_index.search("topic five revised", k=1)[0]["id"] == "5"
+
+
+def test_rebuild_trains(monkeypatch):
+    monkeypatch.setattr(search_index, "IVF_MIN_ROWS", 16)
+    assert search_index.rebuild([document(str(i), f"topic {i}") for i in range(8)]) == 24
+    assert centroid_files() == ["search_centroids-24.npy"]
+
+
+def test_retraining_replaces_the_centroids_with_the_lists(monkeypatch):
+    monkeypatch.setattr(search_index, "IVF_MIN_ROWS", 16)
+    monkeypatch.setattr(search_index, "_train_in_background", lambda: None)
+    search_index.add_documents([document(str(i), f"topic {i}") for i in range(8)])
+    assert search_index.train()
+    first = search_index._load_centroids(search_index._conn())
+
+    # A failed commit keeps the committed centroids and removes the new file
+    search_index.add_documents([document(str(i), f"topic {i}") for i in range(8, 16)])
+    set_meta = search_index._set_meta
+    monkeypatch.setattr(search_index, "_set_meta", lambda conn, key, value: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        search_index.train()
+    assert centroid_files() == ["search_centroids-24.npy"]
+    assert search_index._load_centroids(search_index._conn()) is first
+
+    monkeypatch.setattr(search_index, "_set_meta", set_meta)
+    assert search_index.train()
+    assert centroid_files() == ["search_centroids-48.npy"]
+    assert search_index._load_centroids(search_index._conn()).shape[0] == 6
+    assert search_index.search("topic 12 q0 a0", k=1)[0]["text"] == "topic 12 q0 a0"
@@ -0,0 +1,94 @@
+import pytest
+
+pytest.importorskip("dotenv")
+
+import chunk_store
+import document_model
+from document_model import Span, TextSpool, source_at
+from tile_1 import ocr_summarizer
+
+
+@pytest.fixture
+def windows(monkeypatch):
+    """The sizes of the windows process_window is called with."""
+    sizes = []
+    process_window = ocr_summarizer.process_window
+
+    def spy(spans):
+        sizes.append(len(spans))
+        return process_window(spans)
+
+    monkeypatch.setattr(chunk_store, "CHUNK_CACHE", False)
+    monkeypatch.setattr(ocr_summarizer, "STREAM_WINDOW", 3)
+    monkeypatch.setattr(ocr_summarizer, "clean_text", lambda text: text.strip())
+    monkeypatch.setattr(ocr_summarizer, "correct_grammar", lambda text: text.upper())
+    monkeypatch.setattr(ocr_summarizer, "summarize_chunks", lambda chunks: [f"s{len(c)}" for c in chunks])
+    monkeypatch.setattr(ocr_summarizer, "process_window", spy)
+    return sizes
+
+
+def pages(count):
+    return [Span("page", n, [f"page {n} text.\n", "\n"]) for n in range(1, count + 1)]
+
+
+def test_spans_are_processed_in_windows(windows):
+    pulled = []
+
+    def lazy():
+        for span in pages(7):
+            pulled.append(span.number)
+            # Only the current window is pulled ahead of processing
+            assert len(pulled) - 3 * len(windows) <= 3
+            yield span
+
+    result = ocr_summarizer.process_spans(lazy())
+    assert windows == [3, 3, 1]
+    assert result["corrected_text"] == "\n\n".join(f"PAGE {n} TEXT." for n in range(1, 8))
+    assert result["raw_text"] == "".join(span.text for span in pages(7))
+
+
+def test_sources_point_into_corrected_text_across_windows(windows):
+    result = ocr_summarizer.process_spans(pages(5))
+    text = result["corrected_text"]
+    assert [s["number"] for s in result["sources"]] == [1, 2, 3, 4, 5]
+    for source in result["sources"]:
+        assert text[source["start"]:source["end"]] == f"PAGE {source['number']} TEXT."
+    # Page 4 is the first of the second window
+    offset = text.index("PAGE 4")
+    assert source_at(result["sources"], offset)["number"] == 4
+    assert source_at(result["sources"], offset - 1)["number"] == 3
+
+
+def test_empty_pages_are_dropped_from_sources(windows):
+    spans = pages(2) + [Span("page", 3, ["   \n"])] + pages(5)[3:]
+    result = ocr_summarizer.process_spans(spans, fields=("corrected_text",))
+    assert [s["number"] for s in result["sources"]] == [1, 2, 4, 5]
+    assert set(result) >= {"corrected_text", "summary", "sources"} and "raw_text" not in result
+
+
+def test_no_text_fields(windows):
+    result = ocr_summarizer.process_spans(pages(4), fields=())
+    assert not set(result) & set(ocr_summarizer.TEXT_FIELDS)
+    assert result["sources"][-1]["end"] == len("\n\n".join(f"PAGE {n} TEXT." for n in range(1, 5)))
+    with pytest.raises(ValueError):
+        ocr_summarizer.process_spans(pages(1), fields=("summary",))
+
+
+def test_text_spool_joins_and_spills(monkeypatch):
+    monkeypatch.setattr(document_model, "SPILL_CHARS", 10)
+    spool = TextSpool("\n\n")
+    parts = ["first page", "second page", "third"]
+    starts = [spool.add(part) for part in parts]
+    text = "\n\n".join(parts)
+    assert spool.getvalue() == text
+    assert [text[start:start + len(part)] for start, part in zip(starts, parts)] == parts
+    assert spool.length == len(text)
+    assert spool._file._rolled
+    spool.close()
+
+
+def test_text_spool_without_keep_tracks_offsets_only():
+    spool = TextSpool("\n\n", keep=False)
+    assert [spool.add("ab"), spool.add("cd")] == [0, 4]
+    assert spool.getvalue() is None
+    spool.close()
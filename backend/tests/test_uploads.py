@@ -0,0 +1,56 @@
+import os
+from io import BytesIO
+
+import pytest
+
+pytest.importorskip("flask")
+app_module = pytest.importorskip("app")
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_SPILL_THRESHOLD', 1024)
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def seen(monkeypatch):
+    """What /ocr_summarize hands to the PDF processor: ("bytes" or "path", content)."""
+    seen = []
+
+    def process(source, fields):
+        if isinstance(source, bytes):
+            seen.append(("bytes", source))
+        else:
+            with open(source, 'rb') as f:
+                seen.append(("path", f.read()))
+        return {'summary': ''}
+
+    monkeypatch.setattr(app_module.ocr_summarizer, 'process_pdf_bytes', process)
+    return seen
+
+
+def upload(client, content):
+    return client.post('/ocr_summarize', data={'file': (BytesIO(content), 'notes.pdf')},
+                       content_type='multipart/form-data')
+
+
+def test_small_upload_stays_in_memory(client, seen, tmp_path):
+    assert upload(client, b"x" * 100).get_json()['success']
+    assert seen == [("bytes", b"x" * 100)]
+    assert os.listdir(tmp_path) == []
+
+
+def test_large_upload_is_read_by_path_and_removed(client, seen, tmp_path):
+    content = os.urandom(4096)
+    assert upload(client, content).get_json()['success']
+    assert seen == [("path", content)]
+    assert os.listdir(tmp_path) == []
+
+
+def test_spooled_upload_is_removed_when_the_route_fails(client, tmp_path):
+    response = client.post('/ocr_summarize', data={'file': (BytesIO(b"x" * 4096), 'notes.doc')},
+                           content_type='multipart/form-data')
+    assert response.get_json() == {'success': False, 'error': 'Unsupported file type'}
+    assert os.listdir(tmp_path) == []
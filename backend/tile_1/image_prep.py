@@ -0,0 +1,173 @@
+"""
+image_prep.py - Images prepared for the Vision OCR endpoint
+
+OCR works from grayscale, and text only needs enough pixels per line. So
+instead of sending default-resolution colour PNGs and full-size camera photos:
+    PDF pages   are rendered in grayscale at a DPI picked per page. For a text
+                layer, the DPI puts the median line at about TARGET_LINE_PX
+                pixels; for a scan, it is the DPI of the scanned image; other
+                pages use DEFAULT_DPI. The result is clamped to MIN_DPI..MAX_DPI.
+                Scans are encoded as JPEG and rendered text as PNG.
+    photos      (uploads, slide pictures) are EXIF-rotated, converted to
+                grayscale, downscaled to PHOTO_MEGAPIXELS and encoded as JPEG.
+                The original is kept when it is already smaller.
+Anything larger than MAX_SIDE pixels on a side is split into tiles that
+overlap by TILE_OVERLAP. Each OCR line belongs to the tile its top-left corner
+falls in, with the boundary between two tiles in the middle of their overlap:
+a line cut off at one tile's edge is dropped there and kept, whole, from its
+neighbour, so merge_tiles() keeps every line exactly once.
+"""
+
+import os
+import math
+import threading
+from io import BytesIO
+
+# Vision v3.2 OCR limits: at most 4200 x 4200 pixels and 4 MB per image
+MAX_SIDE = 4200
+MAX_BYTES = 4 * 1024 * 1024
+TILE_OVERLAP = 200
+
+MIN_DPI = int(os.getenv("EDUBOT_OCR_MIN_DPI", "100"))
+MAX_DPI = int(os.getenv("EDUBOT_OCR_MAX_DPI", "300"))
+DEFAULT_DPI = 150
+TARGET_LINE_PX = 32
+PHOTO_MEGAPIXELS = float(os.getenv("EDUBOT_OCR_PHOTO_MEGAPIXELS", "4"))
+JPEG_QUALITY = int(os.getenv("EDUBOT_OCR_JPEG_QUALITY", "80"))
+
+
+class Tile:
+    """One image sent to OCR. Lines starting within own (left, top, right, bottom), in tile pixels, are kept."""
+
+    def __init__(self, data, own=(0, 0, math.inf, math.inf)):
+        self.data = data
+        self.own = own
+
+
+def grid(width, height):
+    """(box, own) for tiles covering width x height: box is the (left, top, right, bottom) pixel
+    area, at most MAX_SIDE a side, and own the part of it (in tile pixels) whose lines it keeps."""
+    half = TILE_OVERLAP // 2
+
+    def cuts(size):
+        if size <= MAX_SIDE:
+            return [(0, size, 0, math.inf)]
+        # A couple of pixels of slack for rounding when PDF clips are rendered
+        count = math.ceil(size / (MAX_SIDE - TILE_OVERLAP - 2))
+        step = math.ceil(size / count)
+        return [(i * step, min(size, (i + 1) * step + TILE_OVERLAP),
+                 half if i else 0, step + half if i < count - 1 else math.inf)
+                for i in range(count)]
+    return [((left, top, right, bottom), (own_left, own_top, own_right, own_bottom))
+            for top, bottom, own_top, own_bottom in cuts(height)
+            for left, right, own_left, own_right in cuts(width)]
+
+
+def merge_tiles(tiles, results):
+    """One OCR result for a page from the results of its tiles, in tile order."""
+    if len(tiles) == 1:
+        return results[0]
+    regions = []
+    for tile, result in zip(tiles, results):
+        for region in result.get("regions", []):
+            lines = []
+            for line in region.get("lines", []):
+                x, y = (int(v) for v in line["boundingBox"].split(",")[:2])
+                left, top, right, bottom = tile.own
+                if left <= x < right and top <= y < bottom:
+                    lines.append(line)
+            if lines:
+                regions.append(dict(region, lines=lines))
+    return {"regions": regions}
+
+
+# --- PDF pages ---
+
+def page_dpi(page, words):
+    """Rendering DPI for a PyMuPDF page, from its text layer (page.get_text("words")) or its scanned image."""
+    heights = sorted(y1 - y0 for x0, y0, x1, y1, *_ in words if y1 > y0)
+    if heights:
+        dpi = TARGET_LINE_PX * 72 / heights[len(heights) // 2]
+    else:
+        # A scan: the widest image's own resolution; rendering finer adds nothing
+        widths = [width for _, _, width, *_ in page.get_images(full=True)]
+        dpi = max(widths) * 72 / page.rect.width if widths and page.rect.width else DEFAULT_DPI
+    return int(min(MAX_DPI, max(MIN_DPI, dpi)))
+
+
+def is_scanned(page, words):
+    return not words and bool(page.get_images())
+
+
+def encode_pixmap(pixmap, jpeg):
+    data = pixmap.tobytes("jpeg", jpg_quality=JPEG_QUALITY) if jpeg else pixmap.tobytes("png")
+    if len(data) > MAX_BYTES and not jpeg:
+        data = pixmap.tobytes("jpeg", jpg_quality=JPEG_QUALITY)
+    return data
+
+
+def prepare_page(page):
+    """Tiles for one PDF page (usually just one)."""
+    import fitz  # PyMuPDF
+    # Extracting the text layer is the costly part of the checks; do it once
+    words = page.get_text("words")
+    dpi = page_dpi(page, words)
+    jpeg = is_scanned(page, words)
+    rect = page.rect
+    scale = dpi / 72
+    tiles = []
+    for (left, top, right, bottom), own in grid(math.ceil(rect.width * scale), math.ceil(rect.height * scale)):
+        clip = fitz.Rect(rect.x0 + left / scale, rect.y0 + top / scale,
+                         rect.x0 + right / scale, rect.y0 + bottom / scale)
+        pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False, clip=clip)
+        tiles.append(Tile(encode_pixmap(pixmap, jpeg), own))
+    return tiles
+
+
+# --- Photos ---
+
+def prepare_photo(data):
+    """Tiles for an uploaded image (bytes)."""
+    from PIL import Image, ImageOps
+    image = Image.open(BytesIO(data))
+    image = ImageOps.exif_transpose(image).convert("L")
+    scale = min(1.0, math.sqrt(PHOTO_MEGAPIXELS * 1_000_000 / (image.width * image.height)))
+    if scale < 1:
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                             Image.LANCZOS)
+    elif image.width <= MAX_SIDE and image.height <= MAX_SIDE and len(data) <= MAX_BYTES:
+        # Small enough already; keep the original if re-encoding would not shrink it
+        encoded = _jpeg(image)
+        return [Tile(encoded if len(encoded) < len(data) else data)]
+
+    return [Tile(_jpeg(image.crop(box)), own) for box, own in grid(image.width, image.height)]
+
+
+def _jpeg(image):
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+class OcrStats:
+    """Bytes sent to OCR per page (or picture), reported with the result."""
+
+    def __init__(self):
+        self.pages = 0
+        self.images = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, tiles):
+        with self._lock:
+            self.pages += 1
+            self.images += len(tiles)
+            self.bytes += sum(len(tile.data) for tile in tiles)
+
+    def as_dict(self):
+        return {
+            "pages": self.pages,
+            "images": self.images,
+            "bytes_sent": self.bytes,
+            "bytes_per_page": round(self.bytes / self.pages) if self.pages else 0
+        }
@@ -1,166 +1,318 @@
 import os
-import re
-import requests
-import fitz  # PyMuPDF
-import nltk
-import language_tool_python
-from pptx import Presentation
-from transformers import pipeline
-from nltk.tokenize.punkt import PunktSentenceTokenizer, PunktParameters
+from collections import deque
+from functools import lru_cache
 from dotenv import load_dotenv
-nltk.download('punkt')
+from model_loader import SUMMARIZATION_MODEL, correct_grammar
+from text_normalizer import normalize
+from document_model import Span, TextSpool, pack_sentence_spans
+from document_analysis import analyze
+import chunk_store
+import inference
+import cognitive_client
+import image_prep
 load_dotenv()
 
-subscription_key = os.getenv("VISION_KEY")
-endpoint = os.getenv("VISION_ENDPOINT")
-ocr_url = endpoint + "/vision/v3.2/ocr?language=en"
+# fitz (PyMuPDF), python-pptx and the models are imported on first use
 
-headers = {
-    'Ocp-Apim-Subscription-Key': subscription_key,
-    'Content-Type': 'application/octet-stream'
-}
+# Pages/slides cleaned, corrected and summarized together; the text held in memory is about this many pages
+STREAM_WINDOW = int(os.getenv("EDUBOT_STREAM_WINDOW_PAGES", "8"))
+# The large text fields process_* can return (all of them by default)
+TEXT_FIELDS = ("raw_text", "cleaned_text", "corrected_text")
 
-def correct_grammar(text):
-    tool = None
-    try:
-        tool = language_tool_python.LanguageTool('en-US')
-        matches = tool.check(text)
-        return language_tool_python.utils.correct(text, matches)
-    finally:
-        if tool:
-            tool.close()
+# Ceiling on OCR requests in flight per process, across all uploads. Within it
+# cognitive_client adapts the limit to the service's throttling.
+OCR_MAX_CONCURRENCY = cognitive_client.SERVICES["vision"].max_concurrency
 
-def clean_text(raw_text):
-    cleaned = re.sub(r'\s+', ' ', raw_text)
-    cleaned = cleaned.replace('|', 'I').replace('0', 'O')
-    cleaned = re.sub(r'[^\x00-\x7F]+', '', cleaned)
-    cleaned = re.sub(r'[^\w\s.,!?-]', '', cleaned)
-
-    lines = raw_text.splitlines()
-    paragraph = ""
-    paragraphs = []
-
-    for line in lines:
-        line = line.strip()
-        if not line:
-            if paragraph:
-                paragraphs.append(paragraph.strip())
-                paragraph = ""
-        elif len(line) < 60:
-            paragraph += " " + line
-        else:
-            if paragraph:
-                paragraphs.append(paragraph.strip())
-                paragraph = ""
-            paragraphs.append(line)
-
-    if paragraph:
-        paragraphs.append(paragraph.strip())
-
-    return "\n\n".join(paragraphs)
+@lru_cache(maxsize=None)
+def get_ocr_url():
+    return os.getenv("VISION_ENDPOINT", "").rstrip('/') + "/vision/v3.2/ocr?language=en"
 
-def chunk_text(text, max_chunk_size=1000):
-    punkt_param = PunktParameters()
-    tokenizer = PunktSentenceTokenizer(punkt_param)
-    sentences = tokenizer.tokenize(text)
+@lru_cache(maxsize=None)
+def get_ocr_headers():
+    return {
+        'Ocp-Apim-Subscription-Key': os.getenv("VISION_KEY"),
+        'Content-Type': 'application/octet-stream'
+    }
 
-    chunks = []
-    current_chunk = ""
+def clean_text(raw_text):
+    # Rebuild paragraphs from OCR lines (see text_normalizer "ocr" profile)
+    return normalize(raw_text, "ocr")
 
-    for sent in sentences:
-        if len(current_chunk) + len(sent) + 1 <= max_chunk_size:
-            current_chunk += " " + sent
-        else:
-            chunks.append(current_chunk.strip())
-            current_chunk = sent
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+def chunk_text(text, max_chunk_size=1000):
+    return analyze(text).chunks(max_chunk_size)
 
-    return chunks
+def chunk_bounds(text, max_chunk_size=1000):
+    # (start, end) of each chunk_text chunk within text
+    spans = analyze(text).sentence_spans
+    return [(start, end) for _, start, end in pack_sentence_spans(text, spans, max_chunk_size) if end > start]
 
-def generate_summary(text):
-    summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-    chunks = chunk_text(text)
-    summaries = []
+def summarize_chunks(chunks):
+    lengths = []
     for chunk in chunks:
         max_len = min(150, max(30, len(chunk) // 5))
         min_len = min(40, max_len // 2)
-        result = summarizer(chunk, max_length=max_len, min_length=min_len, do_sample=False)
-        summaries.append(result[0]['summary_text'])
-    return " ".join(summaries).strip()
+        lengths.append((max_len, min_len))
+    return inference.summarize(chunks, lengths)
 
-def ocr_image_bytes(image_bytes):
-    response = requests.post(ocr_url, headers=headers, data=image_bytes)
+def generate_summary(text):
+    return " ".join(summarize_chunks(chunk_text(text))).strip()
+
+def submit_ocr(image_bytes):
+    return cognitive_client.submit("vision", "POST", get_ocr_url(), headers=get_ocr_headers(), data=image_bytes)
+
+def ocr_result(future):
+    response = future.result()
     response.raise_for_status()
     return response.json()
 
-def extract_text_from_ocr_result(result):
-    text = ""
+def ocr_image_bytes(image_bytes):
+    return ocr_result(submit_ocr(image_bytes))
+
+def ocr_stream(images):
+    """OCR an iterable of images concurrently, yielding the results in input order.
+
+    Images are pulled lazily and only a small window is in flight, so pages can
+    be rendered one at a time while earlier ones are still being recognised.
+    """
+    window = deque()
+    try:
+        for image in images:
+            window.append(submit_ocr(image))
+            if len(window) >= 2 * OCR_MAX_CONCURRENCY:
+                yield ocr_result(window.popleft())
+        while window:
+            yield ocr_result(window.popleft())
+    finally:
+        for future in window:
+            future.cancel()
+
+def ocr_pages(pages, stats=None):
+    """OCR an iterable of pages, each a list of image_prep tiles; one merged result per page."""
+    queued = deque()
+
+    def tiles():
+        for page_tiles in pages:
+            queued.append(page_tiles)
+            if stats is not None:
+                stats.add(page_tiles)
+            for tile in page_tiles:
+                yield tile.data
+
+    results = []
+    for result in ocr_stream(tiles()):
+        results.append(result)
+        # ocr_stream pulls tiles ahead of its results, so the current page is already queued
+        if len(results) == len(queued[0]):
+            yield image_prep.merge_tiles(queued.popleft(), results)
+            results = []
+
+def ocr_lines_many(images, stats=None):
+    # The ocr callable pptx_extractor expects: OCR line lists, one per image
+    pages = (image_prep.prepare_photo(image) for image in images)
+    return [list(iter_ocr_lines(result)) for result in ocr_pages(pages, stats)]
+
+def iter_ocr_lines(result):
     for region in result.get("regions", []):
         for line in region.get("lines", []):
-            line_text = " ".join([word["text"] for word in line["words"]])
-            text += line_text + "\n"
-    return text
-
-def process_pdf_bytes(pdf_path):
-    full_text = ""
-    # Use context manager to ensure file is closed before deletion
-    with fitz.open(pdf_path) as doc:
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            pix = page.get_pixmap()
-            img_bytes = pix.tobytes()
-            ocr_result = ocr_image_bytes(img_bytes)
-            page_text = extract_text_from_ocr_result(ocr_result)
-            full_text += page_text + "\n"
-
-    cleaned = clean_text(full_text)
-    corrected = correct_grammar(cleaned)
-    summary = generate_summary(corrected)
+            yield " ".join([word["text"] for word in line["words"]])
 
-    return {
-        "raw_text": full_text,
-        "cleaned_text": cleaned,
-        "corrected_text": corrected,
-        "summary": summary
-    }
+def extract_text_from_ocr_result(result):
+    return "".join(line + "\n" for line in iter_ocr_lines(result))
 
-def process_image_bytes(image_path):
-    with open(image_path, 'rb') as image_file:
-        image_bytes = image_file.read()
+# --- Upload sources ---
+# The process_* functions take the upload as bytes, a binary file object or a
+# path (large uploads spilled to disk), so small uploads never touch the disk.
 
-    result = ocr_image_bytes(image_bytes)
-    text = extract_text_from_ocr_result(result)
+def read_source(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return f.read()
+    return source.read()
 
-    cleaned = clean_text(text)
-    corrected = correct_grammar(cleaned)
-    summary = generate_summary(corrected)
+def open_pdf(source):
+    import fitz  # PyMuPDF
+    if isinstance(source, (str, os.PathLike)):
+        return fitz.open(source)
+    return fitz.open(stream=read_source(source), filetype="pdf")
 
-    return {
-        "raw_text": text,
-        "cleaned_text": cleaned,
-        "corrected_text": corrected,
-        "summary": summary
-    }
+# Joins the pages/slides packed into one chunk; cleaned text never has more than one blank line
+SPAN_SEPARATOR = "\n\n\n"
 
-def process_pptx_text(pptx_path):
-    prs = Presentation(pptx_path)
-    full_text = ""
+def pack_window(texts, max_chunk_size=1000):
+    """Chunks for a window's cleaned texts, each a list of (text index, start, end) pieces.
 
-    for i, slide in enumerate(prs.slides):
-        slide_text = f"Slide {i + 1}:\n"
-        for shape in slide.shapes:
-            if hasattr(shape, "text"):
-                slide_text += shape.text + "\n"
-        full_text += slide_text
+    Consecutive texts that fit are packed whole into chunks of up to
+    max_chunk_size characters, so chunks end on page/slide boundaries and short
+    slides do not get model calls of their own. A longer text is split into its
+    own chunk_text chunks.
+    """
+    chunks = []
+    current = []
+    current_len = 0
+    for i, text in enumerate(texts):
+        if len(text) > max_chunk_size:
+            if current:
+                chunks.append(current)
+                current, current_len = [], 0
+            chunks.extend([(i, start, end)] for start, end in chunk_bounds(text, max_chunk_size))
+            continue
+        added = len(text) + (len(SPAN_SEPARATOR) if current else 0)
+        if current and current_len + added > max_chunk_size:
+            chunks.append(current)
+            current, current_len, added = [], 0, len(text)
+        current.append((i, 0, len(text)))
+        current_len += added
+    if current:
+        chunks.append(current)
+    return chunks
 
-    cleaned = clean_text(full_text)
-    corrected = correct_grammar(cleaned)
-    summary = generate_summary(corrected)
+def correct_chunks(chunks):
+    corrected = []
+    for chunk in chunks:
+        result = correct_grammar(chunk)
+        if result.count(SPAN_SEPARATOR) != chunk.count(SPAN_SEPARATOR):
+            # A correction touched a page boundary; correct the pages one by one instead
+            result = SPAN_SEPARATOR.join(correct_grammar(part) for part in chunk.split(SPAN_SEPARATOR))
+        corrected.append(result)
+    return corrected
 
-    return {
-        "raw_text": full_text,
-        "cleaned_text": cleaned,
-        "corrected_text": corrected,
-        "summary": summary
+def process_window(spans):
+    """Clean, correct and summarize a few spans (pages/slides).
+
+    Returns ([(span, cleaned text, corrected text)], summaries, chunks, chunks_reused);
+    spans that clean to nothing are dropped.
+    """
+    # Clean span by span so each page/slide keeps its place in the output
+    cleaned = [(span, clean_text(span.text)) for span in spans]
+    cleaned = [(span, text) for span, text in cleaned if text]
+
+    # Correction and summarization run per chunk (pack_window): small pages and
+    # slides are packed together, whole, and long ones split. Editing a slide
+    # only changes the chunks of its window; chunks seen before (by content
+    # hash) come from chunk_store, so re-uploading an edited deck gives the
+    # same result as a full recompute
+    texts = [text for _, text in cleaned]
+    packed = pack_window(texts)
+    chunks = [SPAN_SEPARATOR.join(texts[i][start:end] for i, start, end in pieces) for pieces in packed]
+    corrected_chunks, grammar_reused = chunk_store.cached_map("grammar:en-US", chunks, correct_chunks)
+    summaries, summary_reused = chunk_store.cached_map(
+        "summary:" + SUMMARIZATION_MODEL, [chunk.replace(SPAN_SEPARATOR, "\n\n") for chunk in corrected_chunks],
+        summarize_chunks)
+
+    # Corrected pieces go back to their page/slide; text between a long page's
+    # chunks (paragraph breaks) is kept around them
+    corrected_pieces = [[] for _ in texts]
+    for pieces, corrected in zip(packed, corrected_chunks):
+        for (i, start, end), part in zip(pieces, corrected.split(SPAN_SEPARATOR)):
+            corrected_pieces[i].append((start, end, part))
+    results = []
+    for (span, text), pieces in zip(cleaned, corrected_pieces):
+        parts = []
+        position = 0
+        for start, end, part in pieces:
+            parts.append(text[position:start])
+            parts.append(part)
+            position = end
+        parts.append(text[position:])
+        results.append((span, text, "".join(parts)))
+    reused = sum(1 for g, s in zip(grammar_reused, summary_reused) if g and s)
+    return results, summaries, len(chunks), reused
+
+def process_spans(spans, fields=TEXT_FIELDS):
+    """Process an iterable of document_model Spans in windows of STREAM_WINDOW.
+
+    Spans are pulled lazily (pages are OCRed as they are needed), and only the
+    current window's text is held. The text fields named in fields are
+    written to TextSpools (temporary files once large) and returned at the
+    end; the others are not kept at all. "sources" gives each span's offsets
+    in corrected_text for citing pages later.
+    """
+    unknown = set(fields) - set(TEXT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    spools = {
+        "raw_text": TextSpool("", keep="raw_text" in fields),
+        "cleaned_text": TextSpool("\n\n", keep="cleaned_text" in fields),
+        "corrected_text": TextSpool("\n\n", keep="corrected_text" in fields),
     }
+    summaries = []
+    sources = []
+    chunks = 0
+    chunks_reused = 0
+
+    def flush(window):
+        nonlocal chunks, chunks_reused
+        for span in window:
+            spools["raw_text"].add(span.text)
+        results, window_summaries, window_chunks, window_reused = process_window(window)
+        for span, cleaned, corrected in results:
+            spools["cleaned_text"].add(cleaned)
+            start = spools["corrected_text"].add(corrected)
+            sources.append({"kind": span.kind, "number": span.number, "start": start, "end": start + len(corrected)})
+        summaries.extend(window_summaries)
+        chunks += window_chunks
+        chunks_reused += window_reused
+
+    try:
+        window = []
+        for span in spans:
+            window.append(span)
+            if len(window) >= STREAM_WINDOW:
+                flush(window)
+                window = []
+        if window:
+            flush(window)
+        result = {field: spools[field].getvalue() for field in TEXT_FIELDS if field in fields}
+    finally:
+        for spool in spools.values():
+            spool.close()
+
+    result.update({
+        "summary": " ".join(summaries).strip(),
+        "sources": sources,
+        "chunks": chunks,
+        "chunks_reused": chunks_reused
+    })
+    return result
+
+def iter_pdf_pages(source, stats=None):
+    # Use context manager to ensure the document is closed
+    with open_pdf(source) as doc:
+        # Pages are rendered here, in order (PyMuPDF is not thread-safe), and OCRed concurrently.
+        # image_prep picks each page's DPI and encoding and tiles pages over the OCR size limit
+        pages = (image_prep.prepare_page(doc.load_page(page_num)) for page_num in range(len(doc)))
+        for page_num, ocr_result in enumerate(ocr_pages(pages, stats)):
+            parts = [line + "\n" for line in iter_ocr_lines(ocr_result)]
+            parts.append("\n")
+            yield Span("page", page_num + 1, parts)
+
+def process_pdf_bytes(source, fields=TEXT_FIELDS):
+    stats = image_prep.OcrStats()
+    result = process_spans(iter_pdf_pages(source, stats), fields)
+    result["ocr"] = stats.as_dict()
+    return result
+
+def process_image_bytes(source, fields=TEXT_FIELDS):
+    # Photos are sent in grayscale, downscaled and tiled (see image_prep)
+    stats = image_prep.OcrStats()
+    ocr_result = next(ocr_pages([image_prep.prepare_photo(read_source(source))], stats))
+    span = Span("image", 1, [line + "\n" for line in iter_ocr_lines(ocr_result)])
+
+    result = process_spans([span], fields)
+    result["ocr"] = stats.as_dict()
+    return result
+
+def process_pptx_text(source, fields=TEXT_FIELDS):
+    from io import BytesIO
+    from pptx_extractor import iter_slides
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = BytesIO(source)
+    stats = image_prep.OcrStats()
+
+    # Tables, grouped shapes and notes included; pictures OCRed on text-poor slides
+    slides = iter_slides(source, ocr=lambda images: ocr_lines_many(images, stats))
+    result = process_spans((Span("slide", number, parts) for number, parts in slides), fields)
+    result["ocr"] = stats.as_dict()
+    return result
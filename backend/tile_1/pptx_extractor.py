@@ -0,0 +1,127 @@
+"""
+pptx_extractor.py - Slide text from PowerPoint decks, including tables, groups and notes
+
+Slides are read in a worker pool and streamed back in slide order, a few at a time. Besides
+plain text shapes it reads table cells, shapes nested in groups and the
+speaker notes. Pictures are OCRed only on slides that carry little text of
+their own; an image repeated across the deck (a logo, a template background)
+is OCRed once.
+"""
+
+import os
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+PPTX_WORKERS = int(os.getenv("EDUBOT_PPTX_WORKERS", "4"))
+# Slides with fewer characters of text than this get their pictures OCRed
+PPTX_OCR_MIN_TEXT = int(os.getenv("EDUBOT_PPTX_OCR_MIN_TEXT", "40"))
+# Image types the Vision OCR endpoint accepts
+OCR_CONTENT_TYPES = {"image/jpeg", "image/png", "image/gif", "image/bmp"}
+
+
+def iter_shape_parts(shapes, pictures):
+    """Yield text parts for shapes (recursing into groups); pictures collects image blobs."""
+    from pptx.shapes.group import GroupShape
+    from pptx.shapes.picture import Picture
+
+    for shape in shapes:
+        if isinstance(shape, GroupShape):
+            yield from iter_shape_parts(shape.shapes, pictures)
+        elif getattr(shape, "has_table", False):
+            for row in shape.table.rows:
+                cells = [cell.text.strip() for cell in row.cells]
+                if any(cells):
+                    yield "\t".join(cells) + "\n"
+        elif hasattr(shape, "text"):
+            yield shape.text + "\n"
+        elif isinstance(shape, Picture):
+            try:
+                image = shape.image
+            except ValueError:
+                # Linked rather than embedded picture
+                continue
+            if image.content_type in OCR_CONTENT_TYPES:
+                pictures.append(image.blob)
+
+
+class _SharedOcr:
+    """OCR for the pictures of one deck; each distinct image is sent once."""
+
+    def __init__(self, ocr):
+        self._ocr = ocr
+        self._lock = threading.Lock()
+        self._results = {}
+
+    def lines(self, blobs):
+        keys = [hashlib.sha1(blob).hexdigest() for blob in blobs]
+        owned = {}
+        with self._lock:
+            for key, blob in zip(keys, blobs):
+                if key not in self._results:
+                    self._results[key] = Future()
+                    owned[key] = blob
+        if owned:
+            try:
+                for key, lines in zip(owned, self._ocr(list(owned.values()))):
+                    self._results[key].set_result(lines)
+            except Exception as e:
+                for key in owned:
+                    if not self._results[key].done():
+                        self._results[key].set_exception(e)
+        result = []
+        for key in dict.fromkeys(keys):
+            try:
+                result.extend(self._results[key].result())
+            except Exception as e:
+                print(f"Slide image OCR failed: {e}")
+        return result
+
+
+def extract_slide(number, slide, shared_ocr=None):
+    """Text parts for one slide, in the same "Slide N:" layout as before."""
+    pictures = []
+    parts = [f"Slide {number}:\n"]
+    parts.extend(iter_shape_parts(slide.shapes, pictures))
+
+    text_length = sum(len(part.strip()) for part in parts[1:])
+    if shared_ocr and pictures and text_length < PPTX_OCR_MIN_TEXT:
+        parts.extend(line + "\n" for line in shared_ocr.lines(pictures))
+
+    # notes_slide would create an empty notes page, so check first
+    if slide.has_notes_slide:
+        frame = slide.notes_slide.notes_text_frame
+        notes = frame.text.strip() if frame is not None else ""
+        if notes:
+            parts.append(f"Notes: {notes}\n")
+    return parts
+
+
+def iter_slides(source, ocr=None, workers=None):
+    """Yield (slide_number, parts) in slide order.
+
+    source is a path or a binary file object. ocr, if given, takes a list of
+    image bytes and returns a list of OCR line lists, one per image.
+    """
+    from pptx import Presentation
+
+    prs = Presentation(source)
+    shared_ocr = _SharedOcr(ocr) if ocr else None
+    workers = workers or PPTX_WORKERS
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pptx") as pool:
+        # Slides are handed back in order as soon as each is ready; only a small
+        # window is extracted ahead, so a slow consumer keeps memory bounded
+        window = deque()
+        try:
+            for number, slide in enumerate(prs.slides, start=1):
+                window.append((number, pool.submit(extract_slide, number, slide, shared_ocr)))
+                if len(window) >= 2 * workers:
+                    number, future = window.popleft()
+                    yield number, future.result()
+            while window:
+                number, future = window.popleft()
+                yield number, future.result()
+        finally:
+            for _, future in window:
+                future.cancel()
@@ -1,6 +1,6 @@
 import os
+import threading
 from dotenv import load_dotenv
-import azure.cognitiveservices.speech as speechsdk
 
 # Load environment variables from .env
 load_dotenv()
@@ -8,12 +8,22 @@ load_dotenv()
 speech_key = os.getenv("SPEECH_KEY")
 speech_region = os.getenv("SPEECH_REGION")
 
-speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=speech_region)
+# The Speech SDK and its SpeechConfig are created on first use, not at import
+_speech_config = None
+
+def get_speech_config():
+    global _speech_config
+    if _speech_config is None:
+        import azure.cognitiveservices.speech as speechsdk
+        _speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=speech_region)
+    return _speech_config
 
 def transcribe_audio_file(audio_file_path):
+    import azure.cognitiveservices.speech as speechsdk
+    speech_config = get_speech_config()
     audio_config = speechsdk.AudioConfig(filename=audio_file_path)
     recognizer = speechsdk.SpeechRecognizer(speech_config=speech_config, audio_config=audio_config)
-    done = False
+    done = threading.Event()
     all_text = []
 
     def recognized(evt):
@@ -21,27 +31,27 @@ def transcribe_audio_file(audio_file_path):
             all_text.append(evt.result.text)
 
     def stop_cb(evt):
-        nonlocal done
-        done = True
+        done.set()
 
     recognizer.recognized.connect(recognized)
     recognizer.session_stopped.connect(stop_cb)
     recognizer.canceled.connect(stop_cb)
 
     recognizer.start_continuous_recognition()
-    while not done:
-        import time
-        time.sleep(0.5)
+    # Wake up as soon as the session stops instead of polling every 0.5 s
+    done.wait()
     recognizer.stop_continuous_recognition()
 
     return {"success": True, "text": " ".join(all_text)}
 
 def transcribe_microphone():
-    recognizer = speechsdk.SpeechRecognizer(speech_config=speech_config)
+    import azure.cognitiveservices.speech as speechsdk
+    recognizer = speechsdk.SpeechRecognizer(speech_config=get_speech_config())
     result = recognizer.recognize_once()
     return process_result(result)
 
 def process_result(result):
+    import azure.cognitiveservices.speech as speechsdk
     if result.reason == speechsdk.ResultReason.RecognizedSpeech:
         text = result.text
         return {"success": True, "text": text}
@@ -0,0 +1,25 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+from typing import List
+import azure.functions as func
+from blob_jobs import plan_job, upload_blob_name
+from main_pipeline import get_upload_properties
+
+def main(event: func.EventGridEvent, jobs: func.Out[List[str]]) -> None:
+    # A BlobCreated event carries only the blob's URL and metadata; a blob
+    # trigger would have the host download the whole upload into the worker
+    if event.event_type != "Microsoft.Storage.BlobCreated":
+        return
+    blob_name = upload_blob_name(event.subject)
+    if blob_name is None:
+        logging.info(f"Ignoring event for {event.subject}: not in the upload container")
+        return
+    logging.info(f"📥 New upload {blob_name} ({event.get_json().get('contentLength')} bytes)")
+    # Planned from the blob's properties; the workers read their own byte ranges
+    messages = plan_job(blob_name, get_upload_properties(blob_name))
+    if messages:
+        jobs.set(messages)
+        logging.info(f"Queued {len(messages)} batch(es) for {blob_name}")
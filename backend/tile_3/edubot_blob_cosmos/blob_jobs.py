@@ -0,0 +1,197 @@
+"""
+blob_jobs.py - Asynchronous processing of uploads that land in Blob Storage
+
+Flow (see the blob_ingest, job_worker and job_poison functions):
+1. blob_ingest receives the Event Grid BlobCreated event for each new blob
+   in BLOB_UPLOAD_CONTAINER (a blob trigger would make the host download the
+   whole upload). It plans the job from the blob's properties alone:
+   the idempotency key is the name plus the Content-MD5 (the ETag when no
+   MD5 is set), and the file is split into byte ranges of
+   EDUBOT_JOB_BATCH_BYTES, one queue message per range.
+2. job_worker processes the lines that start within its range (see
+   read_owned_lines; a range is read with the planned ETag, so a blob
+   replaced in between fails rather than mixing versions), runs
+   main_pipeline.process_text and stores the result as
+   jobs/<job id>/batch-NNNNN.json in BLOB_RESULTS_CONTAINER. A batch that
+   already has a result is skipped, so redelivered messages are harmless. The
+   worker that finds every batch done merges them, uploads the summary and
+   flashcards, saves to Cosmos and writes jobs/<job id>/done.json.
+3. A message that keeps failing is moved to the poison queue by the Functions
+   host after maxDequeueCount attempts (host.json). job_poison records it as
+   jobs/<job id>/failed-batch-NNNNN.json.
+
+Uploading the same content again (or a redelivered event) finds done.json
+and enqueues nothing. Queue depth drives scale-out.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import datetime
+
+from main_pipeline import (download_blob_bytes, upload_to_blob, read_result_blob,
+                           list_result_blobs, save_to_cosmos, process_text)
+
+JOB_BATCH_BYTES = int(os.getenv("EDUBOT_JOB_BATCH_BYTES", 256 * 1024))
+# Only plain text is processed here; other uploads go through the web app
+JOB_EXTENSIONS = (".txt",)
+# Longest line the workers look ahead for; a file without line breaks fails instead
+JOB_MAX_LINE_BYTES = int(os.getenv("EDUBOT_JOB_MAX_LINE_BYTES", 1024 * 1024))
+# Read size when looking for the line break that ends a range
+_ALIGN_READ = 64 * 1024
+
+
+def upload_blob_name(subject):
+    """Blob name from a BlobCreated event subject; None outside BLOB_UPLOAD_CONTAINER.
+
+    The subject is "/blobServices/default/containers/<container>/blobs/<name>".
+    """
+    prefix = f"/blobServices/default/containers/{os.getenv('BLOB_UPLOAD_CONTAINER')}/blobs/"
+    if not subject.startswith(prefix):
+        return None
+    return subject[len(prefix):]
+
+
+def fingerprint(properties):
+    """Content identity from blob properties: Content-MD5 if set, else the ETag."""
+    content_md5 = properties.content_settings.content_md5
+    if content_md5:
+        return bytes(content_md5).hex()
+    return properties.etag.strip('"')
+
+
+def job_id_for(blob_name, fingerprint):
+    base = os.path.splitext(os.path.basename(blob_name))[0]
+    return f"{base}-{hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:16]}"
+
+
+def done_blob(job_id):
+    return f"jobs/{job_id}/done.json"
+
+
+def batch_blob(job_id, index):
+    return f"jobs/{job_id}/batch-{index:05d}.json"
+
+
+def batch_ranges(size, batch_bytes=None):
+    """(offset, length) byte ranges of batch_bytes each covering size bytes."""
+    batch_bytes = batch_bytes or JOB_BATCH_BYTES
+    return [(offset, min(batch_bytes, size - offset)) for offset in range(0, size, batch_bytes)]
+
+
+def _next_line_start(read, size, position):
+    """Position just after the first b"\\n" at or after position (size if there is none).
+
+    Raises ValueError if no line break is found within JOB_MAX_LINE_BYTES, so
+    every worker of a file without line breaks fails fast rather than reading
+    the rest of the blob.
+    """
+    limit = min(size, position + JOB_MAX_LINE_BYTES)
+    while position < limit:
+        block = read(position, min(_ALIGN_READ, limit - position))
+        newline = block.find(b"\n")
+        if newline >= 0:
+            return position + newline + 1
+        position += len(block)
+    if limit < size:
+        raise ValueError(f"No line break within {JOB_MAX_LINE_BYTES} bytes at offset {position}")
+    return size
+
+
+def read_owned_lines(read, size, offset, length):
+    """The bytes of every line that starts within [offset, offset + length).
+
+    read(offset, length) returns a byte range of the size-byte blob. Each line
+    belongs to exactly one range, so the batches cover the file once, and
+    b"\\n" never occurs inside a multi-byte UTF-8 character, so every batch
+    decodes on its own. A line longer than a batch is kept whole, up to
+    JOB_MAX_LINE_BYTES.
+    """
+    end = min(size, offset + length)
+    start = _next_line_start(read, size, offset - 1) if offset > 0 else 0
+    if start >= end:
+        return b""
+    stop = _next_line_start(read, size, end - 1) if end < size else size
+    return read(start, stop - start)
+
+
+def plan_job(blob_name, properties):
+    """Queue messages (JSON strings) for a new upload; [] if it was already processed.
+
+    properties are the blob's (main_pipeline.get_upload_properties); the content is not read.
+    """
+    if not blob_name.lower().endswith(JOB_EXTENSIONS):
+        logging.info(f"Skipping {blob_name}: not a text upload")
+        return []
+    job_id = job_id_for(blob_name, fingerprint(properties))
+    if read_result_blob(done_blob(job_id)) is not None:
+        logging.info(f"Skipping {blob_name}: job {job_id} already done")
+        return []
+    ranges = batch_ranges(properties.size)
+    return [json.dumps({"job_id": job_id, "blob": blob_name, "batch": i, "batches": len(ranges),
+                        "offset": offset, "length": length, "size": properties.size,
+                        "etag": properties.etag})
+            for i, (offset, length) in enumerate(ranges)]
+
+
+def process_batch(message):
+    """Process one queue message; returns True if this call finished the job."""
+    job = json.loads(message)
+    result_name = batch_blob(job["job_id"], job["batch"])
+    if read_result_blob(result_name) is None:
+        def read(offset, length):
+            return download_blob_bytes(job["blob"], offset=offset, length=length, etag=job["etag"])
+        text = read_owned_lines(read, job["size"], job["offset"], job["length"]).decode("utf-8")
+        summary, flashcards = process_text(text) if text.strip() else ("", [])
+        upload_to_blob(result_name, json.dumps({"summary": summary, "flashcards": flashcards}, ensure_ascii=False))
+    else:
+        logging.info(f"Batch {job['batch']} of {job['job_id']} already processed")
+    return finish_job(job)
+
+
+def finish_job(job):
+    job_id = job["job_id"]
+    if read_result_blob(done_blob(job_id)) is not None:
+        return False
+    prefix = f"jobs/{job_id}/batch-"
+    done = sorted(list_result_blobs(prefix))
+    if len(done) < job["batches"]:
+        return False
+
+    # Every worker that gets here writes the same merged result, so a race is harmless
+    summaries = []
+    flashcards = []
+    for name in done:
+        result = json.loads(read_result_blob(name))
+        summaries.append(result["summary"])
+        flashcards.extend(result["flashcards"])
+    summary = " ".join(s for s in summaries if s).strip()
+
+    upload_to_blob(f"{job_id}_summary_OCR.txt", summary)
+    upload_to_blob(f"{job_id}_flashcards_OCR.json", json.dumps(flashcards, indent=2, ensure_ascii=False))
+    document = {"id": job_id, "summary": summary, "flashcards": flashcards}
+    # The web app's search index picks this up with search_index.py --rebuild
+    save_to_cosmos(document)
+    upload_to_blob(done_blob(job_id), json.dumps({
+        "blob": job["blob"],
+        "batches": job["batches"],
+        "finished": datetime.datetime.now(datetime.UTC).isoformat()
+    }))
+    logging.info(f"Job {job_id} finished ({job['batches']} batches)")
+    return True
+
+
+def record_failure(message, dequeue_count=None):
+    """Keep a poison message where it can be inspected and retried."""
+    try:
+        job = json.loads(message)
+        name = f"jobs/{job['job_id']}/failed-batch-{job['batch']:05d}.json"
+    except (ValueError, KeyError, TypeError):
+        job = {"message": message}
+        name = f"jobs/invalid/{hashlib.sha256(message.encode('utf-8')).hexdigest()[:16]}.json"
+    job["dequeue_count"] = dequeue_count
+    job["failed"] = datetime.datetime.now(datetime.UTC).isoformat()
+    upload_to_blob(name, json.dumps(job, ensure_ascii=False))
+    logging.error(f"Poison message stored as {name}")
+    return name
@@ -0,0 +1,115 @@
+"""
+budget.py - Latency budgets for summarization and flashcard generation
+
+A mode trades quality for time:
+    fast       greedy decoding, short summaries, one Bloom's question per sentence,
+               QA stops once max_flashcards good answers exist
+    balanced   2 beams, medium summaries, two Bloom's questions, early exit
+    thorough   the model's own beam settings and length caps, three Bloom's
+               questions, every question answered (the behaviour without a mode)
+
+predict() estimates a request's time from the work it implies (generated tokens
+x beams, QA questions) and seconds-per-unit costs. observe() keeps those costs
+as moving averages of measured runs in this process, so predictions follow the
+hardware. Routes report predicted vs. actual time, so the UI can offer a fast
+preview before a thorough run.
+"""
+
+import os
+import time
+import threading
+
+from text_normalizer import normalize
+from document_analysis import analyze
+
+
+class Budget:
+    def __init__(self, name, num_beams=None, max_summary_length=150, blooms_per_sentence=3,
+                 max_flashcards=None, early_stop=False, qa_round=8):
+        self.name = name
+        self.num_beams = num_beams              # None: the model's generation config
+        self.max_summary_length = max_summary_length
+        self.blooms_per_sentence = blooms_per_sentence
+        self.max_flashcards = max_flashcards    # None: no limit
+        self.early_stop = early_stop            # answer questions in rounds, stop at max_flashcards
+        self.qa_round = qa_round
+
+    def summary_options(self):
+        if self.num_beams is None:
+            return {}
+        return {"num_beams": self.num_beams, "early_stopping": self.num_beams > 1}
+
+    def summary_length(self, chunk):
+        max_len = min(self.max_summary_length, max(30, len(chunk) // 5))
+        return max_len, min(40, max_len // 2)
+
+
+BUDGETS = {
+    "fast": Budget("fast", num_beams=1, max_summary_length=80, blooms_per_sentence=1,
+                   max_flashcards=8, early_stop=True),
+    "balanced": Budget("balanced", num_beams=2, max_summary_length=120, blooms_per_sentence=2,
+                       max_flashcards=15, early_stop=True),
+    "thorough": Budget("thorough"),
+}
+DEFAULT_MODE = os.getenv("EDUBOT_DEFAULT_MODE", "thorough")
+# Beams bart-large-cnn uses when num_beams is not given
+MODEL_NUM_BEAMS = 4
+KEYWORD_QUESTIONS = 10
+
+
+def get_budget(mode=None):
+    mode = mode or DEFAULT_MODE
+    if mode not in BUDGETS:
+        raise ValueError(f"Unknown mode {mode!r}; use one of {', '.join(BUDGETS)}")
+    return BUDGETS[mode]
+
+
+# --- Time model ---
+
+# Seconds per unit, seeded with CPU figures and replaced by measurements as requests run
+_costs = {"summarize": 0.002, "answer": 0.06}
+_costs_lock = threading.Lock()
+_SMOOTHING = 0.2
+
+
+def observe(stage, units, seconds):
+    if units <= 0:
+        return
+    with _costs_lock:
+        _costs[stage] = (1 - _SMOOTHING) * _costs[stage] + _SMOOTHING * (seconds / units)
+
+
+def summarize_units(chunks, budget):
+    beams = budget.num_beams or MODEL_NUM_BEAMS
+    return sum(budget.summary_length(chunk)[0] for chunk in chunks) * beams
+
+
+def predict(text, budget, use_blooms=True):
+    """Predicted seconds to summarize text and generate its flashcards under budget."""
+    # Same cleaning and chunking as summarizer.generate_summary (the analysis is shared)
+    chunks = analyze(normalize(text, "summary")).chunks()
+    summary_tokens = sum(budget.summary_length(chunk)[0] for chunk in chunks)
+    questions = KEYWORD_QUESTIONS
+    if use_blooms:
+        # About 25 tokens per summary sentence
+        questions += budget.blooms_per_sentence * max(1, summary_tokens // 25)
+    if budget.early_stop and budget.max_flashcards:
+        questions = min(questions, 2 * budget.max_flashcards)
+    with _costs_lock:
+        return summarize_units(chunks, budget) * _costs["summarize"] + questions * _costs["answer"]
+
+
+class Timer:
+    """Wall time of one request, reported next to its prediction."""
+
+    def __init__(self, budget, predicted):
+        self.budget = budget
+        self.predicted = predicted
+        self.start = time.perf_counter()
+
+    def report(self):
+        return {
+            "mode": self.budget.name,
+            "predicted_seconds": round(self.predicted, 2),
+            "actual_seconds": round(time.perf_counter() - self.start, 2),
+        }
@@ -0,0 +1,100 @@
+"""
+chunk_store.py - Outputs of per-chunk pipeline stages, keyed by content hash
+
+A stage (grammar correction, summarization, ...) that is a pure function of
+one chunk's text stores its result under hash(stage, chunk). When an edited
+document is uploaded again, the chunks that did not change get their results
+from the store and only the new or changed ones are computed, in one batch.
+The merged output is therefore the same as a full recompute.
+Stage names should include anything else the result depends on (model name,
+parameters). Set EDUBOT_CHUNK_CACHE=0 to always recompute.
+
+The store is bounded: results unused for EDUBOT_CHUNK_CACHE_MAX_AGE_DAYS are
+dropped, and beyond EDUBOT_CHUNK_CACHE_MAX_ROWS the least recently used go
+first (0 disables either limit). Pruning runs whenever results are added.
+"""
+
+import os
+import json
+import time
+
+from local_store import connect, content_hash, in_batches
+
+CHUNK_CACHE = os.getenv("EDUBOT_CHUNK_CACHE", "1") != "0"
+CHUNK_CACHE_MAX_ROWS = int(os.getenv("EDUBOT_CHUNK_CACHE_MAX_ROWS", "100000"))
+CHUNK_CACHE_MAX_AGE_DAYS = float(os.getenv("EDUBOT_CHUNK_CACHE_MAX_AGE_DAYS", "30"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    hash TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    used REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS outputs_used ON outputs (used);
+"""
+
+# A hit refreshes its last-used time at most this often, so reads rarely write
+_TOUCH_SECONDS = 3600
+
+
+def _conn():
+    return connect("chunks", SCHEMA)
+
+
+def _touch(conn, keys, now):
+    for batch, placeholders in in_batches(keys):
+        conn.execute(f"UPDATE outputs SET used = ? WHERE hash IN ({placeholders}) AND used < ?",
+                     [now, *batch, now - _TOUCH_SECONDS])
+
+
+def prune(conn=None, now=None):
+    """Drop expired results, then the least recently used beyond the row cap."""
+    conn = conn or _conn()
+    now = time.time() if now is None else now
+    with conn:
+        if CHUNK_CACHE_MAX_AGE_DAYS > 0:
+            conn.execute("DELETE FROM outputs WHERE used < ?", (now - CHUNK_CACHE_MAX_AGE_DAYS * 86400,))
+        if CHUNK_CACHE_MAX_ROWS > 0:
+            excess = conn.execute("SELECT COUNT(*) FROM outputs").fetchone()[0] - CHUNK_CACHE_MAX_ROWS
+            if excess > 0:
+                conn.execute("DELETE FROM outputs WHERE hash IN (SELECT hash FROM outputs ORDER BY used LIMIT ?)",
+                             (excess,))
+
+
+def cached_map(stage, chunks, compute):
+    """[compute(chunk) results] for chunks, reusing stored results.
+
+    compute takes the list of chunks that are missing and returns their
+    results in order (so a stage can batch its model calls). Results must be
+    JSON-serializable. Returns (results, reused), where reused[i] is True if
+    chunk i came from the store.
+    """
+    chunks = list(chunks)
+    if not CHUNK_CACHE:
+        return list(compute(chunks)) if chunks else [], [False] * len(chunks)
+
+    keys = [content_hash(stage + "\0" + chunk) for chunk in chunks]
+    conn = _conn()
+    stored = {}
+    for batch, placeholders in in_batches(dict.fromkeys(keys)):
+        for key, result in conn.execute(f"SELECT hash, result FROM outputs WHERE hash IN ({placeholders})", batch):
+            stored[key] = json.loads(result)
+
+    reused = [key in stored for key in keys]
+    now = time.time()
+    if stored:
+        with conn:
+            _touch(conn, list(stored), now)
+    # Identical chunks within one document are computed once
+    missing = {}
+    for key, chunk in zip(keys, chunks):
+        if key not in stored and key not in missing:
+            missing[key] = chunk
+    if missing:
+        computed = dict(zip(missing, compute(list(missing.values()))))
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO outputs (hash, result, used) VALUES (?, ?, ?)",
+                             [(key, json.dumps(result), now) for key, result in computed.items()])
+        prune(conn, now)
+        stored.update(computed)
+    return [stored[key] for key in keys], reused
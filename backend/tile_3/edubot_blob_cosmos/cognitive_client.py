@@ -0,0 +1,265 @@
+"""
+cognitive_client.py - One asyncio HTTP client for the Azure Cognitive REST APIs
+
+Vision OCR and Translator calls go through a single aiohttp session per process.
+It runs on an event loop in a background thread, keeps connections alive, and
+gives each service its own:
+    timeout       per-request total timeout
+    concurrency   an AIMD limit: +1/limit per success up to the ceiling, halved
+                  on 429/503 (and paused for Retry-After), never below 1
+    retries       429, 5xx, timeouts and connection errors are retried with
+                  exponential backoff and jitter, honouring Retry-After
+    circuit       after consecutive failures (5xx, timeouts, connection
+                  errors; throttling is left to the concurrency limit) the
+                  service is skipped for a cool-down (calls fail fast); then
+                  one trial call decides whether it closes again
+
+Callers use request() from ordinary threads, or submit() to get a
+concurrent.futures.Future and keep several calls in flight.
+"""
+
+import os
+import time
+import random
+import asyncio
+import threading
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+_BACKOFF_STATUS = {429, 503}
+# Statuses that count against the circuit (429 only means "slow down")
+_FAILURE_STATUS = {500, 502, 503, 504}
+
+
+class ServiceError(Exception):
+    def __init__(self, service, status, message):
+        super().__init__(f"{service}: HTTP {status} {message}".strip())
+        self.service = service
+        self.status = status
+
+
+class ServiceUnavailable(ServiceError):
+    """The service's circuit is open: it failed repeatedly and is cooling down."""
+
+
+class Response:
+    def __init__(self, service, status, headers, body):
+        self.service = service
+        self.status_code = status
+        self.headers = headers
+        self.content = body
+
+    def json(self):
+        import json
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise ServiceError(self.service, self.status_code, self.content[:200].decode("utf-8", "replace"))
+
+
+class Service:
+    def __init__(self, name, timeout, max_concurrency, retries=3, failure_threshold=5, cooldown=30.0):
+        self.name = name
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._reset()
+
+    def _reset(self):
+        # Loop-bound state, recreated for each process's event loop
+        self.limit = float(max(1, self.max_concurrency // 2))
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.failures = 0
+        self.open_until = 0.0
+        self.trial_running = False
+        self._condition = None
+
+    def condition(self):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    # --- AIMD concurrency ---
+
+    async def acquire(self):
+        condition = self.condition()
+        async with condition:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    try:
+                        await asyncio.wait_for(condition.wait(), self.paused_until - now)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                await condition.wait()
+
+    async def release(self, status):
+        condition = self.condition()
+        async with condition:
+            self.in_flight -= 1
+            if status in _BACKOFF_STATUS:
+                self.limit = max(1.0, self.limit / 2)
+            elif status is not None and status < 400:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            condition.notify_all()
+
+    async def pause(self, seconds):
+        condition = self.condition()
+        async with condition:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    # --- Circuit breaker ---
+
+    def check_circuit(self):
+        """Raise ServiceUnavailable if calls must not be made; True if this call is the half-open trial."""
+        now = time.monotonic()
+        if now < self.open_until:
+            raise ServiceUnavailable(self.name, 503, "circuit open")
+        if self.failures >= self.failure_threshold:
+            # Half-open: one trial call at a time
+            if self.trial_running:
+                raise ServiceUnavailable(self.name, 503, "circuit half-open")
+            self.trial_running = True
+            return True
+        return False
+
+    def record(self, ok, trial=False):
+        """Outcome of a call: True, False, or None when it says nothing about the service's health."""
+        if trial:
+            self.trial_running = False
+        if ok is None:
+            return
+        if ok:
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.open_until = time.monotonic() + self.cooldown
+
+
+SERVICES = {
+    "vision": Service("vision", timeout=float(os.getenv("EDUBOT_VISION_TIMEOUT", "30")),
+                      max_concurrency=int(os.getenv("EDUBOT_OCR_MAX_CONCURRENCY", "4"))),
+    "translator": Service("translator", timeout=float(os.getenv("EDUBOT_TRANSLATOR_TIMEOUT", "15")),
+                          max_concurrency=int(os.getenv("EDUBOT_TRANSLATOR_MAX_CONCURRENCY", "4"))),
+}
+
+_state = {"pid": None, "loop": None, "session": None}
+_state_lock = threading.Lock()
+
+
+def _get_loop():
+    with _state_lock:
+        if _state["pid"] != os.getpid():
+            # First use in this process (or after a fork): start a fresh loop thread
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="cognitive-client", daemon=True).start()
+            for service in SERVICES.values():
+                service._reset()
+            _state.update(pid=os.getpid(), loop=loop, session=None)
+        return _state["loop"]
+
+
+def _get_session():
+    # Called on the loop thread only
+    if _state["session"] is None:
+        import aiohttp
+        connector = aiohttp.TCPConnector(limit=100, keepalive_timeout=30)
+        _state["session"] = aiohttp.ClientSession(connector=connector)
+    return _state["session"]
+
+
+async def _send(service, method, url, params, headers, data, json):
+    """One HTTP exchange: (status, headers, body). Benchmarks replace this hook.
+
+    headers stay aiohttp's case-insensitive multidict: services may send "retry-after".
+    """
+    import aiohttp
+    timeout = aiohttp.ClientTimeout(total=service.timeout)
+    async with _get_session().request(method, url, params=params, headers=headers, data=data,
+                                      json=json, timeout=timeout) as response:
+        return response.status, response.headers, await response.read()
+
+
+def _retry_after(headers, attempt):
+    value = (headers or {}).get("Retry-After")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return min(30.0, 0.5 * 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+def _transient_errors():
+    # Timeouts, socket errors and aiohttp's own errors (server disconnects,
+    # payload errors, ...), most of which are not OSErrors
+    try:
+        import aiohttp
+    except ImportError:
+        return (asyncio.TimeoutError, OSError)
+    return (asyncio.TimeoutError, OSError, aiohttp.ClientError)
+
+
+async def _attempt(service, method, url, params, headers, data, json):
+    """One call through the circuit and the concurrency limit: (status, headers, body, error)."""
+    trial = service.check_circuit()
+    outcome = None
+    try:
+        await service.acquire()
+        status = None
+        try:
+            status, response_headers, body = await _send(service, method, url, params, headers, data, json)
+        finally:
+            await service.release(status)
+        if status in _FAILURE_STATUS:
+            outcome = False
+        elif status != 429:
+            outcome = True
+        return status, response_headers, body, None
+    except _transient_errors() as e:
+        outcome = False
+        return None, {}, b"", e
+    finally:
+        # On every exit, cancellation included, so a half-open trial never stays claimed
+        service.record(outcome, trial)
+
+
+async def arequest(service_name, method, url, params=None, headers=None, data=None, json=None):
+    service = SERVICES[service_name]
+    attempt = 0
+    while True:
+        status, response_headers, body, error = await _attempt(service, method, url, params, headers, data, json)
+        if error is None and status not in _RETRY_STATUS:
+            return Response(service_name, status, response_headers, body)
+
+        if status in _BACKOFF_STATUS and "Retry-After" in response_headers:
+            await service.pause(_retry_after(response_headers, attempt))
+        if attempt >= service.retries:
+            if error is not None:
+                raise ServiceError(service_name, 0, repr(error)) from error
+            return Response(service_name, status, response_headers, body)
+        await asyncio.sleep(_retry_after(response_headers, attempt))
+        attempt += 1
+
+
+def submit(service_name, method, url, params=None, headers=None, data=None, json=None):
+    """Start a call on the client loop; returns a concurrent.futures.Future of a Response."""
+    if hasattr(data, "read"):
+        # Read file objects here so a retry can send the same bytes again
+        data = data.read()
+    return asyncio.run_coroutine_threadsafe(
+        arequest(service_name, method, url, params, headers, data, json), _get_loop())
+
+
+def request(service_name, method, url, **kwargs):
+    return submit(service_name, method, url, **kwargs).result()
+
+
+def post(service_name, url, **kwargs):
+    return request(service_name, "POST", url, **kwargs)
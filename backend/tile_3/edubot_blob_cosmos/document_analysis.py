@@ -0,0 +1,88 @@
+"""
+document_analysis.py - Per-document sentence index shared within a request
+
+analyze(text) tokenizes a text into sentences once, with the shared Punkt
+tokenizer, and keeps the results: sentence offsets, per-sentence token counts,
+term counts, packed chunks and sentence embeddings. Chunking, keyword
+extraction, deduplication and question generation all read from the same
+object, and recent analyses are cached by text, so a summary that the
+summarizer chunked is not re-tokenized when flashcards are generated from it.
+"""
+
+import os
+import re
+import string
+import threading
+from collections import Counter
+from functools import lru_cache
+
+from model_loader import get_sentence_tokenizer
+from document_model import pack_sentence_spans
+import inference
+
+ANALYSIS_CACHE_SIZE = int(os.getenv("EDUBOT_ANALYSIS_CACHE_SIZE", "8"))
+
+# Same tokens CountVectorizer produced for keyword extraction: 2+ word characters
+TERM = re.compile(r"(?u)\b\w\w+\b")
+_PUNCTUATION = str.maketrans('', '', string.punctuation)
+
+
+def terms(text):
+    """Lower-cased terms of text, punctuation removed (what term_counts counts)."""
+    return TERM.findall(text.lower().translate(_PUNCTUATION))
+
+
+class DocumentAnalysis:
+    def __init__(self, text):
+        self.text = text
+        self._lock = threading.Lock()
+        self._spans = None
+        self._token_counts = None
+        self._term_counts = None
+        self._chunks = {}
+        self._embeddings = None
+
+    @property
+    def sentence_spans(self):
+        """(start, end) offsets of each sentence in self.text."""
+        if self._spans is None:
+            self._spans = list(get_sentence_tokenizer().span_tokenize(self.text))
+        return self._spans
+
+    @property
+    def sentences(self):
+        return [self.text[start:end] for start, end in self.sentence_spans]
+
+    @property
+    def token_counts(self):
+        """Whitespace-separated tokens in each sentence."""
+        if self._token_counts is None:
+            self._token_counts = [len(sentence.split()) for sentence in self.sentences]
+        return self._token_counts
+
+    @property
+    def term_counts(self):
+        """Counter of lower-cased terms, punctuation removed."""
+        if self._term_counts is None:
+            self._term_counts = Counter(terms(self.text))
+        return self._term_counts
+
+    def chunks(self, max_chunk_size=1000):
+        """Sentences packed into chunks of at most max_chunk_size characters."""
+        if max_chunk_size not in self._chunks:
+            self._chunks[max_chunk_size] = [
+                chunk for chunk, _, _ in pack_sentence_spans(self.text, self.sentence_spans, max_chunk_size)
+            ]
+        return self._chunks[max_chunk_size]
+
+    def embeddings(self):
+        """One embedding per sentence, computed in a single batch on first use."""
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = inference.embed(self.sentences)
+            return self._embeddings
+
+
+@lru_cache(maxsize=ANALYSIS_CACHE_SIZE)
+def analyze(text):
+    return DocumentAnalysis(text)
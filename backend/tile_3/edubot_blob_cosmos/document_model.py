@@ -0,0 +1,135 @@
+"""
+document_model.py - Pages, slides and lines kept as spans with provenance
+
+Extraction appends text parts to spans (one per PDF page, slide or image)
+instead of concatenating strings, and a span's text is joined once, when it
+is first needed. Each span remembers where it came from, so QA answers and
+flashcards can be traced back to a page or slide through character offsets
+(source_at) without scanning the text again.
+
+Documents are processed as a stream of spans: TextSpool writes the text span
+by span, to a temporary file once large, and only offsets stay in memory.
+"""
+
+import os
+import tempfile
+from bisect import bisect_right
+
+# TextSpool keeps up to this many characters in memory before moving to a temporary file
+SPILL_CHARS = int(os.getenv("EDUBOT_SPILL_CHARS", 1024 * 1024))
+
+
+class Span:
+    __slots__ = ("kind", "number", "parts", "_text")
+
+    def __init__(self, kind, number, parts=None):
+        self.kind = kind
+        self.number = number
+        self.parts = list(parts or [])
+        self._text = None
+
+    def append(self, part):
+        self.parts.append(part)
+        self._text = None
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = "".join(self.parts)
+        return self._text
+
+
+class TextSpool:
+    """Text appended span by span, joined by separator, spilled to disk when large.
+
+    With keep=False nothing is stored; only the offsets are tracked.
+    """
+
+    def __init__(self, separator="", keep=True):
+        self.separator = separator
+        self.keep = keep
+        self.length = 0
+        self._count = 0
+        self._file = tempfile.SpooledTemporaryFile(max_size=SPILL_CHARS, mode="w+", encoding="utf-8") if keep else None
+
+    def add(self, text):
+        """Append one span's text; returns its start offset."""
+        if self._count and self.separator:
+            self._write(self.separator)
+        start = self.length
+        self._write(text)
+        self._count += 1
+        return start
+
+    def _write(self, text):
+        if self._file is not None:
+            self._file.write(text)
+        self.length += len(text)
+
+    def getvalue(self):
+        if self._file is None:
+            return None
+        self._file.seek(0)
+        return self._file.read()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def check_sources(sources):
+    """sources sent back by a client (as /ocr_summarize returned them); ValueError if source_at cannot use them."""
+    if sources is None:
+        return None
+    if not isinstance(sources, list) or not all(
+            isinstance(s, dict) and "kind" in s and "number" in s
+            and isinstance(s.get("start"), int) and not isinstance(s["start"], bool)
+            for s in sources):
+        raise ValueError('"sources" must be a list of {"kind", "number", "start", "end"} spans')
+    starts = [s["start"] for s in sources]
+    if starts != sorted(starts):
+        raise ValueError('"sources" must be ordered by "start"')
+    return sources
+
+
+def source_at(sources, offset):
+    """The source dict whose span contains offset (the nearest preceding one in a separator)."""
+    if not sources:
+        return None
+    index = bisect_right([s["start"] for s in sources], offset) - 1
+    return sources[max(index, 0)]
+
+
+def pack_sentence_spans(text, sentence_spans, max_chunk_size=1000):
+    """Greedily pack sentences, given as (start, end) offsets into text, into chunks of at
+    most max_chunk_size characters; yields (chunk, start, end).
+
+    Same chunks as the old `current_chunk += " " + sent` loop, in linear time.
+    """
+    spans = list(sentence_spans)
+    for chunk, first, last in _pack([text[s:e] for s, e in spans], max_chunk_size):
+        if first is None:
+            yield chunk, 0, 0
+        else:
+            yield chunk, spans[first][0], spans[last][1]
+
+
+def _pack(sentences, max_chunk_size):
+    chunks = []
+    current = []
+    current_len = 0
+    first = None
+    for i, sent in enumerate(sentences):
+        if current_len + len(sent) + 1 <= max_chunk_size:
+            current.append(sent)
+            current_len += len(sent) + 1
+            if first is None:
+                first = i
+        else:
+            chunks.append((" ".join(current).strip(), first, i - 1 if current else None))
+            current = [sent]
+            current_len = len(sent)
+            first = i
+    if current_len:
+        chunks.append((" ".join(current).strip(), first, len(sentences) - 1))
+    return chunks
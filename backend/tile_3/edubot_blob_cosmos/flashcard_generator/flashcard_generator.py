@@ -7,78 +7,69 @@ Usage:
 import os
 import sys
 import json
-import re
-import numpy as np
-import string
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer
-from transformers import pipeline
+import math
+import time
+from collections import Counter
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# numpy, scikit-learn and the models are imported on first use
+import inference
+from text_normalizer import normalize
+from document_model import source_at, pack_sentence_spans
+from document_analysis import analyze, terms
+import keyword_engine
+import budget as budgets
+
+# QA reads the whole text for each question. Only texts over QA_LARGE_TEXT_CHARS
+# (a few hundred pages, where the per-question features run to hundreds of MB)
+# are cut into chunks of about QA_CONTEXT_CHARS, and each question gets the one
+# that shares the most (IDF-weighted) terms with it
+QA_LARGE_TEXT_CHARS = int(os.getenv("EDUBOT_QA_LARGE_TEXT_CHARS", "1000000"))
+QA_CONTEXT_CHARS = int(os.getenv("EDUBOT_QA_CONTEXT_CHARS", "4000"))
+
+def one_line(sentence):
+    return sentence.replace('\n', ' ').strip()
 
 def basic_sentence_split(text):
-    text = text.replace('\n', ' ')
-    sentences = re.split(r'(?<=[.!?]) +', text)
-    return [s.strip() for s in sentences if len(s.strip()) > 5]
+    # Sentences from the shared analysis (tokenized once per text), minus fragments
+    sentences = [one_line(s) for s in analyze(text).sentences]
+    return [s for s in sentences if len(s) > 5]
 
 def clean_text(text):
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'Page\s*\d+[:.]?', '', text, flags=re.IGNORECASE)
-    return text.strip()
+    return normalize(text, "summary")
 
 def chunk_text(text, max_chunk_size=1000):
-    sentences = basic_sentence_split(text)
-    chunks = []
-    current_chunk = ""
-    for sent in sentences:
-        if len(current_chunk) + len(sent) + 1 <= max_chunk_size:
-            current_chunk += " " + sent
-        else:
-            chunks.append(current_chunk.strip())
-            current_chunk = sent
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-    return chunks
+    return analyze(text).chunks(max_chunk_size)
 
 def generate_summary(text):
-    summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
     cleaned_text = clean_text(text)
     chunks = chunk_text(cleaned_text)
 
-    summaries = []
+    lengths = []
     for chunk in chunks:
         input_len = len(chunk.split())
         max_len = min(150, max(30, input_len))
         min_len = min(40, max_len // 2)
-        result = summarizer(chunk, max_length=max_len, min_length=min_len, do_sample=False)
-        summaries.append(result[0]['summary_text'])
+        lengths.append((max_len, min_len))
+    summaries = inference.summarize(chunks, lengths)
 
     return " ".join(summaries).strip()
 
-def extract_keywords(text, max_keywords=10):
-    text = text.lower().translate(str.maketrans('', '', string.punctuation))
-    words = text.split()
-    stopwords = set("""
-        i me my myself we our ours ourselves you your yours yourself yourselves he him his himself
-        she her hers herself it its itself they them their theirs themselves what which who whom this
-        that these those am is are was were be been being have has had having do does did doing a an
-        the and but if or because as until while of at by for with about against between into through
-        during before after above below to from up down in out on off over under again further then
-        once here there when where why how all any both each few more most other some such no nor not
-        only own same so than too very s t can will just don should now
-    """.split())
-
-    filtered_words = [w for w in words if w not in stopwords and len(w) > 2]
-    vectorizer = CountVectorizer().fit([text])
-    word_counts = vectorizer.transform([text]).toarray().flatten()
-    keywords = np.array(vectorizer.get_feature_names_out())[np.argsort(-word_counts)]
-    return keywords[:max_keywords].tolist()
-
-def is_similar(existing, new_sent, model, threshold=0.8):
-    if not existing:
+def extract_keywords(text, max_keywords=10, document=None):
+    # TF-IDF against the statistics of all processed material (keyword_engine).
+    # document is the full text a summary came from: it is what gets counted in
+    # the statistics, and the summary's keywords are scored against them
+    if document is not None:
+        keyword_engine.add_document(document)
+        return keyword_engine.extract_keywords(text, max_keywords, update=False)
+    return keyword_engine.extract_keywords(text, max_keywords)
+
+def is_similar(existing_vecs, new_vec, threshold=0.8):
+    if not len(existing_vecs):
         return False
-    new_vec = model.encode([new_sent])
-    existing_vecs = model.encode(existing)
-    sims = cosine_similarity(new_vec, existing_vecs)
+    import numpy as np
+    from sklearn.metrics.pairwise import cosine_similarity
+    sims = cosine_similarity([new_vec], existing_vecs)
     return np.max(sims) > threshold
 
 def generate_questions_from_keywords(keywords):
@@ -101,45 +92,84 @@ def generate_blooms_questions(sentence):
         f"How would you evaluate this statement: '{sentence}'?",
     ]
 
-def generate_flashcards(text, summary, use_blooms=False):
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    qa_pipeline = pipeline("question-answering", model="deepset/roberta-base-squad2")
-
-    keywords = extract_keywords(summary)
-    keyword_questions = generate_questions_from_keywords(keywords)
-
+def content_terms(text):
+    return {t for t in terms(text) if t not in keyword_engine.STOPWORDS and len(t) > 2}
+
+def qa_contexts(questions, text):
+    """(context, offset of the context in text) for each question."""
+    if len(text) <= max(QA_LARGE_TEXT_CHARS, QA_CONTEXT_CHARS):
+        return [(text, 0)] * len(questions)
+    spans = analyze(text).sentence_spans
+    bounds = [(start, end) for _, start, end in pack_sentence_spans(text, spans, QA_CONTEXT_CHARS) if end > start]
+    if not bounds:
+        return [(text, 0)] * len(questions)
+    question_terms = [content_terms(q) for q in questions]
+    wanted = set().union(*question_terms)
+    # Counts of question terms only, one chunk at a time
+    chunk_counts = [Counter(t for t in terms(text[start:end]) if t in wanted) for start, end in bounds]
+    df = Counter(t for counts in chunk_counts for t in counts)
+
+    contexts = []
+    for q_terms in question_terms:
+        best, best_score = 0, 0.0
+        for i, counts in enumerate(chunk_counts):
+            score = sum((1 + math.log(counts[t])) * math.log(1 + len(bounds) / df[t])
+                        for t in q_terms if counts[t])
+            if score > best_score:
+                best, best_score = i, score
+        start, end = bounds[best]
+        contexts.append((text[start:end], start))
+    return contexts
+
+def generate_flashcards(text, summary, use_blooms=False, sources=None, budget=None):
+    # sources: document_model spans for text ({"kind", "number", "start", "end"});
+    # when given, each flashcard cites the page/slide its answer was found on.
+    # budget (budget.Budget, default mode if None) limits Bloom's questions and flashcards
+    budget = budget or budgets.get_budget()
+    keywords = extract_keywords(summary, document=text)
+    questions = generate_questions_from_keywords(keywords)
+
+    if use_blooms:
+        # Summary sentences and their embeddings come from the summary's analysis
+        # (one embedding batch); keep the non-duplicates
+        analysis = analyze(summary)
+        used_vecs = []
+        for sent, vec in zip(analysis.sentences, analysis.embeddings()):
+            sent = one_line(sent)
+            if len(sent) <= 5 or is_similar(used_vecs, vec):
+                continue
+            used_vecs.append(vec)
+            questions.extend(generate_blooms_questions(sent)[:budget.blooms_per_sentence])
+
+    # One batched QA pass over every question, or with early stopping, rounds
+    # of qa_round questions until max_flashcards good answers exist
+    # Very large texts are answered against the best-matching chunk (qa_contexts)
     flashcards = []
-    used_sentences = []
-
-    for q in keyword_questions:
-        try:
-            answer = qa_pipeline(question=q, context=text)
-            if answer["score"] > 0.3 and answer["answer"].strip():
-                flashcards.append({
+    step = budget.qa_round if budget.early_stop and budget.max_flashcards else len(questions)
+    asked = 0
+    start = time.perf_counter()
+    all_contexts = qa_contexts(questions, text)
+    for i in range(0, len(questions), max(step, 1)):
+        batch = questions[i:i + step]
+        contexts = all_contexts[i:i + step]
+        asked += len(batch)
+        answers = inference.answer_questions(batch, [context for context, _ in contexts])
+        for q, answer, (_, offset) in zip(batch, answers, contexts):
+            if answer and answer["score"] > 0.3 and answer["answer"].strip():
+                card = {
                     "question": q,
                     "answer": answer["answer"].strip()
-                })
-        except Exception:
-            continue
-
-    summary_sentences = basic_sentence_split(summary)
-    for sent in summary_sentences:
-        if is_similar(used_sentences, sent, model):
-            continue
-        used_sentences.append(sent)
-        if use_blooms:
-            questions = generate_blooms_questions(sent)
-            for q in questions:
-                try:
-                    answer = qa_pipeline(question=q, context=text)
-                    if answer["score"] > 0.3 and answer["answer"].strip():
-                        flashcards.append({
-                            "question": q,
-                            "answer": answer["answer"].strip()
-                        })
-                except Exception:
-                    continue
-
+                }
+                source = source_at(sources, offset + answer.get("start", 0)) if sources else None
+                if source:
+                    card["source"] = {"kind": source["kind"], "number": source["number"]}
+                flashcards.append(card)
+        if budget.max_flashcards and len(flashcards) >= budget.max_flashcards:
+            break
+    budgets.observe("answer", asked, time.perf_counter() - start)
+
+    if budget.max_flashcards:
+        flashcards = flashcards[:budget.max_flashcards]
     return flashcards
 
 def main():
@@ -20,8 +20,9 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
         upload = data.get("upload", False)
 
         if upload:
-            upload_to_blob("results", f"{file_id}_summary_OCR.txt", summary)
-            upload_to_blob("results", f"{file_id}_flashcards_OCR.json", json.dumps(flashcards, indent=2, ensure_ascii=False))
+            # The results container comes from BLOB_RESULTS_CONTAINER
+            upload_to_blob(f"{file_id}_summary_OCR.txt", summary)
+            upload_to_blob(f"{file_id}_flashcards_OCR.json", json.dumps(flashcards, indent=2, ensure_ascii=False))
             save_to_cosmos({
                 "id": file_id,
                 "summary": summary,
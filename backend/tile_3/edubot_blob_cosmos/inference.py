@@ -0,0 +1,141 @@
+"""
+inference.py - Batched model calls shared by the summarizer and flashcards
+
+Every summarization, question-answering and embedding call goes through the
+three functions below. They take lists so a whole document is sent through the
+model in batched passes of at most EDUBOT_BATCH_MAX_SIZE items. When
+EDUBOT_INFERENCE_ADDRESS is set, the items are sent to the model-serving process
+(inference_server.py), which batches them with the items of every other web
+worker; otherwise the models run in-process.
+"""
+
+import os
+import threading
+from model_loader import get_summarizer, get_qa_pipeline, get_sentence_model
+
+INFERENCE_ADDRESS = os.getenv("EDUBOT_INFERENCE_ADDRESS")
+# Same cap as the inference server's batches, so a long document cannot run
+# the model over hundreds of items at once
+BATCH_MAX_SIZE = int(os.getenv("EDUBOT_BATCH_MAX_SIZE", "16"))
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Connection to the inference server for this process, or None if not configured."""
+    global _client, _client_pid
+    if not INFERENCE_ADDRESS:
+        return None
+    # A forked worker must not reuse the parent's socket
+    if _client is None or _client_pid != os.getpid() or _client.closed:
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid() or _client.closed:
+                from inference_server import InferenceClient, authkey_from_env
+                _client = InferenceClient(INFERENCE_ADDRESS, authkey_from_env())
+                _client_pid = os.getpid()
+    return _client
+
+
+# --- Local runners (also used by the inference server) ---
+
+def _batches(items):
+    items = list(items)
+    for start in range(0, len(items), BATCH_MAX_SIZE):
+        yield items[start:start + BATCH_MAX_SIZE]
+
+
+def run_summarize(texts, options):
+    summaries = []
+    for batch in _batches(texts):
+        results = get_summarizer()(batch, batch_size=len(batch), do_sample=False, **options)
+        summaries.extend(r["summary_text"] for r in results)
+    return summaries
+
+
+def run_answer(pairs, options):
+    answers = []
+    for batch in _batches(pairs):
+        questions = [q for q, _ in batch]
+        contexts = [c for _, c in batch]
+        results = get_qa_pipeline()(question=questions, context=contexts, batch_size=len(batch), **options)
+        # The pipeline returns a bare dict for a single question
+        answers.extend([results] if isinstance(results, dict) else results)
+    return answers
+
+
+def run_embed(sentences, options):
+    vectors = []
+    for batch in _batches(sentences):
+        vectors.extend(get_sentence_model().encode(batch, batch_size=len(batch), **options))
+    return vectors
+
+
+RUNNERS = {
+    "summarize": run_summarize,
+    "answer": run_answer,
+    "embed": run_embed,
+}
+
+
+def _run(kind, items, options_list):
+    client = get_client()
+    if client is not None:
+        return client.map(kind, items, options_list)
+
+    # In-process: one model pass per distinct set of options, results kept in input order
+    results = [None] * len(items)
+    groups = {}
+    for i, options in enumerate(options_list):
+        groups.setdefault(tuple(sorted(options.items())), []).append(i)
+    for key, indexes in groups.items():
+        values = RUNNERS[kind]([items[i] for i in indexes], dict(key))
+        for i, value in zip(indexes, values):
+            results[i] = value
+    return results
+
+
+# --- Public API ---
+
+def summarize(texts, lengths=None, **options):
+    """Summaries for texts; lengths is an optional list of (max_length, min_length) per text."""
+    if not texts:
+        return []
+    options_list = []
+    for i in range(len(texts)):
+        item_options = dict(options)
+        if lengths:
+            item_options["max_length"], item_options["min_length"] = lengths[i]
+        options_list.append(item_options)
+    return _run("summarize", list(texts), options_list)
+
+
+def answer_questions(questions, context):
+    """QA results (dicts with answer/score/start/end) for each question, None where it failed.
+
+    context is one string shared by every question or a list with one per question.
+    """
+    if not questions:
+        return []
+    contexts = context if isinstance(context, list) else [context] * len(questions)
+    pairs = list(zip(questions, contexts))
+    try:
+        return _run("answer", pairs, [{}] * len(pairs))
+    except Exception:
+        # Isolate the failing question(s), as the per-question loop used to
+        results = []
+        for pair in pairs:
+            try:
+                results.append(_run("answer", [pair], [{}])[0])
+            except Exception:
+                results.append(None)
+        return results
+
+
+def embed(sentences):
+    """Sentence embeddings as a 2-D numpy array."""
+    import numpy as np
+    if not sentences:
+        return np.zeros((0, 0), dtype="float32")
+    return np.vstack(_run("embed", list(sentences), [{}] * len(sentences)))
@@ -0,0 +1,271 @@
+"""
+inference_server.py - Model-serving process with dynamic cross-request batching
+
+Web workers send single summarization, QA and embedding items over a local
+socket (multiprocessing.connection). The server groups items of the same kind
+and options into batches: a batch is run as soon as it holds
+EDUBOT_BATCH_MAX_SIZE items or the oldest item has waited
+EDUBOT_BATCH_MAX_WAIT_MS, so latency stays bounded at low load while
+concurrent requests share model passes at high load.
+
+Connections unpickle what they receive, so the server and its clients must
+share a secret EDUBOT_INFERENCE_AUTHKEY; there is no default key.
+
+Usage:
+    export EDUBOT_INFERENCE_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(16))")
+    python inference_server.py --address /tmp/edubot-inference.sock
+    EDUBOT_INFERENCE_ADDRESS=/tmp/edubot-inference.sock python app.py
+"""
+
+import os
+import time
+import queue
+import argparse
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from multiprocessing.connection import Listener, Client
+
+MAX_BATCH_SIZE = int(os.getenv("EDUBOT_BATCH_MAX_SIZE", "16"))
+MAX_WAIT_MS = float(os.getenv("EDUBOT_BATCH_MAX_WAIT_MS", "10"))
+# Longest a client waits for its next result before giving up on the server
+REQUEST_TIMEOUT = float(os.getenv("EDUBOT_INFERENCE_TIMEOUT", "300"))
+
+
+def authkey_from_env():
+    """EDUBOT_INFERENCE_AUTHKEY as bytes (required: a well-known key would let anyone send pickles)."""
+    authkey = os.getenv("EDUBOT_INFERENCE_AUTHKEY")
+    if not authkey:
+        raise RuntimeError("EDUBOT_INFERENCE_AUTHKEY must be set to use the inference server")
+    return authkey.encode()
+
+
+def parse_address(address):
+    # "host:port" for TCP, anything else is a Unix socket path
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return (host or "127.0.0.1", int(port))
+    return address
+
+
+class _Connection:
+    """A client connection; batcher threads reply on it concurrently."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.lock = threading.Lock()
+
+    def send(self, message):
+        with self.lock:
+            try:
+                self.conn.send(message)
+            except (OSError, EOFError):
+                pass  # client went away; its pending results are dropped
+
+
+class _Batcher(threading.Thread):
+    def __init__(self, kind, options, max_batch, max_wait):
+        super().__init__(daemon=True)
+        self.kind = kind
+        self.options = options
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+
+    def run(self):
+        from inference import RUNNERS
+        runner = RUNNERS[self.kind]
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                values = runner([item for _, _, item in batch], self.options)
+                replies = [(True, value) for value in values]
+            except Exception as e:
+                replies = [(False, repr(e))] * len(batch)
+            for (conn, request_id, _), (ok, value) in zip(batch, replies):
+                conn.send((request_id, ok, value))
+
+
+class InferenceServer:
+    def __init__(self, address, authkey, max_batch=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._batchers = {}
+        self._lock = threading.Lock()
+
+    def _batcher(self, kind, options):
+        key = (kind, tuple(sorted(options.items())))
+        batcher = self._batchers.get(key)
+        if batcher is None:
+            with self._lock:
+                batcher = self._batchers.get(key)
+                if batcher is None:
+                    batcher = _Batcher(kind, options, self.max_batch, self.max_wait)
+                    batcher.start()
+                    self._batchers[key] = batcher
+        return batcher
+
+    def _serve_connection(self, conn):
+        client = _Connection(conn)
+        while True:
+            try:
+                request_id, kind, item, options = conn.recv()
+            except (EOFError, OSError):
+                break
+            self._batcher(kind, options).queue.put((client, request_id, item))
+        conn.close()
+
+    def serve_forever(self, ready=None):
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+        with Listener(self.address, authkey=self.authkey) as listener:
+            print(f"🧠 Inference server listening on {self.address}")
+            if ready is not None:
+                ready.set()
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception:
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+
+class InferenceClient:
+    """Thread-safe client: many request threads share one connection per process."""
+
+    def __init__(self, address, authkey):
+        self._conn = Client(parse_address(address), authkey=authkey)
+        self._send_lock = threading.Lock()
+        # Guards _pending and closed: a future is never registered after the close sweep
+        self._pending_lock = threading.Lock()
+        self._pending = {}
+        self._ids = itertools.count()
+        self.closed = False
+        threading.Thread(target=self._receive, daemon=True).start()
+
+    def _receive(self):
+        while True:
+            try:
+                request_id, ok, value = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._pending_lock:
+                future = self._pending.pop(request_id, None)
+            if future is None:
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(f"Inference failed: {value}"))
+        with self._pending_lock:
+            self.closed = True
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            future.set_exception(ConnectionError("Inference server connection closed"))
+
+    def _submit(self, kind, item, options):
+        future = Future()
+        request_id = next(self._ids)
+        with self._pending_lock:
+            if self.closed:
+                raise ConnectionError("Inference server connection closed")
+            self._pending[request_id] = future
+        try:
+            with self._send_lock:
+                self._conn.send((request_id, kind, item, options or {}))
+        except (OSError, EOFError) as e:
+            self._forget([request_id])
+            raise ConnectionError("Inference server connection closed") from e
+        return request_id, future
+
+    def _forget(self, request_ids):
+        with self._pending_lock:
+            for request_id in request_ids:
+                self._pending.pop(request_id, None)
+
+    def submit(self, kind, item, options=None):
+        return self._submit(kind, item, options)[1]
+
+    def map(self, kind, items, options_list, timeout=None):
+        """Results in input order; raises TimeoutError if any result takes longer than timeout seconds to arrive."""
+        timeout = REQUEST_TIMEOUT if timeout is None else timeout
+        requests = [self._submit(kind, item, options) for item, options in zip(items, options_list)]
+        try:
+            return [future.result(timeout=timeout) for _, future in requests]
+        except FutureTimeout:
+            self._forget([request_id for request_id, _ in requests])
+            raise TimeoutError(f"No result from the inference server within {timeout} seconds") from None
+
+
+def _run_server(address, authkey, max_batch, max_wait_ms, init, ready):
+    if init is not None:
+        init()
+    from model_loader import get_summarizer, get_qa_pipeline, get_sentence_model
+    get_summarizer()
+    get_qa_pipeline()
+    get_sentence_model()
+    InferenceServer(address, authkey, max_batch, max_wait_ms).serve_forever(ready)
+
+
+def start_server_process(address, authkey, max_batch=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, init=None):
+    """Start the server in a fresh (spawned) process and wait until it accepts connections.
+
+    init is an optional picklable callable run in the server process before the models load.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Event()
+    proc = ctx.Process(target=_run_server, args=(address, authkey, max_batch, max_wait_ms, init, ready),
+                       daemon=True, name="edubot-inference")
+    proc.start()
+    while not ready.wait(0.5):
+        if not proc.is_alive():
+            raise RuntimeError("Inference server exited during startup")
+    return proc
+
+
+def wait_for_server(address, authkey, timeout=600.0, proc=None):
+    """Block until the server accepts connections (model loading can take minutes)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            Client(parse_address(address), authkey=authkey).close()
+            return
+        except (OSError, EOFError):
+            if proc is not None and proc.poll() is not None:
+                raise RuntimeError("Inference server exited during startup")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Inference server not ready on {address}")
+            time.sleep(0.5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the EduBot model-serving process")
+    parser.add_argument("--address", default=os.getenv("EDUBOT_INFERENCE_ADDRESS", "/tmp/edubot-inference.sock"),
+                        help="Unix socket path or host:port")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    try:
+        authkey = authkey_from_env()
+    except RuntimeError as e:
+        parser.error(str(e))
+    _run_server(args.address, authkey, args.max_batch, args.max_wait_ms, None, None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import azure.functions as func
+from blob_jobs import record_failure
+
+def main(msg: func.QueueMessage) -> None:
+    logging.warning(f"☠️ Job message {msg.id} failed {msg.dequeue_count} times")
+    record_failure(msg.get_body().decode("utf-8"), msg.dequeue_count)
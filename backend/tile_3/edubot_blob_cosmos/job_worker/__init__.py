@@ -0,0 +1,12 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import azure.functions as func
+from blob_jobs import process_batch
+
+def main(msg: func.QueueMessage) -> None:
+    logging.info(f"🧠 Processing job message {msg.id} (attempt {msg.dequeue_count})")
+    # Exceptions propagate: the host retries the message, then moves it to edubot-jobs-poison
+    process_batch(msg.get_body().decode("utf-8"))
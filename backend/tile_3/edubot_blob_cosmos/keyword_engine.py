@@ -0,0 +1,79 @@
+"""
+keyword_engine.py - TF-IDF keywords against statistics of all processed material
+
+Every processed document adds its distinct terms to a document-frequency table
+in local_store (SQLite). Documents are keyed by content hash, so reprocessing
+the same text does not count it twice. Keywords of a text are its terms scored
+by term frequency x inverse document frequency. Term frequencies come from a
+Counter (a sparse vector), only the text's own terms are looked up in the
+store, and the top k are picked with heapq instead of sorting every term.
+"""
+
+import math
+import heapq
+
+from local_store import connect, content_hash, in_batches
+from document_analysis import analyze
+
+STOPWORDS = frozenset("""
+    i me my myself we our ours ourselves you your yours yourself yourselves he him his himself
+    she her hers herself it its itself they them their theirs themselves what which who whom this
+    that these those am is are was were be been being have has had having do does did doing a an
+    the and but if or because as until while of at by for with about against between into through
+    during before after above below to from up down in out on off over under again further then
+    once here there when where why how all any both each few more most other some such no nor not
+    only own same so than too very s t can will just don should now
+""".split())
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (hash TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS term_df (term TEXT PRIMARY KEY, df INTEGER NOT NULL);
+"""
+
+
+def _conn():
+    return connect("keywords", SCHEMA)
+
+
+def term_vector(text):
+    """Sparse term-frequency vector {term: count} of a text, stopwords and short terms removed."""
+    counts = analyze(text).term_counts
+    return {term: n for term, n in counts.items() if term not in STOPWORDS and len(term) > 2}
+
+
+def add_document(text):
+    """Count text's terms in the corpus statistics; returns False if it was already counted."""
+    terms = term_vector(text)
+    conn = _conn()
+    with conn:
+        inserted = conn.execute("INSERT OR IGNORE INTO documents (hash) VALUES (?)",
+                                (content_hash(text),)).rowcount
+        if inserted:
+            conn.executemany(
+                "INSERT INTO term_df (term, df) VALUES (?, 1) "
+                "ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                ((term,) for term in terms))
+    return bool(inserted)
+
+
+def document_frequencies(terms):
+    conn = _conn()
+    n_docs = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+    df = {}
+    for batch, placeholders in in_batches(terms):
+        df.update(conn.execute(f"SELECT term, df FROM term_df WHERE term IN ({placeholders})", batch))
+    return n_docs, df
+
+
+def extract_keywords(text, max_keywords=10, update=True):
+    """Top max_keywords terms of text by TF-IDF; ties broken alphabetically.
+
+    With update=True the text is first added to the corpus statistics.
+    """
+    if update:
+        add_document(text)
+    tf = term_vector(text)
+    n_docs, df = document_frequencies(tf)
+    # Smoothed IDF, as in scikit-learn: unseen terms count as appearing in no document
+    scores = {term: n * (math.log((1 + n_docs) / (1 + df.get(term, 0))) + 1) for term, n in tf.items()}
+    return heapq.nsmallest(max_keywords, scores, key=lambda term: (-scores[term], term))
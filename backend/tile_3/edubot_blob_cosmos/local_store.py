@@ -0,0 +1,90 @@
+"""
+local_store.py - Small on-disk stores kept next to the app (SQLite)
+
+Statistics and indexes that outlive a request (keyword document frequencies,
+...) are kept in SQLite files under EDUBOT_DATA_DIR. Every thread gets its
+own connection, and forked workers open fresh ones. WAL mode lets the
+gunicorn workers read and write the same files at the same time.
+A thread's connections are closed when the thread ends (or when it calls
+close()), and whatever is still open is closed when the process exits.
+"""
+
+import os
+import atexit
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import weakref
+
+DATA_DIR = os.getenv("EDUBOT_DATA_DIR", os.path.join(tempfile.gettempdir(), "edubot"))
+# Stay under SQLite's limit on bound parameters per statement
+LOOKUP_BATCH = 500
+
+_local = threading.local()
+_open = {"pid": None, "connections": weakref.WeakSet()}
+
+
+class _Connection(sqlite3.Connection):
+    # A subclass, so the process-wide registry can hold it weakly
+    pass
+
+
+def data_path(*parts):
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, *parts)
+
+
+def content_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def in_batches(values):
+    """(batch, placeholders) for "... IN (placeholders)" statements over values, LOOKUP_BATCH at a time."""
+    values = list(values)
+    for i in range(0, len(values), LOOKUP_BATCH):
+        batch = values[i:i + LOOKUP_BATCH]
+        yield batch, ",".join("?" * len(batch))
+
+
+def connect(name, schema=""):
+    """This thread's connection to DATA_DIR/<name>.sqlite3, creating the schema on first use."""
+    if getattr(_local, "pid", None) != os.getpid():
+        _local.pid = os.getpid()
+        _local.connections = {}
+    conn = _local.connections.get(name)
+    if conn is None:
+        # check_same_thread is off only so close_all() can close it at exit
+        conn = sqlite3.connect(data_path(name + ".sqlite3"), timeout=30, factory=_Connection,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if schema:
+            conn.executescript(schema)
+        _local.connections[name] = conn
+        if _open["pid"] != os.getpid():
+            # A forked child must not close its parent's connections
+            _open.update(pid=os.getpid(), connections=weakref.WeakSet())
+        _open["connections"].add(conn)
+    return conn
+
+
+def close():
+    """Close this thread's connections (the next connect() opens new ones)."""
+    if getattr(_local, "pid", None) == os.getpid():
+        for conn in _local.connections.values():
+            conn.close()
+    _local.connections = {}
+    _local.pid = os.getpid()
+
+
+@atexit.register
+def close_all():
+    """Close every connection this process still has open, so SQLite checkpoints its WAL."""
+    if _open["pid"] != os.getpid():
+        return
+    for conn in list(_open["connections"]):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
@@ -9,48 +9,69 @@ Responsibilities:
 
 import os
 import json
-import re
 import datetime
 import argparse
-from transformers import pipeline
-import language_tool_python
-from azure.storage.blob import BlobServiceClient
-from azure.cosmos import CosmosClient
 from dotenv import load_dotenv
+from model_loader import correct_grammar
+from text_normalizer import normalize
+from document_analysis import analyze
+import search_index
+import inference
 
 # Load environment variables from .env file
 load_dotenv()
-print("AZURE_BLOB_CONN_STR =", os.getenv("AZURE_BLOB_CONN_STR"))
-print("BLOB_RESULTS_CONTAINER =", os.getenv("BLOB_RESULTS_CONTAINER"))
 
 # --- Azure Integration ---
-def download_from_blob(blob_name):
+# AZURE_BLOB_CONN_STR may be "UseDevelopmentStorage=true" to run against Azurite locally
+def get_container(setting, kind):
+    from azure.storage.blob import BlobServiceClient
     conn_str = os.getenv("AZURE_BLOB_CONN_STR")
-    container_name = os.getenv("BLOB_UPLOAD_CONTAINER")
+    container_name = os.getenv(setting)
     if not conn_str or not container_name:
-        raise EnvironmentError("Azure Blob Storage connection string or upload container name not set in environment variables")
+        raise EnvironmentError(f"Azure Blob Storage connection string or {kind} container name not set in environment variables")
     blob_service = BlobServiceClient.from_connection_string(conn_str)
-    blob_client = blob_service.get_blob_client(container=container_name, blob=blob_name)
-    return blob_client.download_blob().readall().decode("utf-8")
+    return blob_service.get_container_client(container_name)
+
+def download_blob_bytes(blob_name, offset=None, length=None, etag=None):
+    # offset/length (bytes) download part of a large upload; with etag, fail if the blob has changed since
+    from azure.core import MatchConditions
+    blob_client = get_container("BLOB_UPLOAD_CONTAINER", "upload").get_blob_client(blob_name)
+    conditions = {"etag": etag, "match_condition": MatchConditions.IfNotModified} if etag else {}
+    return blob_client.download_blob(offset=offset, length=length, **conditions).readall()
+
+def get_upload_properties(blob_name):
+    """Size, ETag and Content-MD5 of an upload, without downloading it."""
+    blob_client = get_container("BLOB_UPLOAD_CONTAINER", "upload").get_blob_client(blob_name)
+    return blob_client.get_blob_properties()
 
 def upload_to_blob(blob_name, data):
-    conn_str = os.getenv("AZURE_BLOB_CONN_STR")
-    container_name = os.getenv("BLOB_RESULTS_CONTAINER")
-    if not conn_str or not container_name:
-        raise EnvironmentError("Azure Blob Storage connection string or results container name not set in environment variables")
-    blob_service = BlobServiceClient.from_connection_string(conn_str)
-    blob_client = blob_service.get_blob_client(container=container_name, blob=blob_name)
+    blob_client = get_container("BLOB_RESULTS_CONTAINER", "results").get_blob_client(blob_name)
     blob_client.upload_blob(data, overwrite=True)
 
-def save_to_cosmos(document):
+def read_result_blob(blob_name):
+    """A results-container blob as text, or None if it does not exist."""
+    from azure.core.exceptions import ResourceNotFoundError
+    blob_client = get_container("BLOB_RESULTS_CONTAINER", "results").get_blob_client(blob_name)
+    try:
+        return blob_client.download_blob().readall().decode("utf-8")
+    except ResourceNotFoundError:
+        return None
+
+def list_result_blobs(prefix):
+    return [blob.name for blob in get_container("BLOB_RESULTS_CONTAINER", "results").list_blobs(name_starts_with=prefix)]
+
+def get_cosmos_container():
+    from azure.cosmos import CosmosClient
     endpoint = os.getenv("AZURE_COSMOS_ENDPOINT")
     key = os.getenv("AZURE_COSMOS_KEY")
     if not endpoint or not key:
         raise EnvironmentError("Azure Cosmos DB endpoint or key not set in environment variables")
     client = CosmosClient(endpoint, key)
     database = client.get_database_client(os.getenv("COSMOS_DATABASE"))
-    container = database.get_container_client(os.getenv("COSMOS_CONTAINER"))
-    container.upsert_item({
+    return database.get_container_client(os.getenv("COSMOS_CONTAINER"))
+
+def save_to_cosmos(document):
+    get_cosmos_container().upsert_item({
         "id": document["id"],
         "summary": document["summary"],
         "flashcards": document["flashcards"],
@@ -59,57 +80,38 @@ def save_to_cosmos(document):
 
 # --- Text Processing ---
 def clean_text_general(text):
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'Page\s*\d+[:.]?', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'\b\d+\.', '', text)
-    text = re.sub(r'[•·]', '-', text)
-    text = re.sub(r'(\w)[.,](\w)', r'\1. \2', text)
-    text = re.sub(r'([a-z])([A-Z])', r'\1. \2', text)
-    return text.strip()
-
-def correct_grammar(text):
-    tool = None
-    try:
-        tool = language_tool_python.LanguageTool('en-US')
-        matches = tool.check(text)
-        return language_tool_python.utils.correct(text, matches)
-    finally:
-        if tool:
-            tool.close()
+    # Whitespace, page numbers, list numbers, bullets, glued sentences
+    return normalize(text, "pipeline")
 
 def chunk_text(text, chunk_size=1024, overlap=200):
     return [text[i:i+chunk_size] for i in range(0, len(text), chunk_size - overlap)]
 
 def summarize_text(text):
-    summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
     chunks = chunk_text(text)
-    summary = ""
-    for chunk in chunks:
-        result = summarizer(chunk, max_length=150, min_length=40, do_sample=False)
-        summary += result[0]["summary_text"] + " "
-    return summary.strip()
+    summaries = inference.summarize(chunks, max_length=150, min_length=40)
+    return " ".join(summaries).strip()
 
 def generate_flashcards(text, summary):
-    qa_pipeline = pipeline("question-answering", model="deepset/roberta-base-squad2")
-    sentences = [s.strip() for s in re.split(r'[.!?]', summary) if len(s.strip().split()) > 5]
+    # Sentences of more than five words, from the summary's shared analysis
+    analysis = analyze(summary)
+    sentences = [s.strip().rstrip('.!?') for s, n in zip(analysis.sentences, analysis.token_counts) if n > 5]
     templates = [
         "Explain: {}", "What does this mean: {}",
         "Summarize: {}", "Why is this important: {}"
     ]
-    flashcards = []
+    questions = []
     for i, s in enumerate(sentences[:10]):
         template = templates[i % len(templates)]
         short_s = (s[:80] + "…") if len(s) > 80 else s
-        question = template.format(short_s)
-        try:
-            answer = qa_pipeline(question=question, context=text)
-            if answer['score'] > 0.3 and answer['answer'].strip():
-                flashcards.append({
-                    "question": question,
-                    "answer": answer['answer'].strip()
-                })
-        except Exception:
-            continue
+        questions.append(template.format(short_s))
+
+    flashcards = []
+    for question, answer in zip(questions, inference.answer_questions(questions, text)):
+        if answer and answer['score'] > 0.3 and answer['answer'].strip():
+            flashcards.append({
+                "question": question,
+                "answer": answer['answer'].strip()
+            })
     return flashcards
 
 def process_text(text):
@@ -147,12 +149,17 @@ def main():
     if args.upload:
         upload_to_blob(summary_file, summary)
         upload_to_blob(flashcard_file, json.dumps(flashcards, indent=2, ensure_ascii=False))
-        save_to_cosmos({
+        document = {
             "id": base_name,
             "summary": summary,
             "flashcards": flashcards
-        })
+        }
+        save_to_cosmos(document)
         print("Results uploaded to Azure.")
+        try:
+            search_index.add_document(document)
+        except Exception as e:
+            print("Search indexing failed:", e)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+model_loader.py - Lazily loaded, process-wide shared models
+
+Heavy libraries (transformers, torch, sentence-transformers, nltk,
+language-tool) are imported the first time a model is requested instead of at
+module import time, and every model is built once per process and reused.
+This keeps `import app` and Azure Functions cold starts cheap.
+
+For production, serve.py calls preload_models() in the gunicorn master before
+forking so every worker shares one copy of the weights (copy-on-write), and
+model calls are limited to EDUBOT_INFERENCE_CONCURRENCY per worker process so
+CPU-bound inference cannot starve the I/O-bound routes.
+"""
+
+import os
+import atexit
+import threading
+
+SUMMARIZATION_MODEL = "facebook/bart-large-cnn"
+QA_MODEL = "deepset/roberta-base-squad2"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# NLTK data is read from a local bundle (or $NLTK_DATA), never downloaded at runtime
+NLTK_DATA_DIR = os.getenv("NLTK_DATA", os.path.join(os.path.dirname(__file__), "nltk_data"))
+
+INFERENCE_CONCURRENCY = int(os.getenv("EDUBOT_INFERENCE_CONCURRENCY", "1"))
+
+_lock = threading.RLock()
+_models = {}
+_inference_slots = threading.BoundedSemaphore(INFERENCE_CONCURRENCY)
+
+
+class LimitedModel:
+    """Wraps a model so calls hold one of the per-process inference slots."""
+
+    def __init__(self, model, methods=("__call__",)):
+        self._model = model
+        self._methods = methods
+
+    def __call__(self, *args, **kwargs):
+        with _inference_slots:
+            return self._model(*args, **kwargs)
+
+    def __getattr__(self, name):
+        attr = getattr(self._model, name)
+        if name not in self._methods or not callable(attr):
+            return attr
+
+        def limited(*args, **kwargs):
+            with _inference_slots:
+                return attr(*args, **kwargs)
+        return limited
+
+
+def _get(name, factory):
+    model = _models.get(name)
+    if model is None:
+        with _lock:
+            model = _models.get(name)
+            if model is None:
+                model = factory()
+                _models[name] = model
+    return model
+
+
+def get_summarizer():
+    def build():
+        from transformers import pipeline
+        return LimitedModel(pipeline("summarization", model=SUMMARIZATION_MODEL))
+    return _get("summarizer", build)
+
+
+def get_qa_pipeline():
+    def build():
+        from transformers import pipeline
+        return LimitedModel(pipeline("question-answering", model=QA_MODEL))
+    return _get("qa", build)
+
+
+def get_sentence_model():
+    def build():
+        from sentence_transformers import SentenceTransformer
+        return LimitedModel(SentenceTransformer(EMBEDDING_MODEL), methods=("encode",))
+    return _get("embedding", build)
+
+
+def get_grammar_tool():
+    def build():
+        import language_tool_python
+        tool = language_tool_python.LanguageTool('en-US')
+        owner = os.getpid()
+
+        def close():
+            # Forked workers share the server started by the master; only the owner stops it
+            if os.getpid() == owner:
+                tool.close()
+        atexit.register(close)
+        return tool
+    return _get("grammar", build)
+
+
+def get_sentence_tokenizer():
+    def build():
+        import nltk
+        from nltk.tokenize.punkt import PunktSentenceTokenizer, PunktParameters
+        if NLTK_DATA_DIR not in nltk.data.path:
+            nltk.data.path.insert(0, NLTK_DATA_DIR)
+        # Untrained Punkt parameters, as before: no punkt download is needed
+        return PunktSentenceTokenizer(PunktParameters())
+    return _get("sentence_tokenizer", build)
+
+
+def correct_grammar(text):
+    import language_tool_python
+    matches = get_grammar_tool().check(text)
+    return language_tool_python.utils.correct(text, matches)
+
+
+def preload_models(grammar=True):
+    """Load every model now (used by serve.py before forking workers)."""
+    get_summarizer()
+    get_qa_pipeline()
+    get_sentence_model()
+    get_sentence_tokenizer()
+    if grammar:
+        get_grammar_tool()
+
+
+def configure_torch_threads(num_threads):
+    # Avoid oversubscribing cores when several worker processes run inference
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(max(1, num_threads))
@@ -0,0 +1,410 @@
+"""
+search_index.py - Semantic search over stored summaries and flashcards
+
+Every summary and flashcard saved to Cosmos is embedded with the shared MiniLM
+model and appended to a local index under EDUBOT_DATA_DIR:
+    search_vectors.f32    unit-length float32 rows, appended in place and read through np.memmap
+    search.sqlite3        row -> document id, kind, text and flashcard, plus its IVF list;
+                          rows freed by re-indexing a document are reused by later writes
+    search_centroids-N.npy  IVF centroids (spherical k-means) trained on N rows; meta names
+                          the current file, so the lists and their centroids commit together
+
+Until the index has IVF_MIN_ROWS rows a query is scored against every row.
+After that the rows are grouped into about sqrt(n) lists, and a query only
+reads the rows of its EDUBOT_SEARCH_NPROBE nearest lists from the memory map.
+This approximate nearest-neighbour search keeps memory bounded by the
+candidates rather than by the index. The lists are retrained whenever the
+index has doubled, by a background thread outside the write lock (and at the
+end of a rebuild), so saving a result never waits for k-means.
+
+Cosmos is the source of truth; rebuild with
+    python search_index.py --rebuild
+"""
+
+import os
+import json
+import math
+import argparse
+import threading
+
+from local_store import connect, data_path, close
+import inference
+
+SEARCH_NPROBE = int(os.getenv("EDUBOT_SEARCH_NPROBE", "8"))
+IVF_MIN_ROWS = int(os.getenv("EDUBOT_SEARCH_IVF_MIN_ROWS", "1024"))
+# Rows scored per block, and documents embedded per batch when indexing many
+_BLOCK_ROWS = 8192
+_INDEX_BATCH = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    row INTEGER PRIMARY KEY,
+    doc_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    text TEXT NOT NULL,
+    flashcard TEXT,
+    list_id INTEGER,
+    seq INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS items_doc ON items (doc_id);
+CREATE INDEX IF NOT EXISTS items_list ON items (list_id);
+CREATE INDEX IF NOT EXISTS items_seq ON items (seq);
+CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+_lock = threading.Lock()
+_centroids = {"name": None, "array": None}
+_training = {"thread": None, "pid": None}
+
+
+def _conn():
+    return connect("search", SCHEMA)
+
+
+def _vectors_path():
+    return data_path("search_vectors.f32")
+
+
+def _centroids_path(name):
+    return data_path(name)
+
+
+def _get_meta(conn, key, default=None):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def _set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def _normalize(vectors):
+    import numpy as np
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def _open_vectors(dim):
+    import numpy as np
+    path = _vectors_path()
+    if not os.path.exists(path) or os.path.getsize(path) < dim * 4:
+        return None
+    # Ignore a partly written trailing row; only rows committed in SQLite are ever read
+    rows = os.path.getsize(path) // (dim * 4)
+    return np.memmap(path, dtype=np.float32, mode="r", shape=(rows, dim))
+
+
+def _load_centroids(conn):
+    """The committed centroids, or None before the first training."""
+    import numpy as np
+    name = _get_meta(conn, "centroids")
+    if name is None:
+        return None
+    if _centroids["name"] != name:
+        try:
+            array = np.load(_centroids_path(name))
+        except FileNotFoundError:
+            # Replaced by a newer training since name was read; the rows are scanned this once
+            return None
+        _centroids.update(name=name, array=array)
+    return _centroids["array"]
+
+
+def _assign(vectors, centroids):
+    import numpy as np
+    return np.argmax(vectors @ centroids.T, axis=1).tolist()
+
+
+def _kmeans(sample, k, iterations=10, seed=0):
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        for j in range(k):
+            members = sample[labels == j]
+            if len(members):
+                centroids[j] = members.mean(axis=0)
+        centroids = _normalize(centroids)
+    return centroids
+
+
+def _needs_training(count, trained):
+    return count >= IVF_MIN_ROWS and count >= 2 * trained
+
+
+def train():
+    """Recompute the IVF centroids and every row's list if the index has doubled since the last time.
+
+    The k-means and the assignment run on a snapshot without holding the write
+    lock; the write transaction at the end only stores the lists and assigns the
+    rows written in the meantime. Returns True if the lists were retrained.
+    """
+    import numpy as np
+    conn = _conn()
+    conn.execute("BEGIN")
+    try:
+        dim = _get_meta(conn, "dim")
+        trained = int(_get_meta(conn, "trained_rows", 0))
+        seq = int(_get_meta(conn, "seq", 0))
+        rows = np.array([r for (r,) in conn.execute("SELECT row FROM items ORDER BY row")], dtype=np.int64)
+    finally:
+        conn.rollback()
+    if dim is None or not _needs_training(len(rows), trained):
+        return False
+    vectors = _open_vectors(int(dim))
+    nlist = max(1, int(math.sqrt(len(rows))))
+    rng = np.random.default_rng(0)
+    sample_rows = np.sort(rng.choice(rows, min(len(rows), 64 * nlist), replace=False))
+    centroids = _kmeans(np.asarray(vectors[sample_rows]), nlist)
+    updates = []
+    for i in range(0, len(rows), _BLOCK_ROWS):
+        block = rows[i:i + _BLOCK_ROWS]
+        updates.extend(zip(_assign(np.asarray(vectors[block]), centroids), block.tolist()))
+
+    name = f"search_centroids-{len(rows)}.npy"
+    with _lock:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if int(_get_meta(conn, "trained_rows", 0)) != trained:
+                # Another worker retrained first
+                conn.rollback()
+                return False
+            previous = _get_meta(conn, "centroids")
+            conn.executemany("UPDATE items SET list_id = ? WHERE row = ?", updates)
+            # Rows added (or reused) since the snapshot were assigned to the old lists
+            changed = np.array([r for (r,) in conn.execute("SELECT row FROM items WHERE seq > ? ORDER BY row", (seq,))],
+                               dtype=np.int64)
+            if len(changed):
+                vectors = _open_vectors(int(dim))
+                conn.executemany("UPDATE items SET list_id = ? WHERE row = ?",
+                                 zip(_assign(np.asarray(vectors[changed]), centroids), changed.tolist()))
+            # Nothing reads the new file until meta names it, in the same commit as the lists
+            tmp_path = _centroids_path(name) + ".tmp.npy"
+            np.save(tmp_path, centroids)
+            os.replace(tmp_path, _centroids_path(name))
+            _set_meta(conn, "centroids", name)
+            _set_meta(conn, "trained_rows", len(rows))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            if os.path.exists(_centroids_path(name)):
+                os.remove(_centroids_path(name))
+            raise
+        if previous is not None and os.path.exists(_centroids_path(previous)):
+            os.remove(_centroids_path(previous))
+    return True
+
+
+def _train_in_background():
+    def run():
+        try:
+            train()
+        except Exception as e:
+            print("Search index training failed:", e)
+        finally:
+            close()
+
+    with _lock:
+        thread = _training["thread"]
+        if thread is not None and thread.is_alive() and _training["pid"] == os.getpid():
+            return
+        thread = threading.Thread(target=run, name="search-index-train", daemon=True)
+        _training.update(thread=thread, pid=os.getpid())
+        thread.start()
+
+
+def _items(document):
+    items = []
+    if document.get("summary"):
+        items.append((document["id"], "summary", document["summary"], None))
+    for card in document.get("flashcards") or []:
+        items.append((document["id"], "flashcard", f"{card['question']} {card['answer']}", json.dumps(card)))
+    return items
+
+
+def _append(items, vectors):
+    conn = _conn()
+    dim = vectors.shape[1]
+    with _lock:
+        # BEGIN IMMEDIATE takes SQLite's write lock: it also serializes writers across worker processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stored_dim = _get_meta(conn, "dim")
+            if stored_dim is None:
+                _set_meta(conn, "dim", dim)
+            elif int(stored_dim) != dim:
+                raise ValueError(f"Embedding size {dim} does not match the index ({stored_dim}); rebuild it")
+
+            # Vectors are written before the commit, so only rows that no committed item
+            # references are overwritten: those freed by earlier transactions, and new ones
+            # past next_row. A concurrent search or a rollback never sees a changed vector.
+            reused = [r for (r,) in conn.execute("SELECT row FROM free_rows ORDER BY row LIMIT ?", (len(items),))]
+            conn.executemany("DELETE FROM free_rows WHERE row = ?", [(r,) for r in reused])
+            start = conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM items").fetchone()[0]
+
+            # Saving a document again replaces its items; their rows are freed for later writes
+            doc_ids = sorted({doc_id for doc_id, _, _, _ in items})
+            for doc_id in doc_ids:
+                conn.execute("INSERT INTO free_rows (row) SELECT row FROM items WHERE doc_id = ?", (doc_id,))
+                conn.execute("DELETE FROM items WHERE doc_id = ?", (doc_id,))
+            start = max(start, int(_get_meta(conn, "next_row", 0)))
+            rows = reused + list(range(start, start + len(items) - len(reused)))
+            path = _vectors_path()
+            with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+                for row, vector in zip(reused, vectors):
+                    f.seek(row * dim * 4)
+                    f.write(vector.tobytes())
+                f.seek(start * dim * 4)
+                f.write(vectors[len(reused):].tobytes())
+
+            centroids = _load_centroids(conn)
+            lists = _assign(vectors, centroids) if centroids is not None else [None] * len(items)
+            seq = int(_get_meta(conn, "seq", 0)) + 1
+            conn.executemany(
+                "INSERT INTO items (row, doc_id, kind, text, flashcard, list_id, seq) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(row, *item, list_id, seq) for row, item, list_id in zip(rows, items, lists)])
+            _set_meta(conn, "next_row", start + len(items) - len(reused))
+            _set_meta(conn, "seq", seq)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return len(items)
+
+
+def _add(documents):
+    added = 0
+    batch = []
+    for document in documents:
+        batch.extend(_items(document))
+        if len(batch) >= _INDEX_BATCH:
+            added += _append(batch, _normalize(inference.embed([text for _, _, text, _ in batch])))
+            batch = []
+    if batch:
+        added += _append(batch, _normalize(inference.embed([text for _, _, text, _ in batch])))
+    return added
+
+
+def add_documents(documents):
+    """Index documents ({"id", "summary", "flashcards"}), embedding them in batches."""
+    added = _add(documents)
+    conn = _conn()
+    count = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+    if _needs_training(count, int(_get_meta(conn, "trained_rows", 0))):
+        _train_in_background()
+    return added
+
+
+def add_document(document):
+    """Index one saved result (the document passed to save_to_cosmos)."""
+    return add_documents([document])
+
+
+def search(query, k=10):
+    """The k stored summaries/flashcards closest in meaning to query, best first."""
+    import numpy as np
+    conn = _conn()
+    dim = _get_meta(conn, "dim")
+    if dim is None or not query.strip():
+        return []
+    vectors = _open_vectors(int(dim))
+    if vectors is None:
+        return []
+    q = _normalize(inference.embed([query]))[0]
+
+    centroids = _load_centroids(conn)
+    if centroids is not None:
+        probes = np.argsort(-(centroids @ q))[:SEARCH_NPROBE].tolist()
+        placeholders = ",".join("?" * len(probes))
+        candidates = conn.execute(
+            f"SELECT row FROM items WHERE list_id IN ({placeholders}) OR list_id IS NULL ORDER BY row",
+            probes).fetchall()
+    else:
+        candidates = conn.execute("SELECT row FROM items ORDER BY row").fetchall()
+    rows = np.array([r for (r,) in candidates if r < len(vectors)], dtype=np.int64)
+    if not len(rows):
+        return []
+
+    best_rows = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0, dtype=np.float32)
+    for i in range(0, len(rows), _BLOCK_ROWS):
+        block = rows[i:i + _BLOCK_ROWS]
+        scores = np.asarray(vectors[block]) @ q
+        best_rows = np.concatenate([best_rows, block])
+        best_scores = np.concatenate([best_scores, scores])
+        if len(best_rows) > k:
+            keep = np.argpartition(-best_scores, k)[:k]
+            best_rows, best_scores = best_rows[keep], best_scores[keep]
+    order = np.argsort(-best_scores)
+    best_rows, best_scores = best_rows[order].tolist(), best_scores[order].tolist()
+
+    placeholders = ",".join("?" * len(best_rows))
+    meta = {row: rest for row, *rest in conn.execute(
+        f"SELECT row, doc_id, kind, text, flashcard FROM items WHERE row IN ({placeholders})", best_rows)}
+    results = []
+    for row, score in zip(best_rows, best_scores):
+        if row not in meta:
+            continue
+        doc_id, kind, text, flashcard = meta[row]
+        result = {"id": doc_id, "kind": kind, "text": text, "score": round(float(score), 4)}
+        if flashcard:
+            result["flashcard"] = json.loads(flashcard)
+        results.append(result)
+    return results
+
+
+def clear():
+    conn = _conn()
+    with _lock:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            paths = [_vectors_path()]
+            if _get_meta(conn, "centroids") is not None:
+                paths.append(_centroids_path(_get_meta(conn, "centroids")))
+            conn.execute("DELETE FROM items")
+            conn.execute("DELETE FROM free_rows")
+            conn.execute("DELETE FROM meta")
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def rebuild(documents):
+    """Replace the whole index with documents (e.g. everything read back from Cosmos)."""
+    clear()
+    added = _add(documents)
+    train()
+    return added
+
+
+def iter_cosmos_documents():
+    # main_pipeline imports this module, so its Cosmos helper is imported here
+    from main_pipeline import get_cosmos_container
+    yield from get_cosmos_container().read_all_items()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Semantic search index over stored summaries and flashcards")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the index from Cosmos DB")
+    parser.add_argument("--query", help="Search the index")
+    parser.add_argument("-k", type=int, default=10, help="Number of results")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        from dotenv import load_dotenv
+        load_dotenv()
+        print(f"Indexed {rebuild(iter_cosmos_documents())} items")
+    if args.query:
+        print(json.dumps(search(args.query, args.k), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
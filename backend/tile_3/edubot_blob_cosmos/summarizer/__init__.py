@@ -1,6 +1,6 @@
 import json
 import azure.functions as func
-from edubot_pipeline.summarizer.summarizer import generate_summary
+from .summarizer import generate_summary
 
 def main(req: func.HttpRequest) -> func.HttpResponse:
     try:
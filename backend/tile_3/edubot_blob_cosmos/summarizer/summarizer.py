@@ -1,53 +1,43 @@
 import os
-import re
-import nltk
-from transformers import pipeline
-from nltk.tokenize.punkt import PunktSentenceTokenizer, PunktParameters
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# Force download of 'punkt' model (sentence tokenizer)
-nltk.download('punkt')
+from text_normalizer import normalize
+from document_analysis import analyze
+import inference
+import budget as budgets
 
 def clean_text(text):
     # Remove extra whitespace and page numbers like "Page 12"
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'Page\s*\d+[:.]?', '', text, flags=re.IGNORECASE)
-    return text.strip()
+    return normalize(text, "summary")
 
 def chunk_text(text, max_chunk_size=1000):
-    # Use explicit PunktSentenceTokenizer to avoid sent_tokenize issues
-    punkt_param = PunktParameters()
-    tokenizer = PunktSentenceTokenizer(punkt_param)
-    sentences = tokenizer.tokenize(text)
-    
-    chunks = []
-    current_chunk = ""
-
-    for sent in sentences:
-        # +1 for space
-        if len(current_chunk) + len(sent) + 1 <= max_chunk_size:
-            current_chunk += " " + sent
-        else:
-            chunks.append(current_chunk.strip())
-            current_chunk = sent
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-
-    return chunks
-
-def generate_summary(text):
-    summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-    cleaned_text = clean_text(text)
-    chunks = chunk_text(cleaned_text)
-
-    summaries = []
-    for chunk in chunks:
-        max_len = min(150, max(30, len(chunk)//5))
-        min_len = min(40, max_len//2)
-        result = summarizer(chunk, max_length=max_len, min_length=min_len, do_sample=False)
-        summaries.append(result[0]['summary_text'])
-
-    combined_summary = " ".join(summaries)
-    return combined_summary.strip()
+    # Punkt sentences from the shared per-text analysis (tokenized once per text)
+    return analyze(text).chunks(max_chunk_size)
+
+def summary_lengths(chunks, budget=None):
+    # (max_length, min_length) per chunk; the thorough budget gives min(150, len/5) and min(40, max/2)
+    budget = budget or budgets.get_budget()
+    return [budget.summary_length(chunk) for chunk in chunks]
+
+def generate_summaries(texts, budget=None):
+    """generate_summary for several texts; every chunk of every text goes through the model in one batched call."""
+    budget = budget or budgets.get_budget()
+    chunked = [chunk_text(clean_text(text)) for text in texts]
+    all_chunks = [chunk for chunks in chunked for chunk in chunks]
+    start = time.perf_counter()
+    summaries = inference.summarize(all_chunks, summary_lengths(all_chunks, budget), **budget.summary_options())
+    budgets.observe("summarize", budgets.summarize_units(all_chunks, budget), time.perf_counter() - start)
+    summaries = iter(summaries)
+
+    combined = []
+    for chunks in chunked:
+        combined.append(" ".join(next(summaries) for _ in chunks).strip())
+    return combined
+
+def generate_summary(text, budget=None):
+    return generate_summaries([text], budget)[0]
 
 if __name__ == "__main__":
     import argparse
@@ -0,0 +1,98 @@
+"""
+text_normalizer.py - Shared text cleaning for OCR output, summaries and flashcards
+
+One engine replaces the cleaners that used to live in each module. A profile
+describes a cleaning behaviour and reproduces one of the old functions exactly:
+    "ocr"       ocr_summarizer.clean_text      (rebuild paragraphs from OCR lines)
+    "pipeline"  main_pipeline.clean_text_general
+    "summary"   summarizer.clean_text / flashcard_generator.clean_text
+
+Patterns are compiled once, literal replacements use str.replace instead of a
+regex, whitespace is collapsed with split/join instead of a regex,
+and output is built with list joins.
+"""
+
+import re
+
+
+class Profile:
+    """A cleaning behaviour, applied in this order:
+
+    replace              (old, new) literal replacements done with str.replace
+    collapse_whitespace  turn every whitespace run into one space
+    passes               (compiled pattern, replacement) pairs applied in order
+    paragraphs           rebuild paragraphs from lines: short lines (< min_line_length)
+                         are joined, long lines stand alone, blank lines end a paragraph
+    strip                strip the result
+    """
+
+    def __init__(self, replace=(), collapse_whitespace=False, passes=(), paragraphs=False,
+                 min_line_length=60, strip=True):
+        self.replace = list(replace)
+        self.collapse_whitespace = collapse_whitespace
+        self.passes = list(passes)
+        self.paragraphs = paragraphs
+        self.min_line_length = min_line_length
+        self.strip = strip
+
+
+PAGE_NUMBER = re.compile(r'Page\s*\d+[:.]?', re.IGNORECASE)
+LIST_NUMBER = re.compile(r'\b\d+\.')
+GLUED_SENTENCE = re.compile(r'(\w)[.,](\w)')
+# Zero-width form of ([a-z])([A-Z]) -> \1. \2: a letter cannot be both the upper
+# case end of one match and the lower case start of the next, so no match overlaps
+# and the literal replacement avoids expanding a group template per match
+MISSING_SPACE = re.compile(r'(?<=[a-z])(?=[A-Z])')
+BULLETS = [('•', '-'), ('·', '-')]
+
+PROFILES = {
+    "ocr": Profile(paragraphs=True, strip=False),
+    "summary": Profile(collapse_whitespace=True, passes=[(PAGE_NUMBER, '')]),
+    # Bullets are replaced first: they are non-word characters before and after,
+    # so moving that pass does not change what the other patterns match
+    "pipeline": Profile(replace=BULLETS, collapse_whitespace=True, passes=[
+        (PAGE_NUMBER, ''),
+        (LIST_NUMBER, ''),
+        (GLUED_SENTENCE, r'\1. \2'),
+        (MISSING_SPACE, '. '),
+    ]),
+}
+
+
+def _get_profile(profile):
+    return PROFILES[profile] if isinstance(profile, str) else profile
+
+
+def iter_paragraphs(lines, min_line_length=60):
+    """Yield paragraphs from an iterable of lines (the old OCR clean_text loop)."""
+    paragraph = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            if paragraph:
+                yield " ".join(paragraph)
+                paragraph = []
+        elif len(line) < min_line_length:
+            paragraph.append(line)
+        else:
+            if paragraph:
+                yield " ".join(paragraph)
+                paragraph = []
+            yield line
+    if paragraph:
+        yield " ".join(paragraph)
+
+
+def normalize(text, profile="summary"):
+    profile = _get_profile(profile)
+    for old, new in profile.replace:
+        text = text.replace(old, new)
+    if profile.collapse_whitespace:
+        # Same result as re.sub(r'\s+', ' ', text) once the ends are stripped below
+        text = " ".join(text.split())
+    for pattern, replacement in profile.passes:
+        text = pattern.sub(replacement, text)
+    if profile.paragraphs:
+        text = "\n\n".join(iter_paragraphs(text.splitlines(), profile.min_line_length))
+    return text.strip() if profile.strip else text
+
@@ -1,9 +1,8 @@
 import os
-import requests
-import fitz  # PyMuPDF
-import azure.cognitiveservices.speech as speechsdk
 import subprocess
+from functools import lru_cache
 from dotenv import load_dotenv
+import cognitive_client
 
 
 # Load environment variables from .env file
@@ -21,35 +20,49 @@ TRANSLATOR_ENDPOINT = os.getenv("TRANSLATOR_ENDPOINT")
 
 
 
+# URLs and headers are built once; requests go through the shared cognitive_client session
+@lru_cache(maxsize=None)
+def ocr_request():
+    url = VISION_ENDPOINT.rstrip('/') + "/vision/v3.2/ocr?language=unk&detectOrientation=true"
+    headers = {
+        "Ocp-Apim-Subscription-Key": VISION_KEY,
+        "Content-Type": "application/octet-stream"
+    }
+    return url, headers
+
+@lru_cache(maxsize=None)
+def translator_headers():
+    return {
+        'Ocp-Apim-Subscription-Key': TRANSLATOR_KEY,
+        'Ocp-Apim-Subscription-Region': TRANSLATOR_REGION,
+        'Content-type': 'application/json'
+    }
+
+@lru_cache(maxsize=None)
+def translate_url(target_lang_code):
+    return TRANSLATOR_ENDPOINT.rstrip('/') + "/translate?api-version=3.0" + f"&to={target_lang_code}"
+
 # 🔍 OCR for image files
 def ocr_image(image_path):
     print("Performing OCR on image...")
     with open(image_path, "rb") as image_file:
-        headers = {
-            "Ocp-Apim-Subscription-Key": VISION_KEY,
-            "Content-Type": "application/octet-stream"
-        }
-        params = {"language": "unk", "detectOrientation": "true"}
-        ocr_url = VISION_ENDPOINT.rstrip('/') + "/vision/v3.2/ocr"
-
-        response = requests.post(ocr_url, headers=headers, params=params, data=image_file)
+        ocr_url, headers = ocr_request()
+        response = cognitive_client.post("vision", ocr_url, headers=headers, data=image_file)
         response.raise_for_status()
         result = response.json()
 
-        extracted_text = ""
+        lines = []
         for region in result.get("regions", []):
             for line in region.get("lines", []):
-                line_text = " ".join([word["text"] for word in line["words"]])
-                extracted_text += line_text + "\n"
-    return extracted_text.strip()
+                lines.append(" ".join([word["text"] for word in line["words"]]))
+    return "\n".join(lines).strip()
 
 # 📄 PDF text extraction using PyMuPDF
 def extract_text_from_pdf(pdf_path):
     print("Extracting text from PDF using PyMuPDF...")
-    text = ""
+    import fitz  # PyMuPDF
     with fitz.open(pdf_path) as doc:
-        for page in doc:
-            text += page.get_text()
+        text = "".join([page.get_text() for page in doc])
     return text.strip()
 
 # 📂 TXT File Reading
@@ -61,16 +74,9 @@ def extract_text_from_txt(txt_path):
 # 🌍 Translate text using Azure Translator
 def translate_text(text, target_lang_code):
     print(f"Translating text to {target_lang_code}...")
-    path = "/translate?api-version=3.0"
-    params = f"&to={target_lang_code}"
-    constructed_url = TRANSLATOR_ENDPOINT.rstrip('/') + path + params
-    headers = {
-        'Ocp-Apim-Subscription-Key': TRANSLATOR_KEY,
-        'Ocp-Apim-Subscription-Region': TRANSLATOR_REGION,
-        'Content-type': 'application/json'
-    }
     body = [{'text': text}]
-    response = requests.post(constructed_url, headers=headers, json=body)
+    response = cognitive_client.post("translator", translate_url(target_lang_code),
+                                     headers=translator_headers(), json=body)
     response.raise_for_status()
     result = response.json()
     return result[0]['translations'][0]['text']
@@ -78,6 +84,7 @@ def translate_text(text, target_lang_code):
 # 🔊 Text-to-Speech with file output
 def synthesize_speech(text, language_code):
     print("Synthesizing speech...")
+    import azure.cognitiveservices.speech as speechsdk
     voice_map = {
         "en": "en-IN-PrabhatNeural",
         "hi": "hi-IN-MadhurNeural",